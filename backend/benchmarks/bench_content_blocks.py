@@ -0,0 +1,80 @@
+"""
+Streams a synthetic response through the content block parser used by
+`process_chat_response` and reports the per-delta cost as the answer grows.
+
+    python benchmarks/bench_content_blocks.py --tokens 50000
+
+The `full` mode re-serializes every block on each delta (the previous
+behaviour); `incremental` uses `ContentBlockStream.diff()`.
+"""
+
+import argparse
+import random
+import time
+
+from open_webui.utils.content_blocks import (
+    ContentBlockStream,
+    serialize_content_blocks,
+)
+
+
+WORDS = "the model streams a long answer with some code and lists".split()
+
+
+def generate_tokens(count: int, seed: int = 0) -> list[str]:
+    rnd = random.Random(seed)
+
+    tokens = ["<think>"]
+    reasoning = count // 5
+    for i in range(count):
+        if i == reasoning:
+            tokens.append("</think>\n\n")
+        token = f" {rnd.choice(WORDS)}"
+        if rnd.random() < 0.05:
+            token += "\n"
+        tokens.append(token)
+    return tokens
+
+
+def run(tokens: list[str], mode: str, checkpoints: int = 10) -> list[tuple[int, float]]:
+    stream = ContentBlockStream()
+
+    results = []
+    window = max(len(tokens) // checkpoints, 1)
+    start = time.perf_counter()
+
+    for idx, token in enumerate(tokens, 1):
+        stream.append(token)
+
+        if mode == "incremental":
+            stream.diff()
+        else:
+            serialize_content_blocks(stream.content_blocks)
+
+        if idx % window == 0:
+            elapsed = time.perf_counter() - start
+            results.append((idx, elapsed / window * 1e6))
+            start = time.perf_counter()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=50000)
+    parser.add_argument(
+        "--mode", choices=["incremental", "full", "both"], default="both"
+    )
+    args = parser.parse_args()
+
+    tokens = generate_tokens(args.tokens)
+    modes = ["incremental", "full"] if args.mode == "both" else [args.mode]
+
+    for mode in modes:
+        print(f"{mode}: microseconds per delta")
+        for idx, cost in run(tokens, mode):
+            print(f"  after {idx:>7} deltas: {cost:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Load benchmark for the async database path.
+
+Every statement is delayed by `--latency` seconds to simulate a slow database,
+then `--concurrency` requests run at once, each resolving the current user the
+way `get_current_user` does (lookup plus last-active update).
+
+The `sync` mode calls the blocking table methods from the event loop, as async
+route handlers did before; `async` uses the `*_async` variants.
+
+    python benchmarks/bench_db_concurrency.py --latency 0.02 --concurrency 50
+
+Uses a throwaway SQLite database unless DATABASE_URL is set.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+if "DATABASE_URL" not in os.environ:
+    DATA_DIR = tempfile.mkdtemp()
+    os.environ["DATA_DIR"] = DATA_DIR
+    os.environ["DATABASE_URL"] = f"sqlite:///{DATA_DIR}/webui.db"
+
+import open_webui.config  # noqa: F401 (runs the migrations)
+
+from sqlalchemy import event
+from sqlalchemy.util import await_only
+
+from open_webui.internal.db import async_engine, engine
+from open_webui.models.users import Users
+
+
+def add_latency(latency: float):
+    @event.listens_for(engine, "before_cursor_execute")
+    def sync_latency(*args):
+        time.sleep(latency)
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def async_latency(*args):
+        await_only(asyncio.sleep(latency))
+
+
+async def sync_request(user_id: str):
+    user = Users.get_user_by_id(user_id)
+    Users.update_user_last_active_by_id(user.id)
+
+
+async def async_request(user_id: str):
+    user = await Users.get_user_by_id_async(user_id)
+    await Users.update_user_last_active_by_id_async(user.id)
+
+
+async def run(request, user_id: str, concurrency: int, rounds: int):
+    latencies = []
+
+    async def timed():
+        start = time.perf_counter()
+        await request(user_id)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*[timed() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests/s": len(latencies) / elapsed,
+        "p50 ms": latencies[len(latencies) // 2] * 1000,
+        "p99 ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    user_id = str(uuid.uuid4())
+    Users.insert_new_user(user_id, "Benchmark", f"{user_id}@example.com")
+
+    add_latency(args.latency)
+
+    for mode, request in [("sync", sync_request), ("async", async_request)]:
+        result = await run(request, user_id, args.concurrency, args.rounds)
+        print(
+            f"{mode:>5}: "
+            + ", ".join(f"{key} {value:.1f}" for key, value in result.items())
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+Wall-clock benchmark for embedding document chunks at ingestion.
+
+Starts a local stub of an OpenAI-compatible `/embeddings` endpoint whose
+latency grows with the batch (`--base-latency` plus `--text-latency` per text)
+and which answers a fraction `--error-rate` of requests with 429, then embeds
+`--chunks` texts:
+
+- `sequential`: one `requests.post` per batch of `--batch-size`, one after
+  the other, as ingestion did before
+- `concurrency N`: through `BatchEmbedder` with N batches in flight, pooled
+  sessions and retries
+
+    python benchmarks/bench_embedding_ingestion.py --chunks 2000 --batch-size 16
+
+Pass `--target-latency` to let the batch size adapt (capped at
+`--max-batch-size`).
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from open_webui.retrieval.embedder import BatchEmbedder, post_with_retry
+
+DIMENSION = 384
+
+
+def start_stub_server(
+    base_latency: float, text_latency: float, error_rate: float
+) -> tuple[ThreadingHTTPServer, str]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+            if random.random() < error_rate:
+                self.send_response(429)
+                self.send_header("Retry-After", "0.05")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            time.sleep(base_latency + text_latency * len(body["input"]))
+            data = json.dumps(
+                {
+                    "data": [
+                        {"embedding": [random.random()] * DIMENSION}
+                        for _ in body["input"]
+                    ]
+                }
+            ).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def embed_sequential(url: str, texts: list[str], batch_size: int) -> list:
+    embeddings = []
+    for i in range(0, len(texts), batch_size):
+        while True:
+            r = requests.post(
+                f"{url}/embeddings",
+                json={"input": texts[i : i + batch_size], "model": "stub"},
+            )
+            # The old code path had no retries, resend so the runs are comparable
+            if r.status_code != 429:
+                break
+        r.raise_for_status()
+        embeddings.extend(elem["embedding"] for elem in r.json()["data"])
+    return embeddings
+
+
+def embed_batched(url: str, texts: list[str], embedder: BatchEmbedder) -> list:
+    def embed(batch):
+        r = post_with_retry(f"{url}/embeddings", json={"input": batch, "model": "stub"})
+        r.raise_for_status()
+        return [elem["embedding"] for elem in r.json()["data"]]
+
+    return embedder.embed(texts, embed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--base-latency", type=float, default=0.02)
+    parser.add_argument("--text-latency", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--target-latency", type=float, default=0)
+    parser.add_argument("--max-batch-size", type=int, default=0)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(
+        args.base_latency, args.text_latency, args.error_rate
+    )
+    texts = [f"chunk {idx} " * 50 for idx in range(args.chunks)]
+
+    try:
+        start = time.perf_counter()
+        embed_sequential(url, texts, args.batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"   sequential: {elapsed:.2f}s, {args.chunks / elapsed:.0f} chunks/s")
+
+        for concurrency in args.concurrency:
+            embedder = BatchEmbedder(
+                args.batch_size,
+                concurrency=concurrency,
+                target_latency=args.target_latency,
+                max_batch_size=args.max_batch_size,
+            )
+
+            start = time.perf_counter()
+            embeddings = embed_batched(url, texts, embedder)
+            elapsed = time.perf_counter() - start
+            assert len(embeddings) == args.chunks
+
+            stats = embedder.get_stats()
+            print(
+                f"concurrency {concurrency}: {elapsed:.2f}s, "
+                f"{args.chunks / elapsed:.0f} chunks/s, "
+                f"{stats['batches']} batches, final batch size {stats['batch_size']}"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
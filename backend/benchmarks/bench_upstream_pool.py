@@ -0,0 +1,142 @@
+"""
+Time-to-first-token benchmark for upstream connection pooling.
+
+Starts a local stub of an OpenAI-compatible `/chat/completions` endpoint that
+streams a short SSE response, then sends `--requests` chat requests in waves of
+`--concurrency`, measuring the time until the first chunk arrives.
+
+The `per-request` mode opens and closes an `aiohttp.ClientSession` for every
+request, as the Ollama / OpenAI routers did before; `pooled` goes through the
+shared `UPSTREAM_SESSIONS` pool.
+
+    python benchmarks/bench_upstream_pool.py --requests 500 --concurrency 10
+
+Pass `--url` to benchmark against a real upstream instead of the stub.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+from aiohttp import web
+
+from open_webui.utils.upstream import UPSTREAM_SESSIONS, cleanup_response
+
+PAYLOAD = json.dumps(
+    {
+        "model": "stub",
+        "stream": True,
+        "messages": [{"role": "user", "content": "Hi"}],
+    }
+)
+
+
+async def chat_completions(request: web.Request):
+    await request.read()
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    for token in ["Hello", "!", " How", " can", " I", " help", "?"]:
+        chunk = {"choices": [{"delta": {"content": token}}]}
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+
+async def start_stub_server() -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1"
+
+
+async def per_request(url: str) -> float:
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(trust_env=True) as session:
+        async with session.post(
+            f"{url}/chat/completions",
+            data=PAYLOAD,
+            headers={"Content-Type": "application/json"},
+        ) as r:
+            await r.content.readany()
+            ttft = time.perf_counter() - start
+            await r.read()
+    return ttft
+
+
+async def pooled(url: str) -> float:
+    start = time.perf_counter()
+    session = UPSTREAM_SESSIONS.get(url)
+    r = await session.post(
+        f"{url}/chat/completions",
+        data=PAYLOAD,
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        await r.content.readany()
+        ttft = time.perf_counter() - start
+        await r.read()
+    finally:
+        await cleanup_response(r)
+    return ttft
+
+
+async def run(request, url: str, requests: int, concurrency: int):
+    latencies = []
+
+    async def timed():
+        latencies.append(await request(url))
+
+    start = time.perf_counter()
+    for _ in range(0, requests, concurrency):
+        await asyncio.gather(*[timed() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests/s": len(latencies) / elapsed,
+        "ttft p50 ms": latencies[len(latencies) // 2] * 1000,
+        "ttft p99 ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    runner = None
+    url = args.url
+    if url is None:
+        runner, url = await start_stub_server()
+
+    try:
+        for mode, request in [("per-request", per_request), ("pooled", pooled)]:
+            result = await run(request, url, args.requests, args.concurrency)
+            print(
+                f"{mode:>11}: "
+                + ", ".join(f"{key} {value:.2f}" for key, value in result.items())
+            )
+
+        stats = UPSTREAM_SESSIONS.get_stats()
+        for origin, origin_stats in stats.items():
+            print(f"{origin}: {origin_stats}")
+    finally:
+        await UPSTREAM_SESSIONS.close()
+        if runner is not None:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1332,6 +1332,38 @@ The format for the JSON response is strictly:
 }"""
 
 
+ENABLE_TURN_PLANNING = PersistentConfig(
+    "ENABLE_TURN_PLANNING",
+    "task.planning.enable",
+    os.environ.get("ENABLE_TURN_PLANNING", "True").lower() == "true",
+)
+
+TURN_PLANNING_PROMPT_TEMPLATE = PersistentConfig(
+    "TURN_PLANNING_PROMPT_TEMPLATE",
+    "task.planning.prompt_template",
+    os.environ.get("TURN_PLANNING_PROMPT_TEMPLATE", ""),
+)
+
+DEFAULT_TURN_PLANNING_PROMPT_TEMPLATE = """### Task:
+Analyze the chat history and plan how to answer the last user message, in the chat's primary language. Return a single JSON object with exactly the following keys:
+{{TASKS}}
+
+### Guidelines:
+- Respond **EXCLUSIVELY** with the JSON object. Any form of extra commentary, explanation, or additional text is strictly prohibited.
+- Today's date is: {{CURRENT_DATE}}.
+
+### Available Tools:
+<tools>
+{{TOOLS}}
+</tools>
+
+### Chat History:
+<chat_history>
+{{MESSAGES:END:6}}
+</chat_history>
+"""
+
+
 DEFAULT_EMOJI_GENERATION_PROMPT_TEMPLATE = """Your task is to reflect the speaker's likely facial expression through a fitting emoji. Interpret emotions from the message and reflect their facial expression using fitting, diverse emojis (e.g., 😊, 😢, 😡, 😱).
 
 Message: ```{{prompt}}```"""
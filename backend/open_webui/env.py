@@ -328,6 +328,72 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+REALTIME_CHAT_SAVE_INTERVAL = os.environ.get("REALTIME_CHAT_SAVE_INTERVAL", 1.0)
+
+if REALTIME_CHAT_SAVE_INTERVAL == "":
+    REALTIME_CHAT_SAVE_INTERVAL = 1.0
+else:
+    try:
+        REALTIME_CHAT_SAVE_INTERVAL = float(REALTIME_CHAT_SAVE_INTERVAL)
+    except Exception:
+        REALTIME_CHAT_SAVE_INTERVAL = 1.0
+
+REALTIME_CHAT_SAVE_BUFFER_SIZE = os.environ.get("REALTIME_CHAT_SAVE_BUFFER_SIZE", 8192)
+
+if REALTIME_CHAT_SAVE_BUFFER_SIZE == "":
+    REALTIME_CHAT_SAVE_BUFFER_SIZE = 8192
+else:
+    try:
+        REALTIME_CHAT_SAVE_BUFFER_SIZE = int(REALTIME_CHAT_SAVE_BUFFER_SIZE)
+    except Exception:
+        REALTIME_CHAT_SAVE_BUFFER_SIZE = 8192
+
+# "delta" sends sequenced content deltas while streaming, "full" sends the whole
+# content with every event
+CHAT_COMPLETION_EVENT_MODE = os.environ.get(
+    "CHAT_COMPLETION_EVENT_MODE", "delta"
+).lower()
+
+if CHAT_COMPLETION_EVENT_MODE not in ["delta", "full"]:
+    CHAT_COMPLETION_EVENT_MODE = "delta"
+
+# Seconds each stage preparing a chat completion (turn planning, web search,
+# image generation, tool selection, retrieval) may take before the chat goes on
+# without it, as a JSON object overriding the defaults per stage. 0 disables a
+# timeout.
+CHAT_STAGE_TIMEOUTS = {
+    "planning": 30,
+    "web_search": 60,
+    "image_generation": 120,
+    "tools": 120,
+    "retrieval_queries": 30,
+    "retrieval": 60,
+}
+
+try:
+    for stage, timeout in json.loads(
+        os.environ.get("CHAT_STAGE_TIMEOUTS", "{}")
+    ).items():
+        if isinstance(timeout, (int, float)) and not isinstance(timeout, bool):
+            if timeout >= 0:
+                CHAT_STAGE_TIMEOUTS[stage] = timeout
+                continue
+        log.warning(f"Invalid CHAT_STAGE_TIMEOUTS value for {stage}: {timeout!r}")
+except Exception:
+    log.warning("CHAT_STAGE_TIMEOUTS is not a JSON object, using the defaults")
+
+# Seconds a turn plan is reused for the same message history, e.g. when the
+# response is regenerated
+TURN_PLAN_CACHE_TTL = os.environ.get("TURN_PLAN_CACHE_TTL", 3600)
+
+if TURN_PLAN_CACHE_TTL == "":
+    TURN_PLAN_CACHE_TTL = 3600
+else:
+    try:
+        TURN_PLAN_CACHE_TTL = int(TURN_PLAN_CACHE_TTL)
+    except Exception:
+        TURN_PLAN_CACHE_TTL = 3600
+
 ####################################
 # REDIS
 ####################################
@@ -348,6 +414,39 @@ BYPASS_MODEL_ACCESS_CONTROL = (
     os.environ.get("BYPASS_MODEL_ACCESS_CONTROL", "False").lower() == "true"
 )
 
+# Seconds an authenticated user is served from memory before being re-read
+USER_CACHE_TTL = os.environ.get("USER_CACHE_TTL", 10)
+
+if USER_CACHE_TTL == "":
+    USER_CACHE_TTL = 10
+else:
+    try:
+        USER_CACHE_TTL = float(USER_CACHE_TTL)
+    except Exception:
+        USER_CACHE_TTL = 10
+
+# Seconds a user's group memberships are served from memory
+GROUP_CACHE_TTL = os.environ.get("GROUP_CACHE_TTL", USER_CACHE_TTL)
+
+if GROUP_CACHE_TTL == "":
+    GROUP_CACHE_TTL = USER_CACHE_TTL
+else:
+    try:
+        GROUP_CACHE_TTL = float(GROUP_CACHE_TTL)
+    except Exception:
+        GROUP_CACHE_TTL = USER_CACHE_TTL
+
+# Minimum seconds between two `last_active_at` writes for the same user
+USER_LAST_ACTIVE_INTERVAL = os.environ.get("USER_LAST_ACTIVE_INTERVAL", 60)
+
+if USER_LAST_ACTIVE_INTERVAL == "":
+    USER_LAST_ACTIVE_INTERVAL = 60
+else:
+    try:
+        USER_LAST_ACTIVE_INTERVAL = float(USER_LAST_ACTIVE_INTERVAL)
+    except Exception:
+        USER_LAST_ACTIVE_INTERVAL = 60
+
 ####################################
 # WEBUI_SECRET_KEY
 ####################################
@@ -412,6 +511,417 @@ else:
     except Exception:
         AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST = 5
 
+# Seconds between background refreshes of the model list
+MODEL_REGISTRY_REFRESH_INTERVAL = os.environ.get("MODEL_REGISTRY_REFRESH_INTERVAL", 60)
+
+if MODEL_REGISTRY_REFRESH_INTERVAL == "":
+    MODEL_REGISTRY_REFRESH_INTERVAL = 60
+else:
+    try:
+        MODEL_REGISTRY_REFRESH_INTERVAL = float(MODEL_REGISTRY_REFRESH_INTERVAL)
+    except Exception:
+        MODEL_REGISTRY_REFRESH_INTERVAL = 60
+
+# Seconds to wait for a model source before serving its previous model list
+MODEL_REGISTRY_FETCH_TIMEOUT = os.environ.get("MODEL_REGISTRY_FETCH_TIMEOUT", 3)
+
+if MODEL_REGISTRY_FETCH_TIMEOUT == "":
+    MODEL_REGISTRY_FETCH_TIMEOUT = 3
+else:
+    try:
+        MODEL_REGISTRY_FETCH_TIMEOUT = float(MODEL_REGISTRY_FETCH_TIMEOUT)
+    except Exception:
+        MODEL_REGISTRY_FETCH_TIMEOUT = 3
+
+# Seconds between checks of the model list version shared by all workers
+MODEL_REGISTRY_VERSION_CHECK_INTERVAL = os.environ.get(
+    "MODEL_REGISTRY_VERSION_CHECK_INTERVAL", 1
+)
+
+if MODEL_REGISTRY_VERSION_CHECK_INTERVAL == "":
+    MODEL_REGISTRY_VERSION_CHECK_INTERVAL = 1
+else:
+    try:
+        MODEL_REGISTRY_VERSION_CHECK_INTERVAL = float(
+            MODEL_REGISTRY_VERSION_CHECK_INTERVAL
+        )
+    except Exception:
+        MODEL_REGISTRY_VERSION_CHECK_INTERVAL = 1
+
+# Connections kept open to each Ollama / OpenAI upstream (0 for no limit)
+AIOHTTP_POOL_LIMIT_PER_HOST = os.environ.get("AIOHTTP_POOL_LIMIT_PER_HOST", 100)
+
+if AIOHTTP_POOL_LIMIT_PER_HOST == "":
+    AIOHTTP_POOL_LIMIT_PER_HOST = 100
+else:
+    try:
+        AIOHTTP_POOL_LIMIT_PER_HOST = int(AIOHTTP_POOL_LIMIT_PER_HOST)
+    except Exception:
+        AIOHTTP_POOL_LIMIT_PER_HOST = 100
+
+# Seconds an idle upstream connection is kept alive for reuse
+AIOHTTP_POOL_KEEPALIVE_TIMEOUT = os.environ.get("AIOHTTP_POOL_KEEPALIVE_TIMEOUT", 30)
+
+if AIOHTTP_POOL_KEEPALIVE_TIMEOUT == "":
+    AIOHTTP_POOL_KEEPALIVE_TIMEOUT = 30
+else:
+    try:
+        AIOHTTP_POOL_KEEPALIVE_TIMEOUT = float(AIOHTTP_POOL_KEEPALIVE_TIMEOUT)
+    except Exception:
+        AIOHTTP_POOL_KEEPALIVE_TIMEOUT = 30
+
+# Seconds upstream DNS lookups are cached for
+AIOHTTP_POOL_DNS_CACHE_TTL = os.environ.get("AIOHTTP_POOL_DNS_CACHE_TTL", 300)
+
+if AIOHTTP_POOL_DNS_CACHE_TTL == "":
+    AIOHTTP_POOL_DNS_CACHE_TTL = 300
+else:
+    try:
+        AIOHTTP_POOL_DNS_CACHE_TTL = int(AIOHTTP_POOL_DNS_CACHE_TTL)
+    except Exception:
+        AIOHTTP_POOL_DNS_CACHE_TTL = 300
+
+# How requests are spread across Ollama replicas serving the same model:
+# "least_outstanding", "ewma", "weighted" or "random"
+OLLAMA_BALANCER_STRATEGY = os.environ.get(
+    "OLLAMA_BALANCER_STRATEGY", "least_outstanding"
+)
+
+# Consecutive failures after which an Ollama replica is taken out of rotation
+OLLAMA_BALANCER_FAILURE_THRESHOLD = os.environ.get(
+    "OLLAMA_BALANCER_FAILURE_THRESHOLD", 3
+)
+
+if OLLAMA_BALANCER_FAILURE_THRESHOLD == "":
+    OLLAMA_BALANCER_FAILURE_THRESHOLD = 3
+else:
+    try:
+        OLLAMA_BALANCER_FAILURE_THRESHOLD = int(OLLAMA_BALANCER_FAILURE_THRESHOLD)
+    except Exception:
+        OLLAMA_BALANCER_FAILURE_THRESHOLD = 3
+
+# Seconds a failing Ollama replica stays out of rotation
+OLLAMA_BALANCER_EJECT_COOLDOWN = os.environ.get("OLLAMA_BALANCER_EJECT_COOLDOWN", 30)
+
+if OLLAMA_BALANCER_EJECT_COOLDOWN == "":
+    OLLAMA_BALANCER_EJECT_COOLDOWN = 30
+else:
+    try:
+        OLLAMA_BALANCER_EJECT_COOLDOWN = float(OLLAMA_BALANCER_EJECT_COOLDOWN)
+    except Exception:
+        OLLAMA_BALANCER_EJECT_COOLDOWN = 30
+
+# Times a failed Ollama request is retried on another replica
+OLLAMA_BALANCER_MAX_RETRIES = os.environ.get("OLLAMA_BALANCER_MAX_RETRIES", 1)
+
+if OLLAMA_BALANCER_MAX_RETRIES == "":
+    OLLAMA_BALANCER_MAX_RETRIES = 1
+else:
+    try:
+        OLLAMA_BALANCER_MAX_RETRIES = int(OLLAMA_BALANCER_MAX_RETRIES)
+    except Exception:
+        OLLAMA_BALANCER_MAX_RETRIES = 1
+
+# Seconds a pipeline filter may take, unless its pipeline sets a "timeout"
+PIPELINE_FILTER_TIMEOUT = os.environ.get("PIPELINE_FILTER_TIMEOUT", 30)
+
+if PIPELINE_FILTER_TIMEOUT == "":
+    PIPELINE_FILTER_TIMEOUT = 30
+else:
+    try:
+        PIPELINE_FILTER_TIMEOUT = float(PIPELINE_FILTER_TIMEOUT)
+    except Exception:
+        PIPELINE_FILTER_TIMEOUT = 30
+
+# Consecutive failures after which the filters of a pipelines server are skipped
+PIPELINE_FILTER_FAILURE_THRESHOLD = os.environ.get(
+    "PIPELINE_FILTER_FAILURE_THRESHOLD", 3
+)
+
+if PIPELINE_FILTER_FAILURE_THRESHOLD == "":
+    PIPELINE_FILTER_FAILURE_THRESHOLD = 3
+else:
+    try:
+        PIPELINE_FILTER_FAILURE_THRESHOLD = int(PIPELINE_FILTER_FAILURE_THRESHOLD)
+    except Exception:
+        PIPELINE_FILTER_FAILURE_THRESHOLD = 3
+
+# Seconds the filters of a failing pipelines server are skipped for
+PIPELINE_FILTER_EJECT_COOLDOWN = os.environ.get("PIPELINE_FILTER_EJECT_COOLDOWN", 30)
+
+if PIPELINE_FILTER_EJECT_COOLDOWN == "":
+    PIPELINE_FILTER_EJECT_COOLDOWN = 30
+else:
+    try:
+        PIPELINE_FILTER_EJECT_COOLDOWN = float(PIPELINE_FILTER_EJECT_COOLDOWN)
+    except Exception:
+        PIPELINE_FILTER_EJECT_COOLDOWN = 30
+
+####################################
+# RETRIEVAL
+####################################
+
+# Collections whose BM25 index is kept in memory for hybrid search
+BM25_INDEX_CACHE_SIZE = os.environ.get("BM25_INDEX_CACHE_SIZE", 16)
+
+if BM25_INDEX_CACHE_SIZE == "":
+    BM25_INDEX_CACHE_SIZE = 16
+else:
+    try:
+        BM25_INDEX_CACHE_SIZE = int(BM25_INDEX_CACHE_SIZE)
+    except Exception:
+        BM25_INDEX_CACHE_SIZE = 16
+
+# Megabytes of query embeddings kept in memory, keyed by engine, model and text
+# (0 disables)
+EMBEDDING_CACHE_SIZE_MB = os.environ.get("EMBEDDING_CACHE_SIZE_MB", 64)
+
+if EMBEDDING_CACHE_SIZE_MB == "":
+    EMBEDDING_CACHE_SIZE_MB = 64
+else:
+    try:
+        EMBEDDING_CACHE_SIZE_MB = float(EMBEDDING_CACHE_SIZE_MB)
+    except Exception:
+        EMBEDDING_CACHE_SIZE_MB = 64
+
+# Second cache tier shared across restarts and workers: "", "disk" or "redis"
+EMBEDDING_CACHE_STORE = os.environ.get("EMBEDDING_CACHE_STORE", "").lower()
+
+if EMBEDDING_CACHE_STORE not in ["", "disk", "redis"]:
+    EMBEDDING_CACHE_STORE = ""
+
+EMBEDDING_CACHE_REDIS_URL = os.environ.get("EMBEDDING_CACHE_REDIS_URL", REDIS_URL)
+
+# Seconds embeddings are kept in the store, after their last use on disk and
+# after their last write in Redis
+EMBEDDING_CACHE_TTL = os.environ.get("EMBEDDING_CACHE_TTL", 7 * 24 * 60 * 60)
+
+if EMBEDDING_CACHE_TTL == "":
+    EMBEDDING_CACHE_TTL = 7 * 24 * 60 * 60
+else:
+    try:
+        EMBEDDING_CACHE_TTL = int(EMBEDDING_CACHE_TTL)
+    except Exception:
+        EMBEDDING_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Embedding batches in flight at once per embedding request
+RAG_EMBEDDING_CONCURRENCY = os.environ.get("RAG_EMBEDDING_CONCURRENCY", 4)
+
+if RAG_EMBEDDING_CONCURRENCY == "":
+    RAG_EMBEDDING_CONCURRENCY = 4
+else:
+    try:
+        RAG_EMBEDDING_CONCURRENCY = max(int(RAG_EMBEDDING_CONCURRENCY), 1)
+    except Exception:
+        RAG_EMBEDDING_CONCURRENCY = 4
+
+# Retries of an embedding batch on 429, 5xx and connection errors
+RAG_EMBEDDING_MAX_RETRIES = os.environ.get("RAG_EMBEDDING_MAX_RETRIES", 3)
+
+if RAG_EMBEDDING_MAX_RETRIES == "":
+    RAG_EMBEDDING_MAX_RETRIES = 3
+else:
+    try:
+        RAG_EMBEDDING_MAX_RETRIES = int(RAG_EMBEDDING_MAX_RETRIES)
+    except Exception:
+        RAG_EMBEDDING_MAX_RETRIES = 3
+
+# Seconds an embedding batch should take, batches are resized towards it (0 disables)
+RAG_EMBEDDING_TARGET_LATENCY = os.environ.get("RAG_EMBEDDING_TARGET_LATENCY", 10)
+
+if RAG_EMBEDDING_TARGET_LATENCY == "":
+    RAG_EMBEDDING_TARGET_LATENCY = 10
+else:
+    try:
+        RAG_EMBEDDING_TARGET_LATENCY = float(RAG_EMBEDDING_TARGET_LATENCY)
+    except Exception:
+        RAG_EMBEDDING_TARGET_LATENCY = 10
+
+# Largest batch the batch size may grow to (0 keeps RAG_EMBEDDING_BATCH_SIZE as the limit)
+RAG_EMBEDDING_MAX_BATCH_SIZE = os.environ.get("RAG_EMBEDDING_MAX_BATCH_SIZE", 0)
+
+if RAG_EMBEDDING_MAX_BATCH_SIZE == "":
+    RAG_EMBEDDING_MAX_BATCH_SIZE = 0
+else:
+    try:
+        RAG_EMBEDDING_MAX_BATCH_SIZE = int(RAG_EMBEDDING_MAX_BATCH_SIZE)
+    except Exception:
+        RAG_EMBEDDING_MAX_BATCH_SIZE = 0
+
+# Chunks embedded and inserted together when saving a document to the vector DB
+RAG_INGESTION_WINDOW_SIZE = os.environ.get("RAG_INGESTION_WINDOW_SIZE", 256)
+
+if RAG_INGESTION_WINDOW_SIZE == "":
+    RAG_INGESTION_WINDOW_SIZE = 256
+else:
+    try:
+        RAG_INGESTION_WINDOW_SIZE = max(int(RAG_INGESTION_WINDOW_SIZE), 1)
+    except Exception:
+        RAG_INGESTION_WINDOW_SIZE = 256
+
+# Reuse the stored vectors of chunks already embedded with the same model
+ENABLE_RAG_CHUNK_STORE = (
+    os.environ.get("ENABLE_RAG_CHUNK_STORE", "True").lower() == "true"
+)
+
+# Fetched web pages kept in memory, keyed by URL (0 disables)
+RAG_WEB_PAGE_CACHE_SIZE = os.environ.get("RAG_WEB_PAGE_CACHE_SIZE", 1000)
+
+if RAG_WEB_PAGE_CACHE_SIZE == "":
+    RAG_WEB_PAGE_CACHE_SIZE = 1000
+else:
+    try:
+        RAG_WEB_PAGE_CACHE_SIZE = int(RAG_WEB_PAGE_CACHE_SIZE)
+    except Exception:
+        RAG_WEB_PAGE_CACHE_SIZE = 1000
+
+# Seconds after which a cached web page is fetched again
+RAG_WEB_PAGE_CACHE_TTL = os.environ.get("RAG_WEB_PAGE_CACHE_TTL", 60 * 60)
+
+if RAG_WEB_PAGE_CACHE_TTL == "":
+    RAG_WEB_PAGE_CACHE_TTL = 60 * 60
+else:
+    try:
+        RAG_WEB_PAGE_CACHE_TTL = int(RAG_WEB_PAGE_CACHE_TTL)
+    except Exception:
+        RAG_WEB_PAGE_CACHE_TTL = 60 * 60
+
+# Search engine results kept in memory, keyed by engine and query (0 disables)
+RAG_WEB_SEARCH_CACHE_SIZE = os.environ.get("RAG_WEB_SEARCH_CACHE_SIZE", 1000)
+
+if RAG_WEB_SEARCH_CACHE_SIZE == "":
+    RAG_WEB_SEARCH_CACHE_SIZE = 1000
+else:
+    try:
+        RAG_WEB_SEARCH_CACHE_SIZE = int(RAG_WEB_SEARCH_CACHE_SIZE)
+    except Exception:
+        RAG_WEB_SEARCH_CACHE_SIZE = 1000
+
+# Seconds after which a search is sent to the search engine again
+RAG_WEB_SEARCH_CACHE_TTL = os.environ.get("RAG_WEB_SEARCH_CACHE_TTL", 10 * 60)
+
+if RAG_WEB_SEARCH_CACHE_TTL == "":
+    RAG_WEB_SEARCH_CACHE_TTL = 10 * 60
+else:
+    try:
+        RAG_WEB_SEARCH_CACHE_TTL = int(RAG_WEB_SEARCH_CACHE_TTL)
+    except Exception:
+        RAG_WEB_SEARCH_CACHE_TTL = 10 * 60
+
+# Concurrent requests to a single domain when fetching web pages
+RAG_WEB_FETCH_DOMAIN_CONCURRENCY = os.environ.get("RAG_WEB_FETCH_DOMAIN_CONCURRENCY", 2)
+
+if RAG_WEB_FETCH_DOMAIN_CONCURRENCY == "":
+    RAG_WEB_FETCH_DOMAIN_CONCURRENCY = 2
+else:
+    try:
+        RAG_WEB_FETCH_DOMAIN_CONCURRENCY = max(int(RAG_WEB_FETCH_DOMAIN_CONCURRENCY), 1)
+    except Exception:
+        RAG_WEB_FETCH_DOMAIN_CONCURRENCY = 2
+
+# Seconds after which fetching a web page is given up
+RAG_WEB_FETCH_TIMEOUT = os.environ.get("RAG_WEB_FETCH_TIMEOUT", 10)
+
+if RAG_WEB_FETCH_TIMEOUT == "":
+    RAG_WEB_FETCH_TIMEOUT = 10
+else:
+    try:
+        RAG_WEB_FETCH_TIMEOUT = float(RAG_WEB_FETCH_TIMEOUT)
+    except Exception:
+        RAG_WEB_FETCH_TIMEOUT = 10
+
+# Threads running background ingestion jobs in each process
+INGESTION_JOB_WORKERS = os.environ.get("INGESTION_JOB_WORKERS", 2)
+
+if INGESTION_JOB_WORKERS == "":
+    INGESTION_JOB_WORKERS = 2
+else:
+    try:
+        INGESTION_JOB_WORKERS = max(int(INGESTION_JOB_WORKERS), 1)
+    except Exception:
+        INGESTION_JOB_WORKERS = 2
+
+# Ingestion jobs of one user running at once, across all processes
+INGESTION_JOB_USER_CONCURRENCY = os.environ.get("INGESTION_JOB_USER_CONCURRENCY", 1)
+
+if INGESTION_JOB_USER_CONCURRENCY == "":
+    INGESTION_JOB_USER_CONCURRENCY = 1
+else:
+    try:
+        INGESTION_JOB_USER_CONCURRENCY = max(int(INGESTION_JOB_USER_CONCURRENCY), 1)
+    except Exception:
+        INGESTION_JOB_USER_CONCURRENCY = 1
+
+# Attempts of an ingestion job before it is marked as failed
+INGESTION_JOB_MAX_ATTEMPTS = os.environ.get("INGESTION_JOB_MAX_ATTEMPTS", 3)
+
+if INGESTION_JOB_MAX_ATTEMPTS == "":
+    INGESTION_JOB_MAX_ATTEMPTS = 3
+else:
+    try:
+        INGESTION_JOB_MAX_ATTEMPTS = max(int(INGESTION_JOB_MAX_ATTEMPTS), 1)
+    except Exception:
+        INGESTION_JOB_MAX_ATTEMPTS = 3
+
+# Seconds without a heartbeat after which a running job is started over
+INGESTION_JOB_STALE_TIMEOUT = os.environ.get("INGESTION_JOB_STALE_TIMEOUT", 300)
+
+if INGESTION_JOB_STALE_TIMEOUT == "":
+    INGESTION_JOB_STALE_TIMEOUT = 300
+else:
+    try:
+        INGESTION_JOB_STALE_TIMEOUT = int(INGESTION_JOB_STALE_TIMEOUT)
+    except Exception:
+        INGESTION_JOB_STALE_TIMEOUT = 300
+
+# Worker processes extracting uploaded files, 0 to extract in the server process
+CONTENT_EXTRACTION_WORKERS = os.environ.get(
+    "CONTENT_EXTRACTION_WORKERS", os.cpu_count() or 1
+)
+
+if CONTENT_EXTRACTION_WORKERS == "":
+    CONTENT_EXTRACTION_WORKERS = os.cpu_count() or 1
+else:
+    try:
+        CONTENT_EXTRACTION_WORKERS = max(int(CONTENT_EXTRACTION_WORKERS), 0)
+    except Exception:
+        CONTENT_EXTRACTION_WORKERS = os.cpu_count() or 1
+
+# Seconds after which the extraction of a file is aborted
+CONTENT_EXTRACTION_TIMEOUT = os.environ.get("CONTENT_EXTRACTION_TIMEOUT", 300)
+
+if CONTENT_EXTRACTION_TIMEOUT == "":
+    CONTENT_EXTRACTION_TIMEOUT = 300
+else:
+    try:
+        CONTENT_EXTRACTION_TIMEOUT = float(CONTENT_EXTRACTION_TIMEOUT)
+    except Exception:
+        CONTENT_EXTRACTION_TIMEOUT = 300
+
+# Address space limit of each extraction worker in MB, 0 for no limit
+CONTENT_EXTRACTION_MEMORY_LIMIT = os.environ.get(
+    "CONTENT_EXTRACTION_MEMORY_LIMIT", 4096
+)
+
+if CONTENT_EXTRACTION_MEMORY_LIMIT == "":
+    CONTENT_EXTRACTION_MEMORY_LIMIT = 4096
+else:
+    try:
+        CONTENT_EXTRACTION_MEMORY_LIMIT = int(CONTENT_EXTRACTION_MEMORY_LIMIT)
+    except Exception:
+        CONTENT_EXTRACTION_MEMORY_LIMIT = 4096
+
+# Pages of a PDF extracted by one worker, longer PDFs are split across workers
+PDF_EXTRACTION_PAGES_PER_TASK = os.environ.get("PDF_EXTRACTION_PAGES_PER_TASK", 32)
+
+if PDF_EXTRACTION_PAGES_PER_TASK == "":
+    PDF_EXTRACTION_PAGES_PER_TASK = 32
+else:
+    try:
+        PDF_EXTRACTION_PAGES_PER_TASK = max(int(PDF_EXTRACTION_PAGES_PER_TASK), 1)
+    except Exception:
+        PDF_EXTRACTION_PAGES_PER_TASK = 32
+
 ####################################
 # OFFLINE_MODE
 ####################################
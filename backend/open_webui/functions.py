@@ -27,7 +27,7 @@ from open_webui.socket.main import (
 from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.plugin import PLUGIN_CACHE, get_function_module
 from open_webui.utils.tools import get_tools
 from open_webui.utils.access_control import has_access
 
@@ -51,26 +51,31 @@ log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
 
-def get_function_module_by_id(request: Request, pipe_id: str):
-    # Check if function is already loaded
-    if pipe_id not in request.app.state.FUNCTIONS:
-        function_module, _, _ = load_function_module_by_id(pipe_id)
-        request.app.state.FUNCTIONS[pipe_id] = function_module
-    else:
-        function_module = request.app.state.FUNCTIONS[pipe_id]
+def get_function_module_by_id(request: Request, pipe_id: str, function=None):
+    if function is None:
+        function = PLUGIN_CACHE.get_functions().get(pipe_id)
+    function_module = get_function_module(request, pipe_id, function)
 
     if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-        valves = Functions.get_function_valves_by_id(pipe_id)
-        function_module.valves = function_module.Valves(**(valves if valves else {}))
+        function_module.valves = PLUGIN_CACHE.get_valves(
+            "functions",
+            pipe_id,
+            function_module.Valves,
+            function.valves if function else None,
+        )
     return function_module
 
 
 async def get_function_models(request):
-    pipes = Functions.get_functions_by_type("pipe", active_only=True)
+    pipes = [
+        function
+        for function in PLUGIN_CACHE.get_functions().values()
+        if function.type == "pipe" and function.is_active
+    ]
     pipe_models = []
 
     for pipe in pipes:
-        function_module = get_function_module_by_id(request, pipe.id)
+        function_module = get_function_module_by_id(request, pipe.id, pipe)
 
         # Check if function is a manifold
         if hasattr(function_module, "pipes"):
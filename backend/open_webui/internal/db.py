@@ -1,7 +1,9 @@
+import asyncio
 import json
 import logging
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 from typing import Any, Optional
+from urllib.parse import parse_qsl, urlencode
 
 from open_webui.internal.wrappers import register_connection
 from open_webui.env import (
@@ -16,6 +18,7 @@ from open_webui.env import (
 )
 from peewee_migrate import Router
 from sqlalchemy import Dialect, create_engine, MetaData, types
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import QueuePool, NullPool
@@ -97,6 +100,97 @@ else:
         )
 
 
+# Async drivers used for the async engine, by URL scheme. Schemes mapped to
+# None (e.g. sqlcipher) have no async driver and use the sync fallback below.
+ASYNC_DATABASE_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "sqlite+aiosqlite": "sqlite+aiosqlite",
+    "sqlite+sqlcipher": None,
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+psycopg_async",
+    "postgresql+psycopg_async": "postgresql+psycopg_async",
+    "postgresql+asyncpg": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "mysql+aiomysql": "mysql+aiomysql",
+    "mariadb": "mariadb+aiomysql",
+    "mariadb+pymysql": "mariadb+aiomysql",
+    "mariadb+mysqldb": "mariadb+aiomysql",
+    "mariadb+aiomysql": "mariadb+aiomysql",
+}
+
+# libpq query parameters that asyncpg does not accept as connect arguments
+LIBPQ_ONLY_PARAMS = {
+    "sslcert",
+    "sslkey",
+    "sslrootcert",
+    "sslcrl",
+    "sslpassword",
+    "connect_timeout",
+    "application_name",
+    "options",
+    "target_session_attrs",
+    "keepalives",
+    "keepalives_idle",
+    "keepalives_interval",
+    "keepalives_count",
+}
+
+
+def get_async_database_url(url: str) -> Optional[str]:
+    scheme, separator, rest = url.partition("://")
+    driver = ASYNC_DATABASE_DRIVERS.get(scheme)
+    if driver is None:
+        return None
+
+    if driver == "postgresql+asyncpg":
+        path, _, query = rest.partition("?")
+        params = []
+        for key, value in parse_qsl(query, keep_blank_values=True):
+            if key == "sslmode":
+                # asyncpg takes the same modes under the `ssl` name
+                params.append(("ssl", value))
+            elif key in LIBPQ_ONLY_PARAMS:
+                log.warning(f"Ignoring '{key}' for the async database engine")
+            else:
+                params.append((key, value))
+        rest = f"{path}?{urlencode(params)}" if params else path
+
+    return f"{driver}{separator}{rest}"
+
+
+def get_async_engine(url: Optional[str]):
+    if url is None:
+        return None
+
+    try:
+        if "sqlite" in url:
+            return create_async_engine(url)
+        elif DATABASE_POOL_SIZE > 0:
+            return create_async_engine(
+                url,
+                pool_size=DATABASE_POOL_SIZE,
+                max_overflow=DATABASE_POOL_MAX_OVERFLOW,
+                pool_timeout=DATABASE_POOL_TIMEOUT,
+                pool_recycle=DATABASE_POOL_RECYCLE,
+                pool_pre_ping=True,
+            )
+        else:
+            return create_async_engine(url, pool_pre_ping=True, poolclass=NullPool)
+    except Exception as e:
+        # Typically the async driver package is not installed
+        log.warning(f"Async database engine unavailable, using sync fallback: {e}")
+        return None
+
+
+SQLALCHEMY_ASYNC_DATABASE_URL = get_async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = get_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL)
+
+
 SessionLocal = sessionmaker(
     autocommit=False, autoflush=False, bind=engine, expire_on_commit=False
 )
@@ -104,6 +198,12 @@ metadata_obj = MetaData(schema=DATABASE_SCHEMA)
 Base = declarative_base(metadata=metadata_obj)
 Session = scoped_session(SessionLocal)
 
+AsyncSessionLocal = (
+    async_sessionmaker(autoflush=False, bind=async_engine, expire_on_commit=False)
+    if async_engine is not None
+    else None
+)
+
 
 def get_session():
     db = SessionLocal()
@@ -114,3 +214,58 @@ def get_session():
 
 
 get_db = contextmanager(get_session)
+
+
+class SyncFallbackSession:
+    """
+    Exposes the AsyncSession methods used by the models on top of a sync
+    Session, running each query in a worker thread. Used when DATABASE_URL has
+    no async driver available.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def add(self, instance):
+        self.session.add(instance)
+
+    async def get(self, *args, **kwargs):
+        return await asyncio.to_thread(self.session.get, *args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        def execute():
+            result = self.session.execute(*args, **kwargs)
+            # Buffer rows in the worker thread so iterating them doesn't block
+            if not getattr(result, "returns_rows", True):
+                return result
+            return result.freeze()()
+
+        return await asyncio.to_thread(execute)
+
+    async def delete(self, instance):
+        await asyncio.to_thread(self.session.delete, instance)
+
+    async def commit(self):
+        await asyncio.to_thread(self.session.commit)
+
+    async def refresh(self, instance, *args, **kwargs):
+        await asyncio.to_thread(self.session.refresh, instance, *args, **kwargs)
+
+    async def rollback(self):
+        await asyncio.to_thread(self.session.rollback)
+
+
+async def get_async_session():
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield SyncFallbackSession(db)
+        finally:
+            await asyncio.to_thread(db.close)
+        return
+
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+get_async_db = asynccontextmanager(get_async_session)
@@ -290,6 +290,8 @@ from open_webui.config import (
     IMAGE_PROMPT_GENERATION_PROMPT_TEMPLATE,
     TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE,
     QUERY_GENERATION_PROMPT_TEMPLATE,
+    ENABLE_TURN_PLANNING,
+    TURN_PLANNING_PROMPT_TEMPLATE,
     AUTOCOMPLETE_GENERATION_PROMPT_TEMPLATE,
     AUTOCOMPLETE_GENERATION_INPUT_MAX_LENGTH,
     AppConfig,
@@ -315,6 +317,7 @@ from open_webui.env import (
 
 
 from open_webui.utils.models import (
+    ModelRegistry,
     get_all_models,
     get_all_base_models,
     check_model_access,
@@ -325,16 +328,20 @@ from open_webui.utils.chat import (
     chat_action as chat_action_handler,
 )
 from open_webui.utils.middleware import process_chat_payload, process_chat_response
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import get_user_group_ids, has_access
 
 from open_webui.utils.auth import (
     decode_token,
     get_admin_user,
     get_verified_user,
-    get_password_hash
+    get_password_hash,
+    last_active_tracker,
 )
 from open_webui.utils.oauth import oauth_manager
 from open_webui.utils.security_headers import SecurityHeadersMiddleware
+from open_webui.utils.upstream import UPSTREAM_SESSIONS
+from open_webui.utils.jobs import JobQueue
+from open_webui.retrieval.loaders.executor import EXTRACTION_EXECUTOR
 
 from open_webui.tasks import stop_task, list_tasks  # Import from tasks.py
 
@@ -385,8 +392,15 @@ async def lifespan(app: FastAPI):
         reset_config()
 
     asyncio.create_task(periodic_usage_pool_cleanup())
+    asyncio.create_task(app.state.MODEL_REGISTRY.run())
+    asyncio.create_task(app.state.JOB_QUEUE.run())
     yield
 
+    app.state.JOB_QUEUE.shutdown()
+    EXTRACTION_EXECUTOR.shutdown()
+    await UPSTREAM_SESSIONS.close()
+    await last_active_tracker.flush()
+
 
 app = FastAPI(
     docs_url="/docs" if ENV == "dev" else None,
@@ -723,6 +737,8 @@ app.state.config.TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE = (
     TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE
 )
 app.state.config.QUERY_GENERATION_PROMPT_TEMPLATE = QUERY_GENERATION_PROMPT_TEMPLATE
+app.state.config.ENABLE_TURN_PLANNING = ENABLE_TURN_PLANNING
+app.state.config.TURN_PLANNING_PROMPT_TEMPLATE = TURN_PLANNING_PROMPT_TEMPLATE
 app.state.config.AUTOCOMPLETE_GENERATION_PROMPT_TEMPLATE = (
     AUTOCOMPLETE_GENERATION_PROMPT_TEMPLATE
 )
@@ -738,6 +754,8 @@ app.state.config.AUTOCOMPLETE_GENERATION_INPUT_MAX_LENGTH = (
 ########################################
 
 app.state.MODELS = {}
+app.state.MODEL_REGISTRY = ModelRegistry(app)
+app.state.JOB_QUEUE = JobQueue(app)
 
 
 class RedirectMiddleware(BaseHTTPMiddleware):
@@ -868,6 +886,14 @@ app.include_router(utils.router, prefix="/api/v1/utils", tags=["utils"])
 @app.get("/api/models")
 async def get_models(request: Request, user=Depends(get_verified_user)):
     def get_filtered_models(models, user):
+        user_group_ids = get_user_group_ids(user.id)
+        model_infos = {
+            model_info.id: model_info
+            for model_info in Models.get_models_by_ids(
+                [model["id"] for model in models if not model.get("arena")]
+            )
+        }
+
         filtered_models = []
         for model in models:
             if model.get("arena"):
@@ -877,14 +903,18 @@ async def get_models(request: Request, user=Depends(get_verified_user)):
                     access_control=model.get("info", {})
                     .get("meta", {})
                     .get("access_control", {}),
+                    user_group_ids=user_group_ids,
                 ):
                     filtered_models.append(model)
                 continue
 
-            model_info = Models.get_model_by_id(model["id"])
+            model_info = model_infos.get(model["id"])
             if model_info:
                 if user.id == model_info.user_id or has_access(
-                    user.id, type="read", access_control=model_info.access_control
+                    user.id,
+                    type="read",
+                    access_control=model_info.access_control,
+                    user_group_ids=user_group_ids,
                 ):
                     filtered_models.append(model)
 
@@ -923,6 +953,25 @@ async def get_base_models(request: Request, user=Depends(get_admin_user)):
     return {"data": models}
 
 
+@app.get("/api/models/registry")
+async def get_model_registry_status(request: Request, user=Depends(get_admin_user)):
+    registry = request.app.state.MODEL_REGISTRY
+    return {
+        "age": (
+            time.monotonic() - registry.refreshed_at
+            if registry.refreshed_at is not None
+            else None
+        ),
+        "stale": registry.stale,
+        "sources": registry.sources,
+    }
+
+
+@app.get("/api/upstreams/pool")
+async def get_upstream_pool_stats(user=Depends(get_admin_user)):
+    return UPSTREAM_SESSIONS.get_stats()
+
+
 @app.post("/api/chat/completions")
 async def chat_completion(
     request: Request,
@@ -942,7 +991,7 @@ async def chat_completion(
                 raise Exception("Model not found")
 
             model = request.app.state.MODELS[model_id]
-            model_info = Models.get_model_by_id(model_id)
+            model_info = await Models.get_model_by_id_async(model_id)
 
             # Check if user has access to the model
             if not BYPASS_MODEL_ACCESS_CONTROL and user.role == "user":
@@ -984,7 +1033,7 @@ async def chat_completion(
         form_data["metadata"] = metadata
 
         form_data, metadata, events = await process_chat_payload(
-            request, form_data, metadata, user, model
+            request, form_data, metadata, user, model, tasks
         )
 
     except Exception as e:
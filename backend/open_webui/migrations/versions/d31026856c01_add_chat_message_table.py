@@ -0,0 +1,88 @@
+"""Add chat_message table
+
+Revision ID: d31026856c01
+Revises: 3781e22d8b01
+Create Date: 2025-02-10 03:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column, select
+
+import time
+
+revision = "d31026856c01"
+down_revision = "3781e22d8b01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "chat_message",
+        sa.Column("chat_id", sa.String(), nullable=False, primary_key=True),
+        sa.Column("message_id", sa.String(), nullable=False, primary_key=True),
+        sa.Column("parent_id", sa.Text(), nullable=True),
+        sa.Column("children_ids", sa.JSON(), nullable=True),
+        sa.Column("message", sa.JSON(), nullable=True),
+        sa.Column("status_history", sa.JSON(), nullable=True),
+        sa.Column("dirty", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+    )
+
+    chat = table(
+        "chat",
+        column("id", sa.String()),
+        column("chat", sa.JSON()),
+    )
+    chat_message = table(
+        "chat_message",
+        column("chat_id", sa.String()),
+        column("message_id", sa.String()),
+        column("parent_id", sa.Text()),
+        column("children_ids", sa.JSON()),
+        column("message", sa.JSON()),
+        column("status_history", sa.JSON()),
+        column("dirty", sa.Boolean()),
+        column("created_at", sa.BigInteger()),
+        column("updated_at", sa.BigInteger()),
+    )
+
+    # Backfill message rows from the existing `history.messages` of every chat
+    conn = op.get_bind()
+    results = conn.execute(select(chat.c.id, chat.c.chat))
+
+    ts = int(time.time_ns())
+    for row in results:
+        history = (row.chat or {}).get("history", {}) or {}
+        messages = history.get("messages", {}) or {}
+        if not isinstance(messages, dict):
+            continue
+
+        rows = []
+        for message_id, message in messages.items():
+            message = {**message}
+            status_history = message.pop("statusHistory", None)
+
+            rows.append(
+                {
+                    "chat_id": row.id,
+                    "message_id": message_id,
+                    "parent_id": message.get("parentId"),
+                    "children_ids": message.get("childrenIds"),
+                    "message": message,
+                    "status_history": status_history,
+                    "dirty": False,
+                    "created_at": ts,
+                    "updated_at": ts,
+                }
+            )
+
+        if rows:
+            conn.execute(chat_message.insert(), rows)
+
+
+def downgrade():
+    op.drop_table("chat_message")
@@ -0,0 +1,39 @@
+"""Add job table
+
+Revision ID: e1f3a2b4c5d6
+Revises: d31026856c01
+Create Date: 2025-02-14 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "e1f3a2b4c5d6"
+down_revision = "d31026856c01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "job",
+        sa.Column("id", sa.String(), nullable=False, primary_key=True),
+        sa.Column("user_id", sa.String(), nullable=True),
+        sa.Column("type", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("progress", sa.JSON(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("scheduled_at", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+    )
+    op.create_index("job_status_scheduled_at_idx", "job", ["status", "scheduled_at"])
+
+
+def downgrade():
+    op.drop_index("job_status_scheduled_at_idx", table_name="job")
+    op.drop_table("job")
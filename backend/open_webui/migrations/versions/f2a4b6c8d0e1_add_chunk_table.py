@@ -0,0 +1,32 @@
+"""Add chunk table
+
+Revision ID: f2a4b6c8d0e1
+Revises: e1f3a2b4c5d6
+Create Date: 2025-02-18 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "f2a4b6c8d0e1"
+down_revision = "e1f3a2b4c5d6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "chunk",
+        sa.Column("hash", sa.String(), nullable=False),
+        sa.Column("engine", sa.String(), nullable=False),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("collection_name", sa.String(), nullable=True),
+        sa.Column("vector_id", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("hash", "engine", "model"),
+    )
+
+
+def downgrade():
+    op.drop_table("chunk")
@@ -3,13 +3,13 @@ import time
 import uuid
 from typing import Optional
 
-from open_webui.internal.db import Base, get_db
+from open_webui.internal.db import Base, get_async_db, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
 
 
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import or_, func, select, and_, text, update
 from sqlalchemy.sql import exists
 
 ####################
@@ -36,6 +36,43 @@ class Chat(Base):
     folder_id = Column(Text, nullable=True)
 
 
+class ChatMessage(Base):
+    __tablename__ = "chat_message"
+
+    chat_id = Column(String, primary_key=True)
+    message_id = Column(String, primary_key=True)
+
+    parent_id = Column(Text, nullable=True)
+    children_ids = Column(JSON, nullable=True)
+
+    message = Column(JSON)
+    status_history = Column(JSON, nullable=True)
+
+    # Set when the message has changes that are not yet folded into `chat.chat`
+    dirty = Column(Boolean, default=False)
+
+    created_at = Column(BigInteger)  # time_ns
+    updated_at = Column(BigInteger)  # time_ns
+
+
+class ChatMessageModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    chat_id: str
+    message_id: str
+
+    parent_id: Optional[str] = None
+    children_ids: Optional[list[str]] = None
+
+    message: dict
+    status_history: Optional[list[dict]] = None
+
+    dirty: bool = False
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -100,7 +137,123 @@ class ChatTitleIdResponse(BaseModel):
     created_at: int
 
 
+def _split_message(message: dict) -> dict:
+    message = {**message}
+    status_history = message.pop("statusHistory", None)
+
+    return {
+        "parent_id": message.get("parentId"),
+        "children_ids": message.get("childrenIds"),
+        "message": message,
+        "status_history": status_history,
+    }
+
+
+def _join_message(chat_message: ChatMessage) -> dict:
+    message = {**(chat_message.message or {})}
+    if chat_message.status_history:
+        message["statusHistory"] = chat_message.status_history
+
+    return message
+
+
 class ChatTable:
+    def _sync_chat_messages(self, db, id: str, chat: dict):
+        """
+        Mirrors `history.messages` of a full chat document into the `chat_message`
+        table, only writing rows whose content actually changed.
+        """
+        messages = (chat.get("history", {}) or {}).get("messages", {}) or {}
+        if not isinstance(messages, dict):
+            messages = {}
+        rows = {
+            row.message_id: row
+            for row in db.query(ChatMessage).filter_by(chat_id=id).all()
+        }
+
+        ts = int(time.time_ns())
+        for message_id, message in messages.items():
+            values = _split_message(message)
+            row = rows.pop(message_id, None)
+
+            if row is None:
+                db.add(
+                    ChatMessage(
+                        chat_id=id,
+                        message_id=message_id,
+                        **values,
+                        dirty=False,
+                        created_at=ts,
+                        updated_at=ts,
+                    )
+                )
+            elif (
+                row.message != values["message"]
+                or row.status_history != values["status_history"]
+                or row.dirty
+            ):
+                for key, value in values.items():
+                    setattr(row, key, value)
+                row.dirty = False
+                row.updated_at = ts
+
+        if rows:
+            db.query(ChatMessage).filter(
+                ChatMessage.chat_id == id,
+                ChatMessage.message_id.in_(list(rows.keys())),
+            ).delete(synchronize_session=False)
+
+    def _merge_chat_messages(self, chat: dict, chat_messages: list) -> dict:
+        if not chat_messages:
+            return chat
+
+        history = {**(chat.get("history", {}) or {})}
+        messages = history.get("messages", {}) or {}
+        messages = {**messages} if isinstance(messages, dict) else {}
+
+        for chat_message in sorted(chat_messages, key=lambda m: m.updated_at):
+            messages[chat_message.message_id] = {
+                **messages.get(chat_message.message_id, {}),
+                **_join_message(chat_message),
+            }
+            history["currentId"] = chat_message.message_id
+
+        history["messages"] = messages
+        return {**chat, "history": history}
+
+    def _to_chat_model(self, db, chat: Optional[Chat]) -> Optional[ChatModel]:
+        if chat is None:
+            return None
+
+        return self._to_chat_models(db, [chat])[0]
+
+    def _to_chat_models(self, db, chats: list[Chat]) -> list[ChatModel]:
+        chats = list(chats)
+        if not chats:
+            return []
+
+        # Only messages written since the last full save need to be overlaid
+        dirty_messages = {}
+        for chat_message in (
+            db.query(ChatMessage)
+            .filter(
+                ChatMessage.chat_id.in_([chat.id for chat in chats]),
+                ChatMessage.dirty == True,
+            )
+            .all()
+        ):
+            dirty_messages.setdefault(chat_message.chat_id, []).append(chat_message)
+
+        chat_models = []
+        for chat in chats:
+            chat_model = ChatModel.model_validate(chat)
+            if chat.id in dirty_messages:
+                chat_model.chat = self._merge_chat_messages(
+                    chat_model.chat, dirty_messages[chat.id]
+                )
+            chat_models.append(chat_model)
+        return chat_models
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -121,6 +274,7 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            self._sync_chat_messages(db, id, form_data.chat)
             db.commit()
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
@@ -150,6 +304,7 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            self._sync_chat_messages(db, id, form_data.chat)
             db.commit()
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
@@ -161,6 +316,7 @@ class ChatTable:
                 chat_item.chat = chat
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
+                self._sync_chat_messages(db, id, chat)
                 db.commit()
                 db.refresh(chat_item)
 
@@ -205,6 +361,15 @@ class ChatTable:
 
         return chat.chat.get("title", "New Chat")
 
+    async def get_chat_title_by_id_async(self, id: str) -> Optional[str]:
+        # The title lives outside `history.messages`, no need to hydrate the chat
+        async with get_async_db() as db:
+            chat = await db.get(Chat, id)
+            if chat is None:
+                return None
+
+            return (chat.chat or {}).get("title", "New Chat")
+
     def get_messages_by_chat_id(self, id: str) -> Optional[dict]:
         chat = self.get_chat_by_id(id)
         if chat is None:
@@ -215,52 +380,140 @@ class ChatTable:
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        with get_db() as db:
+            chat_message = db.get(ChatMessage, (id, message_id))
+            if chat_message is None:
+                return {}
+
+            return _join_message(chat_message)
+
+    async def get_message_by_id_and_message_id_async(
+        self, id: str, message_id: str
+    ) -> Optional[dict]:
+        async with get_async_db() as db:
+            chat_message = await db.get(ChatMessage, (id, message_id))
+            if chat_message is None:
+                return {}
 
-        return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
+            return _join_message(chat_message)
 
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
+    ) -> Optional[ChatMessageModel]:
+        try:
+            with get_db() as db:
+                # Bumps the chat, messages are only stored for existing chats
+                result = db.execute(
+                    update(Chat).filter_by(id=id).values(updated_at=int(time.time()))
+                )
+                if result.rowcount == 0:
+                    return None
+
+                ts = int(time.time_ns())
+                chat_message = db.get(ChatMessage, (id, message_id))
+
+                if chat_message is None:
+                    chat_message = ChatMessage(
+                        chat_id=id,
+                        message_id=message_id,
+                        **_split_message(message),
+                        created_at=ts,
+                    )
+                    db.add(chat_message)
+                else:
+                    values = _split_message({**_join_message(chat_message), **message})
+                    for key, value in values.items():
+                        setattr(chat_message, key, value)
+
+                chat_message.dirty = True
+                chat_message.updated_at = ts
+                db.commit()
+                db.refresh(chat_message)
+
+                return ChatMessageModel.model_validate(chat_message)
+        except Exception:
             return None
 
-        chat = chat.chat
-        history = chat.get("history", {})
+    async def upsert_message_to_chat_by_id_and_message_id_async(
+        self, id: str, message_id: str, message: dict
+    ) -> Optional[ChatMessageModel]:
+        try:
+            async with get_async_db() as db:
+                # Bumps the chat, messages are only stored for existing chats
+                result = await db.execute(
+                    update(Chat).filter_by(id=id).values(updated_at=int(time.time()))
+                )
+                if result.rowcount == 0:
+                    return None
 
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
+                ts = int(time.time_ns())
+                chat_message = await db.get(ChatMessage, (id, message_id))
 
-        history["currentId"] = message_id
+                if chat_message is None:
+                    chat_message = ChatMessage(
+                        chat_id=id,
+                        message_id=message_id,
+                        **_split_message(message),
+                        created_at=ts,
+                    )
+                    db.add(chat_message)
+                else:
+                    values = _split_message({**_join_message(chat_message), **message})
+                    for key, value in values.items():
+                        setattr(chat_message, key, value)
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+                chat_message.dirty = True
+                chat_message.updated_at = ts
+                await db.commit()
+                await db.refresh(chat_message)
+
+                return ChatMessageModel.model_validate(chat_message)
+        except Exception:
+            return None
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
+    ) -> Optional[ChatMessageModel]:
+        try:
+            with get_db() as db:
+                chat_message = db.get(ChatMessage, (id, message_id))
+                if chat_message is None:
+                    return None
+
+                chat_message.status_history = [
+                    *(chat_message.status_history or []),
+                    status,
+                ]
+                chat_message.dirty = True
+                chat_message.updated_at = int(time.time_ns())
+                db.commit()
+                db.refresh(chat_message)
+
+                return ChatMessageModel.model_validate(chat_message)
+        except Exception:
             return None
 
-        chat = chat.chat
-        history = chat.get("history", {})
+    async def add_message_status_to_chat_by_id_and_message_id_async(
+        self, id: str, message_id: str, status: dict
+    ) -> Optional[ChatMessageModel]:
+        try:
+            async with get_async_db() as db:
+                chat_message = await db.get(ChatMessage, (id, message_id))
+                if chat_message is None:
+                    return None
 
-        if message_id in history.get("messages", {}):
-            status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
-            history["messages"][message_id]["statusHistory"] = status_history
+                chat_message.status_history = [
+                    *(chat_message.status_history or []),
+                    status,
+                ]
+                chat_message.dirty = True
+                chat_message.updated_at = int(time.time_ns())
+                await db.commit()
+                await db.refresh(chat_message)
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+                return ChatMessageModel.model_validate(chat_message)
+        except Exception:
+            return None
 
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
@@ -275,7 +528,7 @@ class ChatTable:
                     "id": str(uuid.uuid4()),
                     "user_id": f"shared-{chat_id}",
                     "title": chat.title,
-                    "chat": chat.chat,
+                    "chat": self._to_chat_model(db, chat).chat,
                     "created_at": chat.created_at,
                     "updated_at": int(time.time()),
                 }
@@ -306,7 +559,7 @@ class ChatTable:
                     return self.insert_shared_chat_by_chat_id(chat_id)
 
                 shared_chat.title = chat.title
-                shared_chat.chat = chat.chat
+                shared_chat.chat = self._to_chat_model(db, chat).chat
 
                 shared_chat.updated_at = int(time.time())
                 db.commit()
@@ -335,7 +588,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -347,7 +600,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -359,7 +612,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -383,7 +636,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_list_by_user_id(
         self,
@@ -405,7 +658,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -456,13 +709,13 @@ class ChatTable:
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -484,7 +737,7 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -495,7 +748,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -504,7 +757,7 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -513,7 +766,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -522,7 +775,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -673,7 +926,7 @@ class ChatTable:
             print(len(all_chats))
 
             # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str
@@ -686,7 +939,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
@@ -701,7 +954,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -714,7 +967,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -753,7 +1006,7 @@ class ChatTable:
 
             all_chats = query.all()
             print("all_chats", all_chats)
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -774,7 +1027,7 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -850,6 +1103,7 @@ class ChatTable:
     def delete_chat_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
+                db.query(ChatMessage).filter_by(chat_id=id).delete()
                 db.query(Chat).filter_by(id=id).delete()
                 db.commit()
 
@@ -860,7 +1114,8 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                if db.query(Chat).filter_by(id=id, user_id=user_id).delete():
+                    db.query(ChatMessage).filter_by(chat_id=id).delete()
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -872,6 +1127,11 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id.in_(
+                        select(Chat.id).where(Chat.user_id == user_id)
+                    )
+                ).delete(synchronize_session=False)
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -884,6 +1144,13 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id.in_(
+                        select(Chat.id).where(
+                            Chat.user_id == user_id, Chat.folder_id == folder_id
+                        )
+                    )
+                ).delete(synchronize_session=False)
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
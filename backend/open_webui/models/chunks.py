@@ -0,0 +1,106 @@
+import logging
+import time
+
+from open_webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, String
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# Chunk DB Schema
+####################
+
+
+class Chunk(Base):
+    __tablename__ = "chunk"
+
+    # sha256 of the embedded chunk text
+    hash = Column(String, primary_key=True)
+    engine = Column(String, primary_key=True)
+    model = Column(String, primary_key=True)
+
+    # Where a vector of the chunk is stored in the vector DB
+    collection_name = Column(String)
+    vector_id = Column(String)
+
+    updated_at = Column(BigInteger)
+
+
+class ChunkModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    hash: str
+    engine: str
+    model: str
+
+    collection_name: str
+    vector_id: str
+
+    updated_at: int  # timestamp in epoch
+
+
+class ChunksTable:
+    def get_chunks_by_hashes(
+        self, engine: str, model: str, hashes: list[str]
+    ) -> list[ChunkModel]:
+        with get_db() as db:
+            return [
+                ChunkModel.model_validate(chunk)
+                for chunk in db.query(Chunk)
+                .filter(
+                    Chunk.engine == engine,
+                    Chunk.model == model,
+                    Chunk.hash.in_(hashes),
+                )
+                .all()
+            ]
+
+    def upsert_chunks(
+        self, engine: str, model: str, collection_name: str, vector_ids: dict
+    ) -> bool:
+        """
+        Points the chunks with the hashes in `vector_ids` at their vector of
+        that id in `collection_name`, the latest copy being the most likely to
+        still exist.
+        """
+        with get_db() as db:
+            try:
+                db.query(Chunk).filter(
+                    Chunk.engine == engine,
+                    Chunk.model == model,
+                    Chunk.hash.in_(list(vector_ids)),
+                ).delete(synchronize_session=False)
+
+                now = int(time.time())
+                db.add_all(
+                    [
+                        Chunk(
+                            hash=hash,
+                            engine=engine,
+                            model=model,
+                            collection_name=collection_name,
+                            vector_id=vector_id,
+                            updated_at=now,
+                        )
+                        for hash, vector_id in vector_ids.items()
+                    ]
+                )
+                db.commit()
+                return True
+            except Exception as e:
+                # e.g. another worker stored the same chunks concurrently
+                db.rollback()
+                log.debug(f"Error storing chunks: {e}")
+                return False
+
+    def delete_all_chunks(self) -> bool:
+        with get_db() as db:
+            db.query(Chunk).delete()
+            db.commit()
+            return True
+
+
+Chunks = ChunksTable()
@@ -6,7 +6,7 @@ from open_webui.internal.db import Base, JSONField, get_db
 from open_webui.models.users import Users
 from open_webui.env import SRC_LOG_LEVELS
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text
+from sqlalchemy import BigInteger, Boolean, Column, String, Text, func
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
@@ -52,6 +52,10 @@ class FunctionModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class FunctionWithValvesModel(FunctionModel):
+    valves: Optional[dict] = None
+
+
 ####################
 # Forms
 ####################
@@ -146,6 +150,21 @@ class FunctionsTable:
                     for function in db.query(Function).filter_by(type=type).all()
                 ]
 
+    def get_functions_with_valves(self) -> list[FunctionWithValvesModel]:
+        with get_db() as db:
+            return [
+                FunctionWithValvesModel.model_validate(function)
+                for function in db.query(Function).all()
+            ]
+
+    def get_version(self) -> tuple[int, Optional[int]]:
+        # Changes with every function inserted, updated or deleted
+        with get_db() as db:
+            count, updated_at = db.query(
+                func.count(Function.id), func.max(Function.updated_at)
+            ).one()
+            return count, updated_at
+
     def get_global_filter_functions(self) -> list[FunctionModel]:
         with get_db() as db:
             return [
@@ -4,8 +4,15 @@ import time
 from typing import Optional
 import uuid
 
+import redis
+
 from open_webui.internal.db import Base, get_db
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import (
+    GROUP_CACHE_TTL,
+    SRC_LOG_LEVELS,
+    WEBSOCKET_MANAGER,
+    WEBSOCKET_REDIS_URL,
+)
 
 from open_webui.models.files import FileMetadataResponse
 
@@ -87,6 +94,92 @@ class GroupUpdateForm(GroupForm):
     user_ids: Optional[list[str]] = None
 
 
+class GroupMemberCache:
+    """
+    Short-lived in-process cache of the groups each user is a member of, so
+    permission checks do not query the database for every resource. Any write
+    through `Groups` clears it.
+
+    With the Redis websocket manager, clears are shared through a counter
+    that every read checks, the same way as for the user cache.
+    """
+
+    VERSION_KEY = "open-webui:group_member_cache:version"
+
+    def __init__(self, ttl: float = GROUP_CACHE_TTL):
+        self.ttl = ttl
+
+        # Bumped on every clear so reads started before it are not cached
+        self.version = 0
+
+        self.redis = (
+            redis.Redis.from_url(WEBSOCKET_REDIS_URL, decode_responses=True)
+            if WEBSOCKET_MANAGER == "redis"
+            else None
+        )
+        self.shared_version: Optional[int] = None
+
+        self._groups: dict[str, tuple[float, list[GroupModel]]] = {}
+
+    def get(self, user_id: str) -> Optional[list[GroupModel]]:
+        self.check_version()
+
+        entry = self._groups.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, groups = entry
+        if expires_at < time.monotonic():
+            self._groups.pop(user_id, None)
+            return None
+        return groups
+
+    def set(self, user_id: str, groups: list[GroupModel], version: int):
+        if self.ttl <= 0 or version != self.version:
+            return
+
+        self._groups[user_id] = (time.monotonic() + self.ttl, groups)
+
+    def clear(self, share: bool = True):
+        self.version += 1
+        if share:
+            self.share_invalidation()
+
+        self._groups = {}
+
+    def check_version(self):
+        if self.redis is None:
+            return
+
+        try:
+            version = int(self.redis.get(self.VERSION_KEY) or 0)
+        except Exception as e:
+            # Without the counter, changes on other workers can't be seen
+            log.warning(f"Error checking the group cache version: {e}")
+            version = None
+
+        if version is None or version != self.shared_version:
+            self.clear(share=False)
+            self.shared_version = version
+
+    def share_invalidation(self):
+        if self.redis is None:
+            return
+
+        try:
+            version = self.redis.incr(self.VERSION_KEY)
+        except Exception as e:
+            log.warning(f"Error sharing the group cache invalidation: {e}")
+            return
+
+        # Every clear drops all entries, so only the counter needs to catch up
+        if self.shared_version is not None and version == self.shared_version + 1:
+            self.shared_version = version
+
+
+GROUP_MEMBER_CACHE = GroupMemberCache()
+
+
 class GroupTable:
     def insert_new_group(
         self, user_id: str, form_data: GroupForm
@@ -106,6 +199,7 @@ class GroupTable:
                 result = Group(**group.model_dump())
                 db.add(result)
                 db.commit()
+                GROUP_MEMBER_CACHE.clear()
                 db.refresh(result)
                 if result:
                     return GroupModel.model_validate(result)
@@ -137,6 +231,14 @@ class GroupTable:
                 .all()
             ]
 
+    def get_cached_groups_by_member_id(self, user_id: str) -> list[GroupModel]:
+        groups = GROUP_MEMBER_CACHE.get(user_id)
+        if groups is None:
+            version = GROUP_MEMBER_CACHE.version
+            groups = self.get_groups_by_member_id(user_id)
+            GROUP_MEMBER_CACHE.set(user_id, groups, version)
+        return groups
+
     def get_group_by_id(self, id: str) -> Optional[GroupModel]:
         try:
             with get_db() as db:
@@ -164,6 +266,7 @@ class GroupTable:
                     }
                 )
                 db.commit()
+                GROUP_MEMBER_CACHE.clear()
                 return self.get_group_by_id(id=id)
         except Exception as e:
             log.exception(e)
@@ -174,6 +277,7 @@ class GroupTable:
             with get_db() as db:
                 db.query(Group).filter_by(id=id).delete()
                 db.commit()
+                GROUP_MEMBER_CACHE.clear()
                 return True
         except Exception:
             return False
@@ -183,6 +287,7 @@ class GroupTable:
             try:
                 db.query(Group).delete()
                 db.commit()
+                GROUP_MEMBER_CACHE.clear()
 
                 return True
             except Exception:
@@ -203,6 +308,7 @@ class GroupTable:
                     )
                     db.commit()
 
+                GROUP_MEMBER_CACHE.clear()
                 return True
             except Exception:
                 return False
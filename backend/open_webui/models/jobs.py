@@ -0,0 +1,247 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from open_webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, Integer, String, Text, JSON, func
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# Job DB Schema
+####################
+
+
+class Job(Base):
+    __tablename__ = "job"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String)
+    type = Column(String)
+
+    # "pending", "running", "completed" or "failed"
+    status = Column(String)
+    data = Column(JSON, nullable=True)
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    attempts = Column(Integer, default=0)
+    # Pending jobs are not picked up before this time (retry backoff)
+    scheduled_at = Column(BigInteger)
+
+    created_at = Column(BigInteger)
+    # Also the heartbeat of running jobs
+    updated_at = Column(BigInteger)
+
+
+class JobModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    user_id: str
+    type: str
+
+    status: str
+    data: Optional[dict] = None
+    progress: Optional[dict] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+    attempts: int = 0
+    scheduled_at: int  # timestamp in epoch
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
+####################
+# Forms
+####################
+
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    status: str
+    progress: Optional[dict] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: int
+    updated_at: int
+
+
+class JobsTable:
+    def insert_new_job(
+        self, user_id: str, type: str, data: Optional[dict] = None
+    ) -> Optional[JobModel]:
+        with get_db() as db:
+            now = int(time.time())
+            job = JobModel(
+                **{
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "type": type,
+                    "status": "pending",
+                    "data": data,
+                    "attempts": 0,
+                    "scheduled_at": now,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+
+            try:
+                result = Job(**job.model_dump())
+                db.add(result)
+                db.commit()
+                db.refresh(result)
+                if result:
+                    return JobModel.model_validate(result)
+                else:
+                    return None
+            except Exception as e:
+                log.exception(f"Error inserting a new job: {e}")
+                return None
+
+    def get_job_by_id(self, id: str) -> Optional[JobModel]:
+        with get_db() as db:
+            try:
+                job = db.get(Job, id)
+                return JobModel.model_validate(job)
+            except Exception:
+                return None
+
+    def get_jobs_by_user_id(self, user_id: str, limit: int = 50) -> list[JobModel]:
+        with get_db() as db:
+            return [
+                JobModel.model_validate(job)
+                for job in db.query(Job)
+                .filter_by(user_id=user_id)
+                .order_by(Job.created_at.desc())
+                .limit(limit)
+                .all()
+            ]
+
+    def claim_next_job(
+        self, user_concurrency: int, max_attempts: int
+    ) -> Optional[JobModel]:
+        """
+        Marks the oldest due pending job of a user with fewer than
+        `user_concurrency` running jobs, and fewer than `max_attempts` attempts,
+        as running and returns it. Workers in other processes race on the same
+        rows: a job is only handed to the worker whose update matched it while
+        still pending.
+        """
+        with get_db() as db:
+            now = int(time.time())
+
+            running = dict(
+                db.query(Job.user_id, func.count(Job.id))
+                .filter(Job.status == "running")
+                .group_by(Job.user_id)
+                .all()
+            )
+
+            jobs = (
+                db.query(Job.id, Job.user_id)
+                .filter(
+                    Job.status == "pending",
+                    Job.scheduled_at <= now,
+                    Job.attempts < max_attempts,
+                )
+                .order_by(Job.created_at)
+                .limit(100)
+                .all()
+            )
+            for id, user_id in jobs:
+                if running.get(user_id, 0) >= user_concurrency:
+                    continue
+
+                claimed = (
+                    db.query(Job)
+                    .filter_by(id=id, status="pending")
+                    .update(
+                        {
+                            "status": "running",
+                            "attempts": Job.attempts + 1,
+                            "updated_at": now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if claimed:
+                    return JobModel.model_validate(db.get(Job, id))
+            return None
+
+    def update_job_progress_by_id(self, id: str, progress: dict):
+        with get_db() as db:
+            db.query(Job).filter_by(id=id).update(
+                {"progress": progress, "updated_at": int(time.time())}
+            )
+            db.commit()
+
+    def touch_jobs_by_ids(self, ids: list[str]):
+        with get_db() as db:
+            db.query(Job).filter(Job.id.in_(ids), Job.status == "running").update(
+                {"updated_at": int(time.time())}, synchronize_session=False
+            )
+            db.commit()
+
+    def complete_job_by_id(self, id: str, result: Optional[dict] = None):
+        with get_db() as db:
+            db.query(Job).filter_by(id=id).update(
+                {
+                    "status": "completed",
+                    "result": result,
+                    "error": None,
+                    "updated_at": int(time.time()),
+                }
+            )
+            db.commit()
+
+    def fail_job_by_id(self, id: str, error: str, retry_at: Optional[int] = None):
+        # Jobs with a `retry_at` go back to the queue until then
+        with get_db() as db:
+            db.query(Job).filter_by(id=id).update(
+                {
+                    "status": "pending" if retry_at else "failed",
+                    "error": error,
+                    "scheduled_at": retry_at or Job.scheduled_at,
+                    "updated_at": int(time.time()),
+                }
+            )
+            db.commit()
+
+    def requeue_stale_jobs(self, timeout: int, max_attempts: int) -> int:
+        # Running jobs whose worker stopped sending heartbeats (e.g. the process
+        # was restarted) are picked up again, unless they used all their
+        # attempts: a job that keeps killing its worker must not loop forever
+        with get_db() as db:
+            now = int(time.time())
+            stale = db.query(Job).filter(
+                Job.status == "running", Job.updated_at < now - timeout
+            )
+
+            stale.filter(Job.attempts >= max_attempts).update(
+                {
+                    "status": "failed",
+                    "error": f"Worker stopped responding after {max_attempts} attempts",
+                    "updated_at": now,
+                },
+                synchronize_session=False,
+            )
+            requeued = stale.filter(Job.attempts < max_attempts).update(
+                {"status": "pending"}, synchronize_session=False
+            )
+            db.commit()
+            return requeued
+
+
+Jobs = JobsTable()
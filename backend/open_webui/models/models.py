@@ -2,7 +2,7 @@ import logging
 import time
 from typing import Optional
 
-from open_webui.internal.db import Base, JSONField, get_db
+from open_webui.internal.db import Base, JSONField, get_async_db, get_db
 from open_webui.env import SRC_LOG_LEVELS
 
 from open_webui.models.users import Users, UserResponse
@@ -206,6 +206,14 @@ class ModelsTable:
             or has_access(user_id, permission, model.access_control)
         ]
 
+    def get_version(self) -> tuple[int, Optional[int]]:
+        # Changes with every model inserted, updated or deleted
+        with get_db() as db:
+            count, updated_at = db.query(
+                func.count(Model.id), func.max(Model.updated_at)
+            ).one()
+            return count, updated_at
+
     def get_model_by_id(self, id: str) -> Optional[ModelModel]:
         try:
             with get_db() as db:
@@ -214,6 +222,21 @@ class ModelsTable:
         except Exception:
             return None
 
+    async def get_model_by_id_async(self, id: str) -> Optional[ModelModel]:
+        try:
+            async with get_async_db() as db:
+                model = await db.get(Model, id)
+                return ModelModel.model_validate(model)
+        except Exception:
+            return None
+
+    def get_models_by_ids(self, ids: list[str]) -> list[ModelModel]:
+        with get_db() as db:
+            return [
+                ModelModel.model_validate(model)
+                for model in db.query(Model).filter(Model.id.in_(ids)).all()
+            ]
+
     def toggle_model_by_id(self, id: str) -> Optional[ModelModel]:
         with get_db() as db:
             try:
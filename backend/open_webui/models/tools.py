@@ -6,7 +6,7 @@ from open_webui.internal.db import Base, JSONField, get_db
 from open_webui.models.users import Users, UserResponse
 from open_webui.env import SRC_LOG_LEVELS
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text, JSON
+from sqlalchemy import BigInteger, Column, String, Text, JSON, func
 
 from open_webui.utils.access_control import has_access
 
@@ -71,6 +71,10 @@ class ToolModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ToolWithValvesModel(ToolModel):
+    valves: Optional[dict] = None
+
+
 ####################
 # Forms
 ####################
@@ -157,6 +161,21 @@ class ToolsTable:
                 )
             return tools
 
+    def get_tools_with_valves(self) -> list[ToolWithValvesModel]:
+        with get_db() as db:
+            return [
+                ToolWithValvesModel.model_validate(tool)
+                for tool in db.query(Tool).all()
+            ]
+
+    def get_version(self) -> tuple[int, Optional[int]]:
+        # Changes with every tool inserted, updated or deleted
+        with get_db() as db:
+            count, updated_at = db.query(
+                func.count(Tool.id), func.max(Tool.updated_at)
+            ).one()
+            return count, updated_at
+
     def get_tools_by_user_id(
         self, user_id: str, permission: str = "write"
     ) -> list[ToolUserModel]:
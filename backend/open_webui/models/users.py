@@ -1,7 +1,16 @@
+import logging
 import time
 from typing import Optional
 
-from open_webui.internal.db import Base, JSONField, get_db
+import redis
+
+from open_webui.internal.db import Base, JSONField, get_async_db, get_db
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    USER_CACHE_TTL,
+    WEBSOCKET_MANAGER,
+    WEBSOCKET_REDIS_URL,
+)
 
 
 from open_webui.models.chats import Chats
@@ -9,7 +18,10 @@ from open_webui.models.groups import Groups
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text
+from sqlalchemy import BigInteger, Column, String, Text, select, update
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
 
 ####################
 # User DB Schema
@@ -94,6 +106,127 @@ class UserUpdateForm(BaseModel):
     password: Optional[str] = None
 
 
+class UserCache:
+    """
+    Short-lived in-process cache of users by id and API key, used to
+    authenticate requests without a database round trip. `Users` drops the
+    entry of every user it writes.
+
+    With the Redis websocket manager, invalidations are shared through a
+    counter that every read checks: a worker whose last seen counter is
+    behind clears its entries, so a role change or a deleted API key applies
+    to all workers at once.
+    """
+
+    VERSION_KEY = "open-webui:user_cache:version"
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # Bumped on every invalidation so reads started before it are not cached
+        self.version = 0
+
+        self.redis = (
+            redis.Redis.from_url(WEBSOCKET_REDIS_URL, decode_responses=True)
+            if WEBSOCKET_MANAGER == "redis"
+            else None
+        )
+        self.shared_version: Optional[int] = None
+
+        self._users: dict[str, tuple[float, UserModel]] = {}
+        self._api_keys: dict[str, str] = {}
+
+    def get(self, id: str) -> Optional[UserModel]:
+        self.check_version()
+        return self._get(id)
+
+    def get_by_api_key(self, api_key: str) -> Optional[UserModel]:
+        self.check_version()
+
+        id = self._api_keys.get(api_key)
+        if id is None:
+            return None
+
+        user = self._get(id)
+        if user is None or user.api_key != api_key:
+            return None
+        return user
+
+    def _get(self, id: str) -> Optional[UserModel]:
+        entry = self._users.get(id)
+        if entry is None:
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            self.invalidate(id, bump=False)
+            return None
+        return user
+
+    def set(self, user: UserModel, version: int):
+        if self.ttl <= 0 or version != self.version:
+            return
+
+        self.invalidate(user.id, bump=False)
+        if len(self._users) >= self.max_size:
+            # Entries are kept in insertion order, drop the oldest
+            self.invalidate(next(iter(self._users)), bump=False)
+
+        self._users[user.id] = (time.monotonic() + self.ttl, user)
+        if user.api_key:
+            self._api_keys[user.api_key] = user.id
+
+    def invalidate(self, id: str, bump: bool = True):
+        if bump:
+            self.version += 1
+            self.share_invalidation()
+
+        entry = self._users.pop(id, None)
+        if entry is not None and entry[1].api_key:
+            self._api_keys.pop(entry[1].api_key, None)
+
+    def clear(self, share: bool = True):
+        self.version += 1
+        if share:
+            self.share_invalidation()
+
+        self._users = {}
+        self._api_keys = {}
+
+    def check_version(self):
+        if self.redis is None:
+            return
+
+        try:
+            version = int(self.redis.get(self.VERSION_KEY) or 0)
+        except Exception as e:
+            # Without the counter, changes on other workers can't be seen
+            log.warning(f"Error checking the user cache version: {e}")
+            version = None
+
+        if version is None or version != self.shared_version:
+            self.clear(share=False)
+            self.shared_version = version
+
+    def share_invalidation(self):
+        if self.redis is None:
+            return
+
+        try:
+            version = self.redis.incr(self.VERSION_KEY)
+        except Exception as e:
+            log.warning(f"Error sharing the user cache invalidation: {e}")
+            return
+
+        # Keep the entries if no other worker invalidated in the meantime
+        if self.shared_version is not None and version == self.shared_version + 1:
+            self.shared_version = version
+
+
+USER_CACHE = UserCache()
+
+
 class UsersTable:
     def insert_new_user(
         self,
@@ -135,6 +268,22 @@ class UsersTable:
         except Exception:
             return None
 
+    async def get_user_by_id_async(self, id: str) -> Optional[UserModel]:
+        # Database errors propagate so callers don't mistake an outage for a
+        # missing user (and answer with a 401)
+        async with get_async_db() as db:
+            user = await db.get(User, id)
+            return UserModel.model_validate(user) if user else None
+
+    async def get_cached_user_by_id_async(self, id: str) -> Optional[UserModel]:
+        user = USER_CACHE.get(id)
+        if user is None:
+            version = USER_CACHE.version
+            user = await self.get_user_by_id_async(id)
+            if user is not None:
+                USER_CACHE.set(user, version)
+        return user
+
     def get_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
         try:
             with get_db() as db:
@@ -143,6 +292,23 @@ class UsersTable:
         except Exception:
             return None
 
+    async def get_user_by_api_key_async(self, api_key: str) -> Optional[UserModel]:
+        async with get_async_db() as db:
+            result = await db.execute(select(User).filter_by(api_key=api_key))
+            user = result.scalars().first()
+            return UserModel.model_validate(user) if user else None
+
+    async def get_cached_user_by_api_key_async(
+        self, api_key: str
+    ) -> Optional[UserModel]:
+        user = USER_CACHE.get_by_api_key(api_key)
+        if user is None:
+            version = USER_CACHE.version
+            user = await self.get_user_by_api_key_async(api_key)
+            if user is not None:
+                USER_CACHE.set(user, version)
+        return user
+
     def get_user_by_email(self, email: str) -> Optional[UserModel]:
         try:
             with get_db() as db:
@@ -213,6 +379,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"role": role})
                 db.commit()
+                USER_CACHE.invalidate(id)
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
@@ -227,6 +394,7 @@ class UsersTable:
                     {"profile_image_url": profile_image_url}
                 )
                 db.commit()
+                USER_CACHE.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -246,6 +414,35 @@ class UsersTable:
         except Exception:
             return None
 
+    async def update_user_last_active_by_id_async(self, id: str) -> Optional[UserModel]:
+        try:
+            async with get_async_db() as db:
+                await db.execute(
+                    update(User)
+                    .filter_by(id=id)
+                    .values(last_active_at=int(time.time()))
+                )
+                await db.commit()
+
+                user = await db.get(User, id)
+                return UserModel.model_validate(user)
+        except Exception:
+            return None
+
+    async def update_users_last_active_async(self, last_active: dict[str, int]):
+        try:
+            async with get_async_db() as db:
+                await db.execute(
+                    update(User),
+                    [
+                        {"id": id, "last_active_at": last_active_at}
+                        for id, last_active_at in last_active.items()
+                    ],
+                )
+                await db.commit()
+        except Exception:
+            return None
+
     def update_user_oauth_sub_by_id(
         self, id: str, oauth_sub: str
     ) -> Optional[UserModel]:
@@ -253,6 +450,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"oauth_sub": oauth_sub})
                 db.commit()
+                USER_CACHE.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -264,6 +462,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update(updated)
                 db.commit()
+                USER_CACHE.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -283,6 +482,7 @@ class UsersTable:
 
                 db.query(User).filter_by(id=id).update({"settings": user_settings})
                 db.commit()
+                USER_CACHE.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -301,6 +501,7 @@ class UsersTable:
                     # Delete User
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
+                    USER_CACHE.invalidate(id)
 
                 return True
             else:
@@ -313,6 +514,7 @@ class UsersTable:
             with get_db() as db:
                 result = db.query(User).filter_by(id=id).update({"api_key": api_key})
                 db.commit()
+                USER_CACHE.invalidate(id)
                 return True if result == 1 else False
         except Exception:
             return False
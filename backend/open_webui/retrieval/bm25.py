@@ -0,0 +1,354 @@
+import hashlib
+import heapq
+import logging
+import math
+import os
+import pickle
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from open_webui.config import CACHE_DIR
+from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.env import SRC_LOG_LEVELS, BM25_INDEX_CACHE_SIZE
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+def tokenize(text: str) -> list[str]:
+    # Same as the BM25Retriever this index replaces, so rankings don't change
+    return text.split()
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunks of one collection, kept as an inverted index so
+    chunks can be appended in place and a query only touches the chunks that
+    share a term with it.
+
+    Scores are those of `rank_bm25.BM25Okapi`, which hybrid search used before:
+    negative idfs are replaced by `epsilon` times the average idf, and repeated
+    query terms count repeatedly. Like `BM25Okapi.get_top_n`, chunks without a
+    query term fill the results up to `k` with a score of 0.
+
+    `search()` and `add()` may run from different threads.
+    """
+
+    # Bumped when the tokenization or the pickled state change, older pickled
+    # indexes are rebuilt
+    FORMAT = 2
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.format = self.FORMAT
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        self.ids: list[str] = []
+        self.documents: list[str] = []
+        self.metadatas: list[Any] = []
+        self.lengths: list[int] = []
+
+        self._id_set: set[str] = set()
+        self._postings: dict[str, dict[int, int]] = {}
+        self._total_length = 0
+
+        # idf of every term, computed again after chunks are added
+        self._idf: Optional[dict[str, float]] = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_idf"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids: list[str], documents: list[str], metadatas: list[Any]) -> int:
+        added = 0
+        with self._lock:
+            for idx, id in enumerate(ids):
+                if id in self._id_set:
+                    continue
+
+                tokens = tokenize(documents[idx])
+                tf = Counter(tokens)
+
+                doc_idx = len(self.ids)
+                self.ids.append(id)
+                self.documents.append(documents[idx])
+                self.metadatas.append(metadatas[idx])
+                self.lengths.append(len(tokens))
+
+                self._id_set.add(id)
+                for term, freq in tf.items():
+                    self._postings.setdefault(term, {})[doc_idx] = freq
+                self._total_length += self.lengths[-1]
+                added += 1
+
+            if added:
+                self._idf = None
+        return added
+
+    def _get_idf(self) -> dict[str, float]:
+        if self._idf is None:
+            n = len(self.ids)
+            idf = {
+                term: math.log(n - len(postings) + 0.5) - math.log(len(postings) + 0.5)
+                for term, postings in self._postings.items()
+            }
+
+            if idf:
+                eps = self.epsilon * sum(idf.values()) / len(idf)
+                for term, value in idf.items():
+                    if value < 0:
+                        idf[term] = eps
+            self._idf = idf
+        return self._idf
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        with self._lock:
+            n = len(self.ids)
+            if not n:
+                return []
+
+            idf = self._get_idf()
+            average_length = self._total_length / n
+
+            scores: dict[int, float] = {}
+            for term in tokenize(query):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+
+                for doc_idx, freq in postings.items():
+                    length = self.lengths[doc_idx]
+                    scores[doc_idx] = scores.get(doc_idx, 0) + idf[term] * (
+                        freq
+                        * (self.k1 + 1)
+                        / (
+                            freq
+                            + self.k1 * (1 - self.b + self.b * length / average_length)
+                        )
+                    )
+
+        results = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+        # Ties, including the chunks without any query term, come last chunk
+        # first as with the reversed argsort of `get_top_n`
+        doc_idx = n - 1
+        while len(results) < min(k, n):
+            if doc_idx not in scores:
+                results.append((doc_idx, 0.0))
+            doc_idx -= 1
+        return results
+
+
+class BM25IndexCache:
+    """
+    BM25 indexes of vector DB collections, pickled under `directory` and the
+    `max_size` most recently used kept in memory.
+
+    An index is built from a full scan of its collection the first time it is
+    needed and dropped by `invalidate()` when chunks are deleted. Chunks
+    inserted afterwards are appended by `add()` to a delta file next to the
+    pickled index, so an upload writes only its own chunks; every worker
+    replays the part of the delta it hasn't seen yet on its next `get()`.
+    Other workers notice a rebuilt or removed index by its modification time.
+
+    File reads and writes happen outside the cache-wide lock.
+    """
+
+    def __init__(
+        self,
+        directory: str = f"{CACHE_DIR}/bm25",
+        max_size: int = BM25_INDEX_CACHE_SIZE,
+    ):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+        # collection -> [index mtime, delta bytes replayed, index]
+        self._indexes: OrderedDict[str, list] = OrderedDict()
+
+        # Bumped on every change to a collection (or to all of them) so builds
+        # started before it are not kept
+        self._versions: dict[str, int] = {}
+        self.version = 0
+
+        self._lock = threading.RLock()
+
+    def _get_version(self, collection_name: str) -> tuple[int, int]:
+        return (self.version, self._versions.get(collection_name, 0))
+
+    def _bump_version(self, collection_name: str):
+        self._versions[collection_name] = self._versions.get(collection_name, 0) + 1
+
+    def _get_path(self, collection_name: str) -> Path:
+        name = hashlib.sha256(collection_name.encode()).hexdigest()
+        return self.directory / f"{name}.pkl"
+
+    def _get_delta_path(self, path: Path) -> Path:
+        return path.with_suffix(".delta")
+
+    def _get_mtime(self, path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _save(self, path: Path, index: BM25Index) -> int:
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # The scan the index was built from includes the chunks of the delta
+        self._get_delta_path(path).unlink(missing_ok=True)
+
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return self._get_mtime(path)
+
+    def _load(self, path: Path) -> Optional[BM25Index]:
+        try:
+            with open(path, "rb") as f:
+                index = pickle.load(f)
+            if getattr(index, "format", None) != BM25Index.FORMAT:
+                raise ValueError("outdated format")
+            return index
+        except Exception as e:
+            log.warning(f"Discarding unreadable BM25 index {path}: {e}")
+            return None
+
+    def _append_delta(self, path: Path, items: list[dict]):
+        record = pickle.dumps(
+            (
+                [item["id"] for item in items],
+                [item["text"] for item in items],
+                [item["metadata"] for item in items],
+            ),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        # A single write in append mode, records of other workers don't interleave
+        with open(self._get_delta_path(path), "ab") as f:
+            f.write(record)
+
+    def _replay_delta(self, path: Path, index: BM25Index, offset: int) -> int:
+        """Adds the delta records after `offset` to `index`, returns the new offset."""
+        try:
+            with open(self._get_delta_path(path), "rb") as f:
+                f.seek(offset)
+                while True:
+                    try:
+                        ids, documents, metadatas = pickle.load(f)
+                    except (EOFError, pickle.UnpicklingError):
+                        # End of the file, or a record still being written
+                        break
+                    index.add(ids, documents, metadatas)
+                    offset = f.tell()
+        except FileNotFoundError:
+            pass
+        return offset
+
+    def _set(self, collection_name: str, mtime: int, offset: int, index: BM25Index):
+        self._indexes[collection_name] = [mtime, offset, index]
+        self._indexes.move_to_end(collection_name)
+        while len(self._indexes) > self.max_size:
+            self._indexes.popitem(last=False)
+
+    def get(self, collection_name: str) -> Optional[BM25Index]:
+        path = self._get_path(collection_name)
+
+        with self._lock:
+            mtime = self._get_mtime(path)
+            entry = self._indexes.get(collection_name)
+            if entry is not None and mtime is not None and entry[0] == mtime:
+                self._indexes.move_to_end(collection_name)
+            else:
+                entry = None
+            version = self._get_version(collection_name)
+
+        if entry is not None:
+            # Catch up with the chunks other workers appended
+            offset = self._replay_delta(path, entry[2], entry[1])
+            with self._lock:
+                entry[1] = max(entry[1], offset)
+            return entry[2]
+
+        index = self._load(path) if mtime is not None else None
+        built = index is None
+        offset = 0
+        if built:
+            result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+            if result is None:
+                return None
+
+            index = BM25Index()
+            index.add(result.ids[0], result.documents[0], result.metadatas[0])
+            log.info(f"Built BM25 index of {collection_name} ({len(index)} chunks)")
+        else:
+            offset = self._replay_delta(path, index, 0)
+
+        with self._lock:
+            if version != self._get_version(collection_name):
+                return index
+
+        if built:
+            mtime = self._save(path, index)
+
+        with self._lock:
+            if version == self._get_version(collection_name):
+                self._set(collection_name, mtime, offset, index)
+        return index
+
+    def add(self, collection_name: str, items: list[dict]):
+        path = self._get_path(collection_name)
+
+        with self._lock:
+            self._bump_version(collection_name)
+
+            if self._get_mtime(path) is None:
+                # Not built yet, the first search will scan the collection
+                self._indexes.pop(collection_name, None)
+                return
+
+            entry = self._indexes.get(collection_name)
+
+        self._append_delta(path, items)
+
+        if entry is not None:
+            # The cached index reads its own record again on the next `get()`,
+            # chunks it already has are skipped
+            entry[2].add(
+                [item["id"] for item in items],
+                [item["text"] for item in items],
+                [item["metadata"] for item in items],
+            )
+
+    def invalidate(self, collection_name: str):
+        with self._lock:
+            self._bump_version(collection_name)
+            self._indexes.pop(collection_name, None)
+            path = self._get_path(collection_name)
+            path.unlink(missing_ok=True)
+            self._get_delta_path(path).unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._indexes.clear()
+            for path in [
+                *self.directory.glob("*.pkl"),
+                *self.directory.glob("*.delta"),
+            ]:
+                path.unlink(missing_ok=True)
+
+
+BM25_INDEXES = BM25IndexCache()
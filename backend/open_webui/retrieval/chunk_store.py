@@ -0,0 +1,115 @@
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Callable, Optional
+
+from open_webui.models.chunks import Chunks
+from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.env import SRC_LOG_LEVELS, ENABLE_RAG_CHUNK_STORE
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class ChunkStore:
+    """
+    Content-addressed index of the chunk vectors in the vector DB, keyed by the
+    hash of the chunk text and the embedding engine and model.
+
+    Chunks already embedded for any collection, e.g. the same file added to
+    several knowledge bases or the sections two revisions of a document share,
+    get their vector copied from there instead of being embedded again. Entries
+    pointing at deleted collections are simply misses and get re-pointed once
+    the chunk is embedded again.
+    """
+
+    def __init__(self, enabled: bool = ENABLE_RAG_CHUNK_STORE):
+        self.enabled = enabled
+
+        self.reused = 0
+        self.embedded = 0
+
+    def get_key(self, text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get_vectors(self, engine: str, model: str, keys: list[str]) -> dict:
+        chunks = Chunks.get_chunks_by_hashes(engine, model, list(dict.fromkeys(keys)))
+
+        # collection_name -> {vector_id: key}
+        locations = defaultdict(dict)
+        for chunk in chunks:
+            locations[chunk.collection_name][chunk.vector_id] = chunk.hash
+
+        vectors = {}
+        for collection_name, ids in locations.items():
+            try:
+                stored = VECTOR_DB_CLIENT.get_vectors(collection_name, list(ids))
+            except Exception as e:
+                log.debug(f"Cannot get vectors from {collection_name}: {e}")
+                continue
+
+            for vector_id, vector in stored.items():
+                if vector_id in ids and vector is not None:
+                    vectors[ids[vector_id]] = list(vector)
+        return vectors
+
+    def embed(
+        self,
+        engine: str,
+        model: str,
+        texts: list[str],
+        embedding_function: Callable,
+        user=None,
+    ) -> Optional[list]:
+        if not self.enabled:
+            return embedding_function(texts, user=user)
+
+        keys = [self.get_key(text) for text in texts]
+        try:
+            vectors = self.get_vectors(engine, model, keys)
+        except Exception as e:
+            log.warning(f"Chunk store unavailable: {e}")
+            vectors = {}
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            embeddings = embedding_function(list(missing.values()), user=user)
+            if embeddings is None:
+                return None
+            vectors.update(zip(missing.keys(), embeddings))
+
+        self.reused += len(texts) - len(missing)
+        self.embedded += len(missing)
+        log.debug(f"Reused {len(texts) - len(missing)} of {len(texts)} chunk vectors")
+
+        return [vectors[key] for key in keys]
+
+    def add(
+        self,
+        engine: str,
+        model: str,
+        collection_name: str,
+        texts: list[str],
+        ids: list[str],
+    ):
+        if not self.enabled:
+            return
+
+        Chunks.upsert_chunks(
+            engine,
+            model,
+            collection_name,
+            {self.get_key(text): id for text, id in zip(texts, ids)},
+        )
+
+    def get_stats(self) -> dict:
+        total = self.reused + self.embedded
+        return {
+            "enabled": self.enabled,
+            "reused": self.reused,
+            "embedded": self.embedded,
+            "reuse_rate": self.reused / total if total else None,
+        }
+
+
+CHUNK_STORE = ChunkStore()
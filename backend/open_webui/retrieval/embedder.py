@@ -0,0 +1,236 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from open_webui.utils.upstream import get_origin
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    RAG_EMBEDDING_CONCURRENCY,
+    RAG_EMBEDDING_MAX_RETRIES,
+    RAG_EMBEDDING_TARGET_LATENCY,
+    RAG_EMBEDDING_MAX_BATCH_SIZE,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Longest wait between retries, whatever the upstream's Retry-After says
+MAX_RETRY_DELAY = 30
+
+
+class EmbeddingSessionPool:
+    """
+    `requests.Session`s for the embedding upstreams, one per origin, with enough
+    pooled connections for `RAG_EMBEDDING_CONCURRENCY` batches in flight.
+    """
+
+    def __init__(self, pool_maxsize: int = RAG_EMBEDDING_CONCURRENCY):
+        self.pool_maxsize = pool_maxsize
+
+        self._sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> requests.Session:
+        origin = get_origin(url)
+
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_maxsize
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[origin] = session
+        return session
+
+
+EMBEDDING_SESSIONS = EmbeddingSessionPool()
+
+
+def get_retry_delay(response: Optional[requests.Response], attempt: int) -> float:
+    if response is not None:
+        try:
+            delay = float(response.headers["Retry-After"])
+            if delay >= 0:
+                return min(delay, MAX_RETRY_DELAY)
+        except (KeyError, ValueError):
+            pass
+
+    # Exponential backoff with jitter: 0.5-1s, 1-2s, 2-4s, ...
+    return 0.5 * 2**attempt * random.uniform(1, 2)
+
+
+def post_with_retry(
+    url: str, max_retries: int = RAG_EMBEDDING_MAX_RETRIES, **kwargs
+) -> requests.Response:
+    session = EMBEDDING_SESSIONS.get(url)
+
+    for attempt in range(max_retries + 1):
+        response = None
+        try:
+            response = session.post(url, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            error = f"HTTP {response.status_code}"
+        except requests.ConnectionError as e:
+            if attempt == max_retries:
+                raise
+            error = str(e)
+
+        if attempt == max_retries:
+            return response
+
+        delay = get_retry_delay(response, attempt)
+        log.warning(f"Retrying {url} in {delay:.1f}s after {error}")
+        time.sleep(delay)
+
+
+class BatchEmbedder:
+    """
+    Splits the texts of one embedding request into batches and keeps up to
+    `concurrency` of them in flight, reassembling the embeddings in order.
+
+    The batch size adapts to the upstream between `min_batch_size` and
+    `max_batch_size`: it is halved when a batch takes longer than
+    `target_latency` and doubled when a full batch takes less than half of it.
+    Embedders are shared per upstream and model (see `get_batch_embedder`) so
+    what one document learned carries over to the next.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        concurrency: int = RAG_EMBEDDING_CONCURRENCY,
+        target_latency: float = RAG_EMBEDDING_TARGET_LATENCY,
+        max_batch_size: int = RAG_EMBEDDING_MAX_BATCH_SIZE,
+        min_batch_size: int = 1,
+    ):
+        self.batch_size = max(batch_size, 1)
+        self.concurrency = concurrency
+        self.target_latency = target_latency
+        self.max_batch_size = max(max_batch_size or self.batch_size, self.batch_size)
+        self.min_batch_size = min(min_batch_size, self.batch_size)
+
+        self.batches = 0
+        self.failures = 0
+        self.texts = 0
+        self.latency_ewma = None
+
+        self._lock = threading.Lock()
+
+    def _adapt(self, size: int, latency: float):
+        with self._lock:
+            self.batches += 1
+            self.texts += size
+            self.latency_ewma = (
+                latency
+                if self.latency_ewma is None
+                else 0.3 * latency + 0.7 * self.latency_ewma
+            )
+
+            if self.target_latency <= 0:
+                return
+
+            if latency > self.target_latency:
+                batch_size = max(size // 2, self.min_batch_size)
+            elif latency < self.target_latency / 2 and size >= self.batch_size:
+                batch_size = min(self.batch_size * 2, self.max_batch_size)
+            else:
+                return
+
+            if batch_size != self.batch_size:
+                log.debug(
+                    f"Embedding batch of {size} took {latency:.2f}s, "
+                    f"batch size {self.batch_size} -> {batch_size}"
+                )
+                self.batch_size = batch_size
+
+    def _embed_batch(self, embed: Callable, texts: list[str]) -> Optional[list]:
+        start = time.monotonic()
+        embeddings = embed(texts)
+        if embeddings is not None and len(embeddings) != len(texts):
+            # Misaligned with the texts, the embeddings cannot be placed
+            log.warning(
+                f"Embedding batch of {len(texts)} returned {len(embeddings)} embeddings"
+            )
+            embeddings = None
+
+        if embeddings is None:
+            with self._lock:
+                self.failures += 1
+            return None
+
+        self._adapt(len(texts), time.monotonic() - start)
+        return embeddings
+
+    def embed(self, texts: list[str], embed: Callable) -> Optional[list]:
+        """
+        Embeds `texts` with `embed(batch)`, which returns one embedding per
+        text or None on failure. Returns None if any batch failed.
+        """
+        if len(texts) <= self.batch_size or self.concurrency <= 1:
+            embeddings = []
+            while len(embeddings) < len(texts):
+                start = len(embeddings)
+                batch = self._embed_batch(embed, texts[start : start + self.batch_size])
+                if not batch:
+                    return None
+                embeddings.extend(batch)
+            return embeddings
+
+        embeddings = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            offsets = {}
+            start = 0
+            while start < len(texts) or offsets:
+                # Batches are cut when submitted so they use the latest size
+                while start < len(texts) and len(offsets) < self.concurrency:
+                    end = start + self.batch_size
+                    future = executor.submit(self._embed_batch, embed, texts[start:end])
+                    offsets[future] = start
+                    start = end
+
+                done, _ = wait(offsets, return_when=FIRST_COMPLETED)
+                for future in done:
+                    offset = offsets.pop(future)
+                    batch = future.result()
+                    if batch is None:
+                        for pending in offsets:
+                            pending.cancel()
+                        return None
+                    embeddings[offset : offset + len(batch)] = batch
+        return embeddings
+
+    def get_stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "max_batch_size": self.max_batch_size,
+            "concurrency": self.concurrency,
+            "batches": self.batches,
+            "failures": self.failures,
+            "texts": self.texts,
+            "latency_ewma": self.latency_ewma,
+        }
+
+
+BATCH_EMBEDDERS: dict[tuple, BatchEmbedder] = {}
+
+
+def get_batch_embedder(
+    engine: str, url: str, model: str, batch_size: int
+) -> BatchEmbedder:
+    key = (engine, url, model, batch_size)
+    embedder = BATCH_EMBEDDERS.get(key)
+    if embedder is None:
+        embedder = BATCH_EMBEDDERS.setdefault(key, BatchEmbedder(batch_size))
+    return embedder
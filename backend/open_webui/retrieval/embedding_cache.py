@@ -0,0 +1,294 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable
+
+import redis
+
+from open_webui.config import CACHE_DIR
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    EMBEDDING_CACHE_SIZE_MB,
+    EMBEDDING_CACHE_STORE,
+    EMBEDDING_CACHE_REDIS_URL,
+    EMBEDDING_CACHE_TTL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+def encode_embedding(embedding: list[float]) -> bytes:
+    return array("f", embedding).tobytes()
+
+
+def decode_embedding(value: bytes) -> array:
+    # Kept as float32, a quarter of the memory of a list of floats
+    embedding = array("f")
+    embedding.frombytes(value)
+    return embedding
+
+
+class SQLiteEmbeddingStore:
+    """
+    Embeddings in a SQLite file. Rows unused for `ttl` seconds are deleted, at
+    most once every `evict_interval` seconds; the last use of a row is only
+    recorded once every `touch_interval` seconds to keep reads cheap.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: int,
+        evict_interval: int = 60 * 60,
+        touch_interval: int = 60 * 60,
+    ):
+        self.ttl = ttl
+        self.evict_interval = evict_interval
+        self.touch_interval = touch_interval
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embedding "
+            "(key TEXT PRIMARY KEY, value BLOB, accessed_at INTEGER)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(embedding)")]
+        if "accessed_at" not in columns:
+            # Store created before eviction: its rows start their TTL now
+            self._conn.execute("ALTER TABLE embedding ADD COLUMN accessed_at INTEGER")
+            self._conn.execute(
+                "UPDATE embedding SET accessed_at = ?", (int(time.time()),)
+            )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embedding_accessed_at "
+            "ON embedding (accessed_at)"
+        )
+        self._conn.commit()
+
+        self._lock = threading.Lock()
+        self._evicted_at = 0.0
+        self.evict()
+
+    def get_many(self, keys: list[str]) -> dict[str, array]:
+        now = int(time.time())
+        rows = []
+        with self._lock:
+            # Stay below SQLite's limit on bound parameters
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                rows.extend(
+                    self._conn.execute(
+                        "SELECT key, value, accessed_at FROM embedding WHERE key IN "
+                        f"({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                )
+
+            touched = [
+                (now, key)
+                for key, _, accessed_at in rows
+                if (accessed_at or 0) < now - self.touch_interval
+            ]
+            if touched:
+                self._conn.executemany(
+                    "UPDATE embedding SET accessed_at = ? WHERE key = ?", touched
+                )
+                self._conn.commit()
+        return {key: decode_embedding(value) for key, value, _ in rows}
+
+    def set_many(self, embeddings: dict[str, array]):
+        now = int(time.time())
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding (key, value, accessed_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (key, encode_embedding(value), now)
+                    for key, value in embeddings.items()
+                ],
+            )
+            self._conn.commit()
+
+        if time.monotonic() - self._evicted_at >= self.evict_interval:
+            self.evict()
+
+    def evict(self):
+        with self._lock:
+            self._evicted_at = time.monotonic()
+            deleted = self._conn.execute(
+                "DELETE FROM embedding WHERE accessed_at < ?",
+                (int(time.time()) - self.ttl,),
+            ).rowcount
+            self._conn.commit()
+        if deleted:
+            log.debug(f"Evicted {deleted} embeddings from the disk cache")
+
+
+class RedisEmbeddingStore:
+    def __init__(self, redis_url: str, ttl: int, prefix: str = "open-webui:embedding"):
+        self.redis = redis.Redis.from_url(redis_url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get_many(self, keys: list[str]) -> dict[str, array]:
+        values = self.redis.mget([f"{self.prefix}:{key}" for key in keys])
+        return {
+            key: decode_embedding(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def set_many(self, embeddings: dict[str, array]):
+        pipe = self.redis.pipeline()
+        for key, value in embeddings.items():
+            pipe.set(f"{self.prefix}:{key}", encode_embedding(value), ex=self.ttl)
+        pipe.execute()
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by engine, model and a hash of the text: an in-process LRU
+    of float32 vectors, bounded to `max_bytes`, in front of an optional shared
+    `store` (SQLite file or Redis). Store errors are logged and treated as
+    misses.
+    """
+
+    def __init__(
+        self, max_bytes: int = int(EMBEDDING_CACHE_SIZE_MB * 1024 * 1024), store=None
+    ):
+        self.max_bytes = max_bytes
+        self.store = store
+
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+        self._embeddings: OrderedDict[str, array] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.store is not None
+
+    def get_key(self, engine: str, model: str, text: str) -> str:
+        return hashlib.sha256(f"{engine}\0{model}\0{text}".encode()).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict[str, array]:
+        keys = list(dict.fromkeys(keys))
+
+        embeddings = {}
+        with self._lock:
+            for key in keys:
+                if key in self._embeddings:
+                    self._embeddings.move_to_end(key)
+                    embeddings[key] = self._embeddings[key]
+            self.hits += len(embeddings)
+
+        missing = [key for key in keys if key not in embeddings]
+        if missing and self.store is not None:
+            try:
+                stored = self.store.get_many(missing)
+            except Exception as e:
+                log.warning(f"Embedding cache store unavailable: {e}")
+                stored = {}
+
+            self._set_many(stored)
+            embeddings.update(stored)
+            self.store_hits += len(stored)
+
+        self.misses += len(keys) - len(embeddings)
+        return embeddings
+
+    def _set_many(self, embeddings: dict[str, array]):
+        if self.max_bytes <= 0:
+            return
+
+        with self._lock:
+            for key, embedding in embeddings.items():
+                previous = self._embeddings.pop(key, None)
+                if previous is not None:
+                    self._bytes -= len(previous) * previous.itemsize
+                self._embeddings[key] = embedding
+                self._bytes += len(embedding) * embedding.itemsize
+            while self._bytes > self.max_bytes and self._embeddings:
+                _, evicted = self._embeddings.popitem(last=False)
+                self._bytes -= len(evicted) * evicted.itemsize
+
+    def set_many(self, embeddings: dict[str, list[float]]):
+        embeddings = {key: array("f", value) for key, value in embeddings.items()}
+        self._set_many(embeddings)
+
+        if self.store is not None:
+            try:
+                self.store.set_many(embeddings)
+            except Exception as e:
+                log.warning(f"Embedding cache store unavailable: {e}")
+
+    def wrap(self, embedding_function: Callable, engine: str, model: str) -> Callable:
+        if not self.enabled:
+            return embedding_function
+
+        def cached_embedding_function(query, user=None):
+            texts = query if isinstance(query, list) else [query]
+            keys = [self.get_key(engine, model, text) for text in texts]
+
+            embeddings = self.get_many(keys)
+
+            # Texts not cached yet, embedded in a single call
+            missing = {
+                key: text for key, text in zip(keys, texts) if key not in embeddings
+            }
+            if missing:
+                result = embedding_function(list(missing.values()), user=user)
+                if result is None:
+                    return None
+
+                computed = dict(zip(missing.keys(), result))
+                self.set_many(computed)
+                embeddings.update(computed)
+
+            result = [
+                (
+                    embeddings[key].tolist()
+                    if isinstance(embeddings[key], array)
+                    else embeddings[key]
+                )
+                for key in keys
+            ]
+            return result if isinstance(query, list) else result[0]
+
+        return cached_embedding_function
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.store_hits + self.misses
+        return {
+            "size": len(self._embeddings),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "store": EMBEDDING_CACHE_STORE or None,
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.store_hits) / lookups if lookups else None,
+        }
+
+
+def get_embedding_store():
+    try:
+        if EMBEDDING_CACHE_STORE == "disk":
+            return SQLiteEmbeddingStore(
+                f"{CACHE_DIR}/embeddings.db", EMBEDDING_CACHE_TTL
+            )
+        elif EMBEDDING_CACHE_STORE == "redis":
+            return RedisEmbeddingStore(EMBEDDING_CACHE_REDIS_URL, EMBEDDING_CACHE_TTL)
+    except Exception as e:
+        log.exception(f"Cannot open embedding cache store: {e}")
+    return None
+
+
+EMBEDDING_CACHE = EmbeddingCache(store=get_embedding_store())
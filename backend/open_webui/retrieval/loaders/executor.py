@@ -0,0 +1,259 @@
+import io
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import ftfy
+from langchain_core.documents import Document
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    CONTENT_EXTRACTION_WORKERS,
+    CONTENT_EXTRACTION_TIMEOUT,
+    CONTENT_EXTRACTION_MEMORY_LIMIT,
+    PDF_EXTRACTION_PAGES_PER_TASK,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+####################################
+# Worker process functions
+####################################
+
+
+def _init_worker(memory_limit: int):
+    if memory_limit > 0:
+        try:
+            import resource
+
+            limit = memory_limit * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except Exception as e:
+            log.warning(f"Could not limit extraction worker memory: {e}")
+
+
+def _load_file(
+    engine: str, kwargs: dict, filename: str, file_content_type: str, file_path: str
+) -> list[Document]:
+    # Imported here, the loaders module routes its loads through this one
+    from open_webui.retrieval.loaders.main import Loader
+
+    return Loader(engine, **kwargs).load_in_process(
+        filename, file_content_type, file_path
+    )
+
+
+def _count_pdf_pages(file_path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(file_path).pages)
+
+
+def _load_pdf_pages(
+    file_path: str, start: int, end: int, extract_images: bool
+) -> list[Document]:
+    from langchain_community.document_loaders.parsers.pdf import PyPDFParser
+    from langchain_core.document_loaders import Blob
+    from pypdf import PdfReader, PdfWriter
+
+    # Copy the pages into their own PDF so the parser only walks those
+    reader = PdfReader(file_path)
+    writer = PdfWriter()
+    for page in reader.pages[start:end]:
+        writer.add_page(page)
+
+    data = io.BytesIO()
+    writer.write(data)
+
+    parser = PyPDFParser(extract_images=extract_images)
+    docs = parser.parse(Blob.from_data(data.getvalue(), path=file_path))
+
+    return [
+        Document(
+            page_content=ftfy.fix_text(doc.page_content),
+            metadata={**doc.metadata, "page": start + doc.metadata.get("page", 0)},
+        )
+        for doc in docs
+    ]
+
+
+####################################
+# Executor
+####################################
+
+
+class ExtractionExecutor:
+    """
+    Runs document loaders in a pool of `workers` processes, so parsing large
+    files neither holds the GIL of the server nor blocks its event loop.
+
+    Each worker's address space is capped at `memory_limit` MB and a file taking
+    longer than `timeout` seconds is aborted. PDFs longer than
+    `pdf_pages_per_task` pages are split into page ranges extracted in parallel
+    and reassembled in page order.
+
+    Aborting a file terminates the pool, so other files extracting at the same
+    time are retried once on a fresh pool.
+    """
+
+    def __init__(
+        self,
+        workers: int = CONTENT_EXTRACTION_WORKERS,
+        timeout: float = CONTENT_EXTRACTION_TIMEOUT,
+        memory_limit: int = CONTENT_EXTRACTION_MEMORY_LIMIT,
+        pdf_pages_per_task: int = PDF_EXTRACTION_PAGES_PER_TASK,
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.pdf_pages_per_task = pdf_pages_per_task
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {"files": 0, "tasks": 0, "timeouts": 0, "failures": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Forking a process running threads and an event loop is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.memory_limit,),
+                )
+            return self._executor
+
+    def _reset(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+
+        # A task can't be cancelled once running, so its worker is killed
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _wait(self, executor, futures: list[Future], deadline: float) -> list:
+        try:
+            return [
+                future.result(timeout=max(deadline - time.monotonic(), 0))
+                for future in futures
+            ]
+        except TimeoutError:
+            self.stats["timeouts"] += 1
+            self._reset(executor)
+            raise Exception(f"Extraction timed out after {self.timeout} seconds")
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _load(
+        self,
+        engine: str,
+        kwargs: dict,
+        filename: str,
+        file_content_type: str,
+        file_path: str,
+    ) -> list[Document]:
+        executor = self._get_executor()
+        deadline = time.monotonic() + self.timeout
+
+        if filename.split(".")[-1].lower() == "pdf":
+            pages = self._wait(
+                executor,
+                [executor.submit(_count_pdf_pages, file_path)],
+                deadline,
+            )[0]
+
+            if pages > self.pdf_pages_per_task:
+                futures = [
+                    executor.submit(
+                        _load_pdf_pages,
+                        file_path,
+                        start,
+                        min(start + self.pdf_pages_per_task, pages),
+                        bool(kwargs.get("PDF_EXTRACT_IMAGES")),
+                    )
+                    for start in range(0, pages, self.pdf_pages_per_task)
+                ]
+                self.stats["tasks"] += len(futures)
+
+                # Futures are in page order, whichever worker finishes first
+                return [
+                    doc
+                    for docs in self._wait(executor, futures, deadline)
+                    for doc in docs
+                ]
+
+        self.stats["tasks"] += 1
+        return self._wait(
+            executor,
+            [
+                executor.submit(
+                    _load_file,
+                    engine,
+                    kwargs,
+                    filename,
+                    file_content_type,
+                    file_path,
+                )
+            ],
+            deadline,
+        )[0]
+
+    def load(
+        self,
+        engine: str,
+        kwargs: dict,
+        filename: str,
+        file_content_type: str,
+        file_path: str,
+    ) -> list[Document]:
+        self.stats["files"] += 1
+        try:
+            try:
+                return self._load(
+                    engine, kwargs, filename, file_content_type, file_path
+                )
+            except BrokenProcessPool:
+                # The pool was terminated, by another file or a crashed worker
+                log.warning(f"Extraction pool broke, retrying {filename}")
+                return self._load(
+                    engine, kwargs, filename, file_content_type, file_path
+                )
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "timeout": self.timeout,
+            "memory_limit": self.memory_limit,
+            "pdf_pages_per_task": self.pdf_pages_per_task,
+            **self.stats,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+EXTRACTION_EXECUTOR = ExtractionExecutor()
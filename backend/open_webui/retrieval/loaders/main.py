@@ -20,6 +20,7 @@ from langchain_community.document_loaders import (
 )
 from langchain_core.documents import Document
 from open_webui.env import SRC_LOG_LEVELS, GLOBAL_LOG_LEVEL
+from open_webui.retrieval.loaders.executor import EXTRACTION_EXECUTOR
 
 logging.basicConfig(stream=sys.stdout, level=GLOBAL_LOG_LEVEL)
 log = logging.getLogger(__name__)
@@ -122,6 +123,19 @@ class Loader:
 
     def load(
         self, filename: str, file_content_type: str, file_path: str
+    ) -> list[Document]:
+        # Tika does the parsing itself, other loaders run in worker processes
+        if not EXTRACTION_EXECUTOR.enabled or (
+            self.engine == "tika" and self.kwargs.get("TIKA_SERVER_URL")
+        ):
+            return self.load_in_process(filename, file_content_type, file_path)
+
+        return EXTRACTION_EXECUTOR.load(
+            self.engine, self.kwargs, filename, file_content_type, file_path
+        )
+
+    def load_in_process(
+        self, filename: str, file_content_type: str, file_path: str
     ) -> list[Document]:
         loader = self._get_loader(filename, file_content_type, file_path)
         docs = loader.load()
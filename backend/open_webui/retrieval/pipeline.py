@@ -0,0 +1,66 @@
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+from langchain_core.documents import Document
+
+from open_webui.env import SRC_LOG_LEVELS, RAG_INGESTION_WINDOW_SIZE
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+def iter_windows(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while window := list(itertools.islice(iterator, size)):
+        yield window
+
+
+def split_documents(text_splitter, docs: Iterable[Document]) -> Iterator[Document]:
+    # One document at a time so only its chunks are held in memory
+    for doc in docs:
+        yield from text_splitter.split_documents([doc])
+
+
+def run_ingestion_pipeline(
+    chunks: Iterable[Document],
+    embed: Callable[[list[Document]], list],
+    insert: Callable[[list[Document], list], None],
+    window_size: int = RAG_INGESTION_WINDOW_SIZE,
+    on_progress: Optional[Callable[[dict], None]] = None,
+) -> int:
+    """
+    Embeds and inserts `chunks` one window of `window_size` at a time. Window N
+    is inserted in the background while window N+1 is embedded, so at most two
+    windows of vectors are held in memory whatever the size of the document.
+
+    `on_progress` is called with `{"chunks": ..., "windows": ...}` each time a
+    window has been inserted. Returns the number of chunks inserted.
+    """
+    progress = {"chunks": 0, "windows": 0}
+
+    def wait_for(pending):
+        progress["chunks"] += pending.result()
+        progress["windows"] += 1
+        log.debug(f"Ingested {progress['chunks']} chunks")
+        if on_progress:
+            on_progress(dict(progress))
+
+    def insert_window(window, embeddings) -> int:
+        insert(window, embeddings)
+        return len(window)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = None
+        for window in iter_windows(chunks, window_size):
+            embeddings = embed(window)
+
+            if pending is not None:
+                wait_for(pending)
+            pending = executor.submit(insert_window, window, embeddings)
+
+        if pending is not None:
+            wait_for(pending)
+
+    return progress["chunks"]
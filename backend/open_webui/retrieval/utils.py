@@ -4,15 +4,18 @@ import uuid
 from typing import Optional, Union
 
 import asyncio
-import requests
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 from huggingface_hub import snapshot_download
 from langchain.retrievers import ContextualCompressionRetriever, EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 
 
 from open_webui.config import VECTOR_DB
+from open_webui.retrieval.bm25 import BM25_INDEXES
+from open_webui.retrieval.embedder import get_batch_embedder, post_with_retry
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
 from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
 from open_webui.utils.misc import get_last_user_message
 from open_webui.models.users import UserModel
@@ -58,6 +61,7 @@ class VectorSearchRetriever(BaseRetriever):
         for idx in range(len(ids)):
             results.append(
                 Document(
+                    id=ids[idx],
                     metadata=metadatas[idx],
                     page_content=documents[idx],
                 )
@@ -65,6 +69,26 @@ class VectorSearchRetriever(BaseRetriever):
         return results
 
 
+class BM25IndexRetriever(BaseRetriever):
+    index: Any
+    k: int
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        return [
+            Document(
+                id=self.index.ids[idx],
+                metadata=dict(self.index.metadatas[idx]),
+                page_content=self.index.documents[idx],
+            )
+            for idx, _ in self.index.search(query, self.k)
+        ]
+
+
 def query_doc(
     collection_name: str, query_embedding: list[float], k: int, user: UserModel = None
 ):
@@ -84,6 +108,31 @@ def query_doc(
         raise e
 
 
+def query_docs(
+    collection_name: str, query_embeddings: list[list[float]], k: int
+) -> list[dict]:
+    # Searches all query embeddings at once, one result per query
+    result = VECTOR_DB_CLIENT.search(
+        collection_name=collection_name,
+        vectors=query_embeddings,
+        limit=k,
+    )
+
+    if result is None:
+        return []
+
+    log.info(f"query_docs:result {result.ids} {result.metadatas}")
+    return [
+        {
+            "ids": [result.ids[idx]],
+            "distances": [result.distances[idx]],
+            "documents": [result.documents[idx]],
+            "metadatas": [result.metadatas[idx]],
+        }
+        for idx in range(len(result.ids))
+    ]
+
+
 def query_doc_with_hybrid_search(
     collection_name: str,
     query: str,
@@ -93,13 +142,11 @@ def query_doc_with_hybrid_search(
     r: float,
 ) -> dict:
     try:
-        result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+        index = BM25_INDEXES.get(collection_name)
+        if index is None:
+            raise Exception(f"Collection {collection_name} not found")
 
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=result.documents[0],
-            metadatas=result.metadatas[0],
-        )
-        bm25_retriever.k = k
+        bm25_retriever = BM25IndexRetriever(index=index, k=k)
 
         vector_search_retriever = VectorSearchRetriever(
             collection_name=collection_name,
@@ -115,6 +162,7 @@ def query_doc_with_hybrid_search(
             top_n=k,
             reranking_function=reranking_function,
             r_score=r,
+            collection_name=collection_name,
         )
 
         compression_retriever = ContextualCompressionRetriever(
@@ -187,22 +235,23 @@ def query_collection(
     k: int,
 ) -> dict:
     results = []
-    for query in queries:
-        query_embedding = embedding_function(query)
-        for collection_name in collection_names:
-            if collection_name:
-                try:
-                    result = query_doc(
-                        collection_name=collection_name,
-                        k=k,
-                        query_embedding=query_embedding,
-                    )
-                    if result is not None:
-                        results.append(result.model_dump())
-                except Exception as e:
-                    log.exception(f"Error when querying the collection: {e}")
-            else:
-                pass
+    query_embeddings = embedding_function(queries)
+
+    def process_collection(collection_name):
+        try:
+            return query_docs(
+                collection_name=collection_name,
+                query_embeddings=query_embeddings,
+                k=k,
+            )
+        except Exception as e:
+            log.exception(f"Error when querying the collection: {e}")
+            return []
+
+    collection_names = [name for name in collection_names if name]
+    with ThreadPoolExecutor() as executor:
+        for collection_results in executor.map(process_collection, collection_names):
+            results.extend(collection_results)
 
     if VECTOR_DB == "chroma":
         # Chroma uses unconventional cosine similarity, so we don't need to reverse the results
@@ -260,9 +309,18 @@ def get_embedding_function(
     url,
     key,
     embedding_batch_size,
+    cache: bool = True,
 ):
+    # Ingestion passes `cache=False`: its chunks rarely repeat and would evict
+    # the query embeddings, the chunk store already dedupes them
+    wrap = EMBEDDING_CACHE.wrap if cache else lambda function, *args: function
+
     if embedding_engine == "":
-        return lambda query, user=None: embedding_function.encode(query).tolist()
+        return wrap(
+            lambda query, user=None: embedding_function.encode(query).tolist(),
+            embedding_engine,
+            embedding_model,
+        )
     elif embedding_engine in ["ollama", "openai"]:
         func = lambda query, user=None: generate_embeddings(
             engine=embedding_engine,
@@ -273,18 +331,21 @@ def get_embedding_function(
             user=user,
         )
 
+        batch_embedder = get_batch_embedder(
+            embedding_engine, url, embedding_model, embedding_batch_size
+        )
+
         def generate_multiple(query, user, func):
             if isinstance(query, list):
-                embeddings = []
-                for i in range(0, len(query), embedding_batch_size):
-                    embeddings.extend(
-                        func(query[i : i + embedding_batch_size], user=user)
-                    )
-                return embeddings
+                return batch_embedder.embed(query, lambda texts: func(texts, user=user))
             else:
                 return func(query, user)
 
-        return lambda query, user=None: generate_multiple(query, user, func)
+        return wrap(
+            lambda query, user=None: generate_multiple(query, user, func),
+            embedding_engine,
+            embedding_model,
+        )
     else:
         raise ValueError(f"Unknown embedding engine: {embedding_engine}")
 
@@ -303,15 +364,49 @@ def get_sources_from_files(
     extracted_collections = []
     relevant_contexts = []
 
+    def query_file(file, collection_names):
+        context = None
+        try:
+            if file.get("type") == "text":
+                context = file["content"]
+            else:
+                if hybrid_search:
+                    try:
+                        context = query_collection_with_hybrid_search(
+                            collection_names=collection_names,
+                            queries=queries,
+                            embedding_function=embedding_function,
+                            k=k,
+                            reranking_function=reranking_function,
+                            r=r,
+                        )
+                    except Exception as e:
+                        log.debug(
+                            "Error when using hybrid search, using"
+                            " non hybrid search as fallback."
+                        )
+
+                if (not hybrid_search) or (context is None):
+                    context = query_collection(
+                        collection_names=collection_names,
+                        queries=queries,
+                        embedding_function=embedding_function,
+                        k=k,
+                    )
+        except Exception as e:
+            log.exception(e)
+        return context
+
+    # (file, context, collection names to query for the context) in file order
+    file_contexts = []
     for file in files:
         if file.get("context") == "full":
             context = {
                 "documents": [[file.get("file").get("data", {}).get("content")]],
                 "metadatas": [[{"file_id": file.get("id"), "name": file.get("name")}]],
             }
+            file_contexts.append((file, context, None))
         else:
-            context = None
-
             collection_names = []
             if file.get("type") == "collection":
                 if file.get("legacy"):
@@ -331,39 +426,21 @@ def get_sources_from_files(
                 log.debug(f"skipping {file} as it has already been extracted")
                 continue
 
-            try:
-                context = None
-                if file.get("type") == "text":
-                    context = file["content"]
-                else:
-                    if hybrid_search:
-                        try:
-                            context = query_collection_with_hybrid_search(
-                                collection_names=collection_names,
-                                queries=queries,
-                                embedding_function=embedding_function,
-                                k=k,
-                                reranking_function=reranking_function,
-                                r=r,
-                            )
-                        except Exception as e:
-                            log.debug(
-                                "Error when using hybrid search, using"
-                                " non hybrid search as fallback."
-                            )
-
-                    if (not hybrid_search) or (context is None):
-                        context = query_collection(
-                            collection_names=collection_names,
-                            queries=queries,
-                            embedding_function=embedding_function,
-                            k=k,
-                        )
-            except Exception as e:
-                log.exception(e)
-
+            file_contexts.append((file, None, collection_names))
             extracted_collections.extend(collection_names)
 
+    # Query the files concurrently
+    with ThreadPoolExecutor() as executor:
+        futures = [
+            executor.submit(query_file, file, collection_names)
+            for file, _, collection_names in file_contexts
+            if collection_names
+        ]
+
+    for file, context, collection_names in file_contexts:
+        if collection_names:
+            context = futures.pop(0).result()
+
         if context:
             if "data" in file:
                 del file["data"]
@@ -438,7 +515,7 @@ def generate_openai_batch_embeddings(
     user: UserModel = None,
 ) -> Optional[list[list[float]]]:
     try:
-        r = requests.post(
+        r = post_with_retry(
             f"{url}/embeddings",
             headers={
                 "Content-Type": "application/json",
@@ -471,7 +548,7 @@ def generate_ollama_batch_embeddings(
     model: str, texts: list[str], url: str, key: str = "", user: UserModel = None
 ) -> Optional[list[list[float]]]:
     try:
-        r = requests.post(
+        r = post_with_retry(
             f"{url}/api/embed",
             headers={
                 "Content-Type": "application/json",
@@ -538,11 +615,18 @@ from langchain_core.callbacks import Callbacks
 from langchain_core.documents import BaseDocumentCompressor, Document
 
 
+def cosine_similarity(query_embedding: np.ndarray, embeddings: np.ndarray):
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding)
+    return embeddings @ query_embedding / np.maximum(norms, 1e-12)
+
+
 class RerankCompressor(BaseDocumentCompressor):
     embedding_function: Any
     top_n: int
     reranking_function: Any
     r_score: float
+    # Collection the documents were retrieved from, to reuse their stored vectors
+    collection_name: Optional[str] = None
 
     class Config:
         extra = "forbid"
@@ -561,13 +645,13 @@ class RerankCompressor(BaseDocumentCompressor):
                 [(query, doc.page_content) for doc in documents]
             )
         else:
-            from sentence_transformers import util
-
-            query_embedding = self.embedding_function(query)
-            document_embedding = self.embedding_function(
-                [doc.page_content for doc in documents]
+            query_embedding = np.asarray(
+                self.embedding_function(query), dtype=np.float32
+            )
+            scores = cosine_similarity(
+                query_embedding,
+                self.get_document_embeddings(documents, len(query_embedding)),
             )
-            scores = util.cos_sim(query_embedding, document_embedding)[0]
 
         docs_with_scores = list(zip(documents, scores.tolist()))
         if self.r_score:
@@ -586,3 +670,34 @@ class RerankCompressor(BaseDocumentCompressor):
             )
             final_results.append(doc)
         return final_results
+
+    def get_document_embeddings(
+        self, documents: Sequence[Document], dimension: int
+    ) -> np.ndarray:
+        embeddings = np.zeros((len(documents), dimension), dtype=np.float32)
+
+        # Vectors stored at ingestion, fetched by chunk id in a single request
+        vectors = {}
+        ids = [doc.id for doc in documents if doc.id is not None]
+        if self.collection_name and ids:
+            try:
+                vectors = VECTOR_DB_CLIENT.get_vectors(
+                    collection_name=self.collection_name, ids=ids
+                )
+            except Exception as e:
+                log.warning(f"Cannot get stored vectors, re-embedding: {e}")
+
+        missing = []
+        for idx, doc in enumerate(documents):
+            vector = vectors.get(doc.id)
+            # pgvector stores vectors zero-padded to VECTOR_LENGTH
+            if vector is not None and len(vector) >= dimension:
+                embeddings[idx] = vector[:dimension]
+            else:
+                missing.append(idx)
+
+        if missing:
+            embeddings[missing] = self.embedding_function(
+                [documents[idx].page_content for idx in missing]
+            )
+        return embeddings
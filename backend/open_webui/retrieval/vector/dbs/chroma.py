@@ -120,6 +120,14 @@ class ChromaClient:
             )
         return None
 
+    def get_vectors(
+        self, collection_name: str, ids: list[str]
+    ) -> dict[str, list[float]]:
+        # Get the stored vectors of the items with the given ids.
+        collection = self.client.get_collection(name=collection_name)
+        result = collection.get(ids=ids, include=["embeddings"])
+        return dict(zip(result["ids"], result["embeddings"]))
+
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
         collection = self.client.get_or_create_collection(
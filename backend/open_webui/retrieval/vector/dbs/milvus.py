@@ -210,6 +210,18 @@ class MilvusClient:
         )
         return self._result_to_get_result([result])
 
+    def get_vectors(
+        self, collection_name: str, ids: list[str]
+    ) -> dict[str, list[float]]:
+        # Get the stored vectors of the items with the given ids.
+        collection_name = collection_name.replace("-", "_")
+        result = self.client.get(
+            collection_name=f"{self.collection_prefix}_{collection_name}",
+            ids=ids,
+            output_fields=["vector"],
+        )
+        return {item["id"]: item["vector"] for item in result}
+
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
         collection_name = collection_name.replace("-", "_")
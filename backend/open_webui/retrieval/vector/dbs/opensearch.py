@@ -46,7 +46,10 @@ class OpenSearchClient:
             metadatas.append(hit["_source"].get("metadata"))
 
         return SearchResult(
-            ids=ids, distances=distances, documents=documents, metadatas=metadatas
+            ids=[ids],
+            distances=[distances],
+            documents=[documents],
+            metadatas=[metadatas],
         )
 
     def _create_index(self, index_name: str, dimension: int):
@@ -89,29 +92,44 @@ class OpenSearchClient:
         self.client.indices.delete(index=f"{self.index_prefix}_{index_name}")
 
     def search(
-        self, index_name: str, vectors: list[list[float]], limit: int
+        self, collection_name: str, vectors: list[list[float]], limit: int
     ) -> Optional[SearchResult]:
-        query = {
-            "size": limit,
-            "_source": ["text", "metadata"],
-            "query": {
-                "script_score": {
-                    "query": {"match_all": {}},
-                    "script": {
-                        "source": "cosineSimilarity(params.vector, 'vector') + 1.0",
-                        "params": {
-                            "vector": vectors[0]
-                        },  # Assuming single query vector
+        # One search per query vector, sent in a single multi-search request
+        body = []
+        for vector in vectors:
+            body.append({"index": f"{self.index_prefix}_{collection_name}"})
+            body.append(
+                {
+                    "size": limit,
+                    "_source": ["text", "metadata"],
+                    "query": {
+                        "script_score": {
+                            "query": {"match_all": {}},
+                            "script": {
+                                "source": "cosineSimilarity(params.vector, 'vector') + 1.0",
+                                "params": {"vector": vector},
+                            },
+                        }
                     },
                 }
-            },
-        }
+            )
 
-        result = self.client.search(
-            index=f"{self.index_prefix}_{index_name}", body=query
-        )
+        result = self.client.msearch(body=body)
 
-        return self._result_to_search_result(result)
+        ids = []
+        distances = []
+        documents = []
+        metadatas = []
+        for response in result["responses"]:
+            search_result = self._result_to_search_result(response)
+            ids.extend(search_result.ids)
+            distances.extend(search_result.distances)
+            documents.extend(search_result.documents)
+            metadatas.extend(search_result.metadatas)
+
+        return SearchResult(
+            ids=ids, distances=distances, documents=documents, metadatas=metadatas
+        )
 
     def query(
         self, collection_name: str, filter: dict, limit: Optional[int] = None
@@ -153,6 +171,20 @@ class OpenSearchClient:
         )
         return self._result_to_get_result(result)
 
+    def get_vectors(
+        self, collection_name: str, ids: list[str]
+    ) -> dict[str, list[float]]:
+        result = self.client.mget(
+            index=f"{self.index_prefix}_{collection_name}",
+            body={"ids": ids},
+            _source=["vector"],
+        )
+        return {
+            doc["_id"]: doc["_source"]["vector"]
+            for doc in result["docs"]
+            if doc["found"]
+        }
+
     def insert(self, index_name: str, items: list[VectorItem]):
         if not self.has_index(index_name):
             self._create_index(index_name, dimension=len(items[0]["vector"]))
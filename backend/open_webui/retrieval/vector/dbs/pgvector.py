@@ -337,6 +337,24 @@ class PgvectorClient:
             print(f"Error during get: {e}")
             return None
 
+    def get_vectors(
+        self, collection_name: str, ids: List[str]
+    ) -> Dict[str, List[float]]:
+        try:
+            results = (
+                self.session.query(DocumentChunk.id, DocumentChunk.vector)
+                .filter(
+                    DocumentChunk.collection_name == collection_name,
+                    DocumentChunk.id.in_(ids),
+                )
+                .all()
+            )
+            # Vectors are stored padded to VECTOR_LENGTH
+            return {result.id: list(result.vector) for result in results}
+        except Exception as e:
+            print(f"Error during get_vectors: {e}")
+            return {}
+
     def delete(
         self,
         collection_name: str,
@@ -84,17 +84,30 @@ class QdrantClient:
         if limit is None:
             limit = NO_LIMIT  # otherwise qdrant would set limit to 10!
 
-        query_response = self.client.query_points(
+        query_responses = self.client.query_batch_points(
             collection_name=f"{self.collection_prefix}_{collection_name}",
-            query=vectors[0],
-            limit=limit,
+            requests=[
+                models.QueryRequest(query=vector, limit=limit, with_payload=True)
+                for vector in vectors
+            ],
         )
-        get_result = self._result_to_get_result(query_response.points)
+
+        ids = []
+        documents = []
+        metadatas = []
+        distances = []
+        for query_response in query_responses:
+            get_result = self._result_to_get_result(query_response.points)
+            ids.extend(get_result.ids)
+            documents.extend(get_result.documents)
+            metadatas.extend(get_result.metadatas)
+            distances.append([point.score for point in query_response.points])
+
         return SearchResult(
-            ids=get_result.ids,
-            documents=get_result.documents,
-            metadatas=get_result.metadatas,
-            distances=[[point.score for point in query_response.points]],
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            distances=distances,
         )
 
     def query(self, collection_name: str, filter: dict, limit: Optional[int] = None):
@@ -131,6 +144,18 @@ class QdrantClient:
         )
         return self._result_to_get_result(points.points)
 
+    def get_vectors(
+        self, collection_name: str, ids: list[str]
+    ) -> dict[str, list[float]]:
+        # Get the stored vectors of the items with the given ids.
+        points = self.client.retrieve(
+            collection_name=f"{self.collection_prefix}_{collection_name}",
+            ids=ids,
+            with_payload=False,
+            with_vectors=True,
+        )
+        return {str(point.id): point.vector for point in points}
+
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
         self._create_collection_if_not_exists(collection_name, len(items[0]["vector"]))
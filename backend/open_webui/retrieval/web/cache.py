@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    RAG_WEB_PAGE_CACHE_SIZE,
+    RAG_WEB_PAGE_CACHE_TTL,
+    RAG_WEB_SEARCH_CACHE_SIZE,
+    RAG_WEB_SEARCH_CACHE_TTL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class WebCache:
+    """
+    In-process LRU of `max_size` entries, each expiring `ttl` seconds after it
+    was set. Shared by all users, as web pages and search results don't depend
+    on who asked for them.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (expires_at, value)
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get_many(self, keys: list[Hashable]) -> dict:
+        values = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] < now:
+                    del self._entries[key]
+                    continue
+
+                self._entries.move_to_end(key)
+                values[key] = entry[1]
+
+            self.hits += len(values)
+            self.misses += len(keys) - len(values)
+        return values
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, values: dict):
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def set(self, key: Hashable, value: Any):
+        self.set_many({key: value})
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+# URL -> extracted page Document
+WEB_PAGE_CACHE = WebCache(RAG_WEB_PAGE_CACHE_SIZE, RAG_WEB_PAGE_CACHE_TTL)
+
+# (engine, query, result count, domain filter) -> list[SearchResult]
+WEB_SEARCH_CACHE = WebCache(RAG_WEB_SEARCH_CACHE_SIZE, RAG_WEB_SEARCH_CACHE_TTL)
+
+# Web search collection name -> URLs it was last built from
+WEB_SEARCH_COLLECTIONS = WebCache(RAG_WEB_SEARCH_CACHE_SIZE, RAG_WEB_PAGE_CACHE_TTL)
@@ -1,7 +1,12 @@
+import asyncio
 import socket
 import urllib.parse
 import validators
-from typing import Union, Sequence, Iterator
+from collections import defaultdict
+from typing import Optional, Union, Sequence, Iterator
+
+import aiohttp
+from bs4 import BeautifulSoup
 
 from langchain_community.document_loaders import (
     WebBaseLoader,
@@ -11,7 +16,12 @@ from langchain_core.documents import Document
 
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.config import ENABLE_RAG_LOCAL_WEB_FETCH
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    RAG_WEB_FETCH_DOMAIN_CONCURRENCY,
+    RAG_WEB_FETCH_TIMEOUT,
+)
+from open_webui.retrieval.web.cache import WEB_PAGE_CACHE
 
 import logging
 
@@ -66,30 +76,107 @@ def resolve_hostname(hostname):
 
 
 class SafeWebBaseLoader(WebBaseLoader):
-    """WebBaseLoader with enhanced error handling for URLs."""
-
-    def lazy_load(self) -> Iterator[Document]:
-        """Lazy load text from the url(s) in web_path with error handling."""
-        for path in self.web_paths:
+    """
+    WebBaseLoader with enhanced error handling for URLs.
+
+    Pages are fetched concurrently, at most `requests_per_second` at once and
+    `requests_per_domain` per domain, and kept in WEB_PAGE_CACHE so pages
+    fetched recently, by any user, are not fetched again.
+    """
+
+    def __init__(
+        self,
+        *args,
+        requests_per_domain: int = RAG_WEB_FETCH_DOMAIN_CONCURRENCY,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.requests_per_domain = requests_per_domain
+
+    def _parse(self, url: str, content: str) -> Document:
+        parser = "xml" if url.endswith(".xml") else self.default_parser
+        soup = BeautifulSoup(content, parser, **self.bs_kwargs)
+        text = soup.get_text(**self.bs_get_text_kwargs)
+
+        # Build metadata
+        metadata = {"source": url}
+        if title := soup.find("title"):
+            metadata["title"] = title.get_text()
+        if description := soup.find("meta", attrs={"name": "description"}):
+            metadata["description"] = description.get(
+                "content", "No description found."
+            )
+        if html := soup.find("html"):
+            metadata["language"] = html.get("lang", "No language found.")
+
+        return Document(page_content=text, metadata=metadata)
+
+    async def _fetch_page(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        semaphore: asyncio.Semaphore,
+        domain_semaphore: asyncio.Semaphore,
+    ) -> Optional[Document]:
+        async with semaphore, domain_semaphore:
             try:
-                soup = self._scrape(path, bs_kwargs=self.bs_kwargs)
-                text = soup.get_text(**self.bs_get_text_kwargs)
-
-                # Build metadata
-                metadata = {"source": path}
-                if title := soup.find("title"):
-                    metadata["title"] = title.get_text()
-                if description := soup.find("meta", attrs={"name": "description"}):
-                    metadata["description"] = description.get(
-                        "content", "No description found."
+                kwargs = {"headers": dict(self.session.headers)}
+                if not self.session.verify:
+                    kwargs["ssl"] = False
+
+                async with session.get(url, **kwargs) as response:
+                    if self.raise_for_status:
+                        response.raise_for_status()
+                    content = await response.text(
+                        encoding=self.encoding, errors="replace"
                     )
-                if html := soup.find("html"):
-                    metadata["language"] = html.get("lang", "No language found.")
 
-                yield Document(page_content=text, metadata=metadata)
+                return self._parse(url, content)
             except Exception as e:
                 # Log the error and continue with the next URL
-                log.error(f"Error loading {path}: {e}")
+                log.error(f"Error loading {url}: {e}")
+                return None
+
+    async def _fetch_pages(self, urls: list[str]) -> list[Optional[Document]]:
+        semaphore = asyncio.Semaphore(self.requests_per_second)
+        domain_semaphores = defaultdict(
+            lambda: asyncio.Semaphore(self.requests_per_domain)
+        )
+
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=RAG_WEB_FETCH_TIMEOUT),
+            trust_env=True,
+        ) as session:
+            return await asyncio.gather(
+                *[
+                    self._fetch_page(
+                        session,
+                        url,
+                        semaphore,
+                        domain_semaphores[urllib.parse.urlparse(url).netloc],
+                    )
+                    for url in urls
+                ]
+            )
+
+    def lazy_load(self) -> Iterator[Document]:
+        """Lazy load text from the url(s) in web_path with error handling."""
+        pages = WEB_PAGE_CACHE.get_many(self.web_paths)
+
+        missing = [path for path in dict.fromkeys(self.web_paths) if path not in pages]
+        if missing:
+            log.debug(f"Fetching {len(missing)} of {len(self.web_paths)} pages")
+            fetched = dict(zip(missing, asyncio.run(self._fetch_pages(missing))))
+
+            # Failed pages are tried again next time
+            fetched = {url: doc for url, doc in fetched.items() if doc is not None}
+            WEB_PAGE_CACHE.set_many(fetched)
+            pages.update(fetched)
+
+        for path in self.web_paths:
+            if doc := pages.get(path):
+                # Copied, the cached page is shared with other requests
+                yield Document(page_content=doc.page_content, metadata={**doc.metadata})
 
 
 def get_web_loader(
@@ -37,6 +37,7 @@ def upload_file(
     file: UploadFile = File(...),
     user=Depends(get_verified_user),
     file_metadata: dict = {},
+    background: bool = False,
 ):
     log.info(f"file.content_type: {file.content_type}")
     try:
@@ -66,6 +67,18 @@ def upload_file(
             ),
         )
 
+        # The file is processed by the job queue, clients follow `job_id`.
+        # If the job can't be stored, it is processed in the request instead.
+        job = (
+            request.app.state.JOB_QUEUE.enqueue(
+                user.id, "process_file", ProcessFileForm(file_id=id).model_dump()
+            )
+            if background
+            else None
+        )
+        if job is not None:
+            return FileModelResponse(**file_item.model_dump(), job_id=job.id)
+
         try:
             process_file(request, ProcessFileForm(file_id=id), user=user)
             file_item = Files.get_file_by_id(id=id)
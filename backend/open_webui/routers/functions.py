@@ -8,7 +8,13 @@ from open_webui.models.functions import (
     FunctionResponse,
     Functions,
 )
-from open_webui.utils.plugin import load_function_module_by_id, replace_imports
+from open_webui.utils.plugin import (
+    PLUGIN_CACHE,
+    get_function_module,
+    load_function_module_by_id,
+    replace_imports,
+    unload_plugin_module,
+)
 from open_webui.config import CACHE_DIR
 from open_webui.constants import ERROR_MESSAGES
 from fastapi import APIRouter, Depends, HTTPException, Request, status
@@ -72,6 +78,8 @@ async def create_new_function(
             function_cache_dir.mkdir(parents=True, exist_ok=True)
 
             if function:
+                request.app.state.MODEL_REGISTRY.invalidate()
+                PLUGIN_CACHE.invalidate()
                 return function
             else:
                 raise HTTPException(
@@ -115,7 +123,9 @@ async def get_function_by_id(id: str, user=Depends(get_admin_user)):
 
 
 @router.post("/id/{id}/toggle", response_model=Optional[FunctionModel])
-async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
+async def toggle_function_by_id(
+    request: Request, id: str, user=Depends(get_admin_user)
+):
     function = Functions.get_function_by_id(id)
     if function:
         function = Functions.update_function_by_id(
@@ -123,6 +133,8 @@ async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
         )
 
         if function:
+            request.app.state.MODEL_REGISTRY.invalidate()
+            PLUGIN_CACHE.invalidate()
             return function
         else:
             raise HTTPException(
@@ -142,7 +154,7 @@ async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
 
 
 @router.post("/id/{id}/toggle/global", response_model=Optional[FunctionModel])
-async def toggle_global_by_id(id: str, user=Depends(get_admin_user)):
+async def toggle_global_by_id(request: Request, id: str, user=Depends(get_admin_user)):
     function = Functions.get_function_by_id(id)
     if function:
         function = Functions.update_function_by_id(
@@ -150,6 +162,8 @@ async def toggle_global_by_id(id: str, user=Depends(get_admin_user)):
         )
 
         if function:
+            request.app.state.MODEL_REGISTRY.invalidate()
+            PLUGIN_CACHE.invalidate()
             return function
         else:
             raise HTTPException(
@@ -188,6 +202,8 @@ async def update_function_by_id(
         function = Functions.update_function_by_id(id, updated)
 
         if function:
+            request.app.state.MODEL_REGISTRY.invalidate()
+            PLUGIN_CACHE.invalidate()
             return function
         else:
             raise HTTPException(
@@ -211,12 +227,17 @@ async def update_function_by_id(
 async def delete_function_by_id(
     request: Request, id: str, user=Depends(get_admin_user)
 ):
+    function = Functions.get_function_by_id(id)
     result = Functions.delete_function_by_id(id)
 
     if result:
         FUNCTIONS = request.app.state.FUNCTIONS
         if id in FUNCTIONS:
             del FUNCTIONS[id]
+        unload_plugin_module(f"function_{id}", function.content if function else None)
+
+        request.app.state.MODEL_REGISTRY.invalidate()
+        PLUGIN_CACHE.invalidate()
 
     return result
 
@@ -256,11 +277,7 @@ async def get_function_valves_spec_by_id(
 ):
     function = Functions.get_function_by_id(id)
     if function:
-        if id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[id]
-        else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
-            request.app.state.FUNCTIONS[id] = function_module
+        function_module = get_function_module(request, id, function)
 
         if hasattr(function_module, "Valves"):
             Valves = function_module.Valves
@@ -284,11 +301,7 @@ async def update_function_valves_by_id(
 ):
     function = Functions.get_function_by_id(id)
     if function:
-        if id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[id]
-        else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
-            request.app.state.FUNCTIONS[id] = function_module
+        function_module = get_function_module(request, id, function)
 
         if hasattr(function_module, "Valves"):
             Valves = function_module.Valves
@@ -297,6 +310,8 @@ async def update_function_valves_by_id(
                 form_data = {k: v for k, v in form_data.items() if v is not None}
                 valves = Valves(**form_data)
                 Functions.update_function_valves_by_id(id, valves.model_dump())
+                request.app.state.MODEL_REGISTRY.invalidate()
+                PLUGIN_CACHE.invalidate()
                 return valves.model_dump()
             except Exception as e:
                 print(e)
@@ -347,11 +362,7 @@ async def get_function_user_valves_spec_by_id(
 ):
     function = Functions.get_function_by_id(id)
     if function:
-        if id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[id]
-        else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
-            request.app.state.FUNCTIONS[id] = function_module
+        function_module = get_function_module(request, id, function)
 
         if hasattr(function_module, "UserValves"):
             UserValves = function_module.UserValves
@@ -371,11 +382,7 @@ async def update_function_user_valves_by_id(
     function = Functions.get_function_by_id(id)
 
     if function:
-        if id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[id]
-        else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
-            request.app.state.FUNCTIONS[id] = function_module
+        function_module = get_function_module(request, id, function)
 
         if hasattr(function_module, "UserValves"):
             UserValves = function_module.UserValves
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import JSONResponse
 import logging
 
 from open_webui.models.knowledge import (
@@ -10,6 +11,7 @@ from open_webui.models.knowledge import (
     KnowledgeUserResponse,
 )
 from open_webui.models.files import Files, FileModel
+from open_webui.retrieval.bm25 import BM25_INDEXES
 from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
 from open_webui.routers.retrieval import (
     process_file,
@@ -21,6 +23,7 @@ from open_webui.storage.provider import Storage
 
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.utils.auth import get_verified_user
+from open_webui.utils.jobs import register_job_handler
 from open_webui.utils.access_control import has_access, has_permission
 
 
@@ -370,6 +373,7 @@ def update_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25_INDEXES.invalidate(knowledge.id)
 
     # Add content to the vector database
     try:
@@ -440,11 +444,13 @@ def remove_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25_INDEXES.invalidate(knowledge.id)
 
     # Remove the file's collection from vector database
     file_collection = f"file-{form_data.file_id}"
     if VECTOR_DB_CLIENT.has_collection(collection_name=file_collection):
         VECTOR_DB_CLIENT.delete_collection(collection_name=file_collection)
+        BM25_INDEXES.invalidate(file_collection)
 
     # Delete file from database
     Files.delete_file_by_id(form_data.file_id)
@@ -539,6 +545,7 @@ async def delete_knowledge_by_id(id: str, user=Depends(get_verified_user)):
     # Clean up vector DB
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEXES.invalidate(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -572,6 +579,7 @@ async def reset_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEXES.invalidate(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -591,6 +599,7 @@ def add_files_to_knowledge_batch(
     request: Request,
     id: str,
     form_data: list[KnowledgeFileIdForm],
+    background: bool = False,
     user=Depends(get_verified_user),
 ):
     """
@@ -625,6 +634,17 @@ def add_files_to_knowledge_batch(
             )
         files.append(file)
 
+    if background:
+        job = request.app.state.JOB_QUEUE.enqueue(
+            user.id,
+            "add_files_to_knowledge_batch",
+            {"knowledge_id": id, "file_ids": [file.id for file in files]},
+        )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": True, "job_id": job.id},
+        )
+
     # Process files
     try:
         result = process_files_batch(
@@ -666,3 +686,18 @@ def add_files_to_knowledge_batch(
     return KnowledgeFilesResponse(
         **knowledge.model_dump(), files=Files.get_files_by_ids(existing_file_ids)
     )
+
+
+@register_job_handler("add_files_to_knowledge_batch")
+def add_files_to_knowledge_batch_job(request: Request, user, data: dict) -> dict:
+    knowledge = add_files_to_knowledge_batch(
+        request,
+        data["knowledge_id"],
+        [KnowledgeFileIdForm(file_id=file_id) for file_id in data["file_ids"]],
+        user=user,
+    )
+    return {
+        "knowledge_id": knowledge.id,
+        "file_ids": (knowledge.data or {}).get("file_ids", []),
+        "warnings": getattr(knowledge, "warnings", None),
+    }
@@ -70,6 +70,7 @@ async def create_new_model(
     else:
         model = Models.insert_new_model(form_data, user.id)
         if model:
+            request.app.state.MODEL_REGISTRY.invalidate()
             return model
         else:
             raise HTTPException(
@@ -107,7 +108,9 @@ async def get_model_by_id(id: str, user=Depends(get_verified_user)):
 
 
 @router.post("/model/toggle", response_model=Optional[ModelResponse])
-async def toggle_model_by_id(id: str, user=Depends(get_verified_user)):
+async def toggle_model_by_id(
+    request: Request, id: str, user=Depends(get_verified_user)
+):
     model = Models.get_model_by_id(id)
     if model:
         if (
@@ -118,6 +121,7 @@ async def toggle_model_by_id(id: str, user=Depends(get_verified_user)):
             model = Models.toggle_model_by_id(id)
 
             if model:
+                request.app.state.MODEL_REGISTRY.invalidate()
                 return model
             else:
                 raise HTTPException(
@@ -143,6 +147,7 @@ async def toggle_model_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.post("/model/update", response_model=Optional[ModelModel])
 async def update_model_by_id(
+    request: Request,
     id: str,
     form_data: ModelForm,
     user=Depends(get_verified_user),
@@ -166,6 +171,7 @@ async def update_model_by_id(
         )
 
     model = Models.update_model_by_id(id, form_data)
+    request.app.state.MODEL_REGISTRY.invalidate()
     return model
 
 
@@ -175,7 +181,9 @@ async def update_model_by_id(
 
 
 @router.delete("/model/delete", response_model=bool)
-async def delete_model_by_id(id: str, user=Depends(get_verified_user)):
+async def delete_model_by_id(
+    request: Request, id: str, user=Depends(get_verified_user)
+):
     model = Models.get_model_by_id(id)
     if not model:
         raise HTTPException(
@@ -194,10 +202,12 @@ async def delete_model_by_id(id: str, user=Depends(get_verified_user)):
         )
 
     result = Models.delete_model_by_id(id)
+    request.app.state.MODEL_REGISTRY.invalidate()
     return result
 
 
 @router.delete("/delete/all", response_model=bool)
-async def delete_all_models(user=Depends(get_admin_user)):
+async def delete_all_models(request: Request, user=Depends(get_admin_user)):
     result = Models.delete_all_models()
+    request.app.state.MODEL_REGISTRY.invalidate()
     return result
@@ -1,12 +1,7 @@
-# TODO: Implement a more intelligent load balancing mechanism for distributing requests among multiple backend instances.
-# Current implementation uses a simple round-robin approach (random.choice). Consider incorporating algorithms like weighted round-robin,
-# least connections, or least response time for better resource utilization and performance optimization.
-
 import asyncio
 import json
 import logging
 import os
-import random
 import re
 import time
 from typing import Optional, Union
@@ -27,7 +22,7 @@ from fastapi import (
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, ConfigDict
-from starlette.background import BackgroundTask
+from starlette.background import BackgroundTask, BackgroundTasks
 
 
 from open_webui.models.models import Models
@@ -40,6 +35,8 @@ from open_webui.utils.payload import (
     apply_model_system_prompt_to_body,
 )
 from open_webui.utils.auth import get_admin_user, get_verified_user
+from open_webui.utils.balancer import UpstreamBalancer
+from open_webui.utils.upstream import UPSTREAM_SESSIONS, cleanup_response
 from open_webui.utils.access_control import has_access
 
 
@@ -52,12 +49,16 @@ from open_webui.env import (
     AIOHTTP_CLIENT_TIMEOUT,
     AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST,
     BYPASS_MODEL_ACCESS_CONTROL,
+    OLLAMA_BALANCER_MAX_RETRIES,
 )
 from open_webui.constants import ERROR_MESSAGES
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
 
+# Spreads requests across the OLLAMA_BASE_URLS serving the same model
+OLLAMA_BALANCER = UpstreamBalancer()
+
 
 ##########################################
 #
@@ -69,40 +70,34 @@ log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
 async def send_get_request(url, key=None):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(
-                url, headers={**({"Authorization": f"Bearer {key}"} if key else {})}
-            ) as response:
-                return await response.json()
+        session = UPSTREAM_SESSIONS.get(url)
+        async with session.get(
+            url,
+            headers={**({"Authorization": f"Bearer {key}"} if key else {})},
+            timeout=timeout,
+        ) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
         return None
 
 
-async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
-):
-    if response:
-        response.close()
-    if session:
-        await session.close()
-
-
 async def send_post_request(
     url: str,
     payload: Union[str, bytes],
     stream: bool = True,
     key: Optional[str] = None,
     content_type: Optional[str] = None,
+    base_url: Optional[str] = None,
 ):
+    # Load and health of `base_url` are tracked by OLLAMA_BALANCER, if given
+    started_at = OLLAMA_BALANCER.start(base_url) if base_url else None
+    streaming = False
 
     r = None
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = UPSTREAM_SESSIONS.get(url)
 
         r = await session.post(
             url,
@@ -111,29 +106,37 @@ async def send_post_request(
                 "Content-Type": "application/json",
                 **({"Authorization": f"Bearer {key}"} if key else {}),
             },
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
         )
         r.raise_for_status()
 
+        if base_url:
+            OLLAMA_BALANCER.succeed(base_url, started_at)
+
         if stream:
             response_headers = dict(r.headers)
 
             if content_type:
                 response_headers["Content-Type"] = content_type
 
+            streaming = True
             return StreamingResponse(
                 r.content,
                 status_code=r.status,
                 headers=response_headers,
                 background=BackgroundTask(
-                    cleanup_response, response=r, session=session
+                    cleanup_ollama_response, response=r, base_url=base_url
                 ),
             )
         else:
             res = await r.json()
-            await cleanup_response(r, session)
+            await cleanup_response(r)
             return res
 
     except Exception as e:
+        if base_url and (r is None or r.status >= 500):
+            OLLAMA_BALANCER.fail(base_url)
+
         detail = None
 
         if r is not None:
@@ -147,7 +150,30 @@ async def send_post_request(
         raise HTTPException(
             status_code=r.status if r else 500,
             detail=detail if detail else "BullBillion: Server Connection Error",
+        ) from e
+    finally:
+        if base_url and not streaming:
+            OLLAMA_BALANCER.finish(base_url)
+
+
+def invalidate_models_on_completion(request: Request, response):
+    # A streamed pull/push/create only changes the models once it completes
+    if isinstance(response, StreamingResponse):
+        response.background = BackgroundTasks(
+            tasks=[response.background] if response.background else []
         )
+        response.background.add_task(request.app.state.MODEL_REGISTRY.invalidate)
+    else:
+        request.app.state.MODEL_REGISTRY.invalidate()
+    return response
+
+
+async def cleanup_ollama_response(
+    response: Optional[aiohttp.ClientResponse], base_url: Optional[str]
+):
+    await cleanup_response(response)
+    if base_url:
+        OLLAMA_BALANCER.finish(base_url)
 
 
 def get_api_key(idx, url, configs):
@@ -246,6 +272,8 @@ async def update_config(
         if key in keys
     }
 
+    request.app.state.MODEL_REGISTRY.invalidate()
+
     return {
         "ENABLE_OLLAMA_API": request.app.state.config.ENABLE_OLLAMA_API,
         "OLLAMA_BASE_URLS": request.app.state.config.OLLAMA_BASE_URLS,
@@ -253,6 +281,11 @@ async def update_config(
     }
 
 
+@router.get("/balancer")
+async def get_balancer_stats(user=Depends(get_admin_user)):
+    return OLLAMA_BALANCER.get_stats()
+
+
 @cached(ttl=3)
 async def get_all_models(request: Request):
     log.info("get_all_models()")
@@ -505,11 +538,12 @@ async def pull_model(
     # Admin should be able to pull models from any source
     payload = {**form_data.model_dump(exclude_none=True), "insecure": True}
 
-    return await send_post_request(
+    response = await send_post_request(
         url=f"{url}/api/pull",
         payload=json.dumps(payload),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
     )
+    return invalidate_models_on_completion(request, response)
 
 
 class PushModelForm(BaseModel):
@@ -541,11 +575,12 @@ async def push_model(
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     log.debug(f"url: {url}")
 
-    return await send_post_request(
+    response = await send_post_request(
         url=f"{url}/api/push",
         payload=form_data.model_dump_json(exclude_none=True).encode(),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
     )
+    return invalidate_models_on_completion(request, response)
 
 
 class CreateModelForm(BaseModel):
@@ -567,11 +602,12 @@ async def create_model(
     log.debug(f"form_data: {form_data}")
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
 
-    return await send_post_request(
+    response = await send_post_request(
         url=f"{url}/api/create",
         payload=form_data.model_dump_json(exclude_none=True).encode(),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
     )
+    return invalidate_models_on_completion(request, response)
 
 
 class CopyModelForm(BaseModel):
@@ -615,6 +651,7 @@ async def copy_model(
         r.raise_for_status()
 
         log.debug(f"r.text: {r.text}")
+        request.app.state.MODEL_REGISTRY.invalidate()
         return True
     except Exception as e:
         log.exception(e)
@@ -670,6 +707,7 @@ async def delete_model(
         r.raise_for_status()
 
         log.debug(f"r.text: {r.text}")
+        request.app.state.MODEL_REGISTRY.invalidate()
         return True
     except Exception as e:
         log.exception(e)
@@ -702,9 +740,7 @@ async def show_model_info(
             detail=ERROR_MESSAGES.MODEL_NOT_FOUND(form_data.name),
         )
 
-    url_idx = random.choice(models[form_data.name]["urls"])
-
-    url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
+    url, url_idx = await get_ollama_url(request, form_data.name)
     key = get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS)
 
     try:
@@ -756,56 +792,22 @@ async def embed(
 ):
     log.info(f"generate_ollama_batch_embeddings {form_data}")
 
+    payload = form_data.model_dump(exclude_none=True)
+
     if url_idx is None:
         await get_all_models(request)
-        models = request.app.state.OLLAMA_MODELS
-
-        model = form_data.model
-
-        if ":" not in model:
-            model = f"{model}:latest"
-
-        if model in models:
-            url_idx = random.choice(models[model]["urls"])
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=ERROR_MESSAGES.MODEL_NOT_FOUND(form_data.model),
-            )
-
-    url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
-    key = get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS)
-
-    try:
-        r = requests.request(
-            method="POST",
-            url=f"{url}/api/embed",
-            headers={
-                "Content-Type": "application/json",
-                **({"Authorization": f"Bearer {key}"} if key else {}),
-            },
-            data=form_data.model_dump_json(exclude_none=True).encode(),
-        )
-        r.raise_for_status()
-
-        data = r.json()
-        return data
-    except Exception as e:
-        log.exception(e)
 
-        detail = None
-        if r is not None:
-            try:
-                res = r.json()
-                if "error" in res:
-                    detail = f"Ollama: {res['error']}"
-            except Exception:
-                detail = f"Ollama: {e}"
+        if ":" not in payload["model"]:
+            payload["model"] = f"{payload['model']}:latest"
 
-        raise HTTPException(
-            status_code=r.status_code if r else 500,
-            detail=detail if detail else "BullBillion: Server Connection Error",
-        )
+    return await send_balanced_post_request(
+        request,
+        "/api/embed",
+        payload,
+        url_idx=url_idx,
+        stream=False,
+        idempotent=True,
+    )
 
 
 class GenerateEmbeddingsForm(BaseModel):
@@ -825,56 +827,22 @@ async def embeddings(
 ):
     log.info(f"generate_ollama_embeddings {form_data}")
 
+    payload = form_data.model_dump(exclude_none=True)
+
     if url_idx is None:
         await get_all_models(request)
-        models = request.app.state.OLLAMA_MODELS
-
-        model = form_data.model
 
-        if ":" not in model:
-            model = f"{model}:latest"
-
-        if model in models:
-            url_idx = random.choice(models[model]["urls"])
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=ERROR_MESSAGES.MODEL_NOT_FOUND(form_data.model),
-            )
+        if ":" not in payload["model"]:
+            payload["model"] = f"{payload['model']}:latest"
 
-    url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
-    key = get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS)
-
-    try:
-        r = requests.request(
-            method="POST",
-            url=f"{url}/api/embeddings",
-            headers={
-                "Content-Type": "application/json",
-                **({"Authorization": f"Bearer {key}"} if key else {}),
-            },
-            data=form_data.model_dump_json(exclude_none=True).encode(),
-        )
-        r.raise_for_status()
-
-        data = r.json()
-        return data
-    except Exception as e:
-        log.exception(e)
-
-        detail = None
-        if r is not None:
-            try:
-                res = r.json()
-                if "error" in res:
-                    detail = f"Ollama: {res['error']}"
-            except Exception:
-                detail = f"Ollama: {e}"
-
-        raise HTTPException(
-            status_code=r.status_code if r else 500,
-            detail=detail if detail else "BullBillion: Server Connection Error",
-        )
+    return await send_balanced_post_request(
+        request,
+        "/api/embeddings",
+        payload,
+        url_idx=url_idx,
+        stream=False,
+        idempotent=True,
+    )
 
 
 class GenerateCompletionForm(BaseModel):
@@ -900,37 +868,19 @@ async def generate_completion(
     url_idx: Optional[int] = None,
     user=Depends(get_verified_user),
 ):
+    payload = form_data.model_dump(exclude_none=True)
+
     if url_idx is None:
         await get_all_models(request)
-        models = request.app.state.OLLAMA_MODELS
-
-        model = form_data.model
 
-        if ":" not in model:
-            model = f"{model}:latest"
+        if ":" not in payload["model"]:
+            payload["model"] = f"{payload['model']}:latest"
 
-        if model in models:
-            url_idx = random.choice(models[model]["urls"])
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=ERROR_MESSAGES.MODEL_NOT_FOUND(form_data.model),
-            )
-
-    url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
-    api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
-        str(url_idx),
-        request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
-    )
-
-    prefix_id = api_config.get("prefix_id", None)
-    if prefix_id:
-        form_data.model = form_data.model.replace(f"{prefix_id}.", "")
-
-    return await send_post_request(
-        url=f"{url}/api/generate",
-        payload=form_data.model_dump_json(exclude_none=True).encode(),
-        key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
+    return await send_balanced_post_request(
+        request,
+        "/api/generate",
+        payload,
+        url_idx=url_idx,
     )
 
 
@@ -952,19 +902,102 @@ class GenerateChatCompletionForm(BaseModel):
     tools: Optional[list[dict]] = None
 
 
-async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] = None):
+def get_api_config(request: Request, url_idx: int) -> dict:
+    url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
+    return request.app.state.config.OLLAMA_API_CONFIGS.get(
+        str(url_idx),
+        request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
+    )
+
+
+def get_model_url_idxs(request: Request, model: str) -> list[int]:
+    models = request.app.state.OLLAMA_MODELS
+    if model not in models:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
+        )
+    return models[model].get("urls", [])
+
+
+async def get_ollama_url(
+    request: Request,
+    model: str,
+    url_idx: Optional[int] = None,
+    exclude: Optional[list[int]] = None,
+):
     if url_idx is None:
-        models = request.app.state.OLLAMA_MODELS
-        if model not in models:
-            raise HTTPException(
-                status_code=400,
-                detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
-            )
-        url_idx = random.choice(models[model].get("urls", []))
+        url_idxs = [
+            idx
+            for idx in get_model_url_idxs(request, model)
+            if idx not in (exclude or [])
+        ]
+        urls = [request.app.state.config.OLLAMA_BASE_URLS[idx] for idx in url_idxs]
+
+        url = OLLAMA_BALANCER.choose(
+            urls,
+            weights=[get_api_config(request, idx).get("weight", 1) for idx in url_idxs],
+        )
+        url_idx = url_idxs[urls.index(url)]
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     return url, url_idx
 
 
+async def send_balanced_post_request(
+    request: Request,
+    path: str,
+    payload: dict,
+    url_idx: Optional[int] = None,
+    stream: bool = True,
+    content_type: Optional[str] = None,
+    idempotent: bool = False,
+):
+    """
+    Sends `payload` to `path` on a replica serving `payload["model"]`, picked by
+    OLLAMA_BALANCER unless `url_idx` is given.
+
+    Requests that could not reach their replica are retried on another one, as
+    are server errors of `idempotent` requests, up to OLLAMA_BALANCER_MAX_RETRIES
+    times.
+    """
+    model = payload["model"]
+    pinned = url_idx is not None
+    tried = []
+
+    while True:
+        url, url_idx = await get_ollama_url(request, model, url_idx, exclude=tried)
+        tried.append(url_idx)
+
+        body = payload
+        prefix_id = get_api_config(request, url_idx).get("prefix_id", None)
+        if prefix_id:
+            body = {**payload, "model": model.replace(f"{prefix_id}.", "")}
+
+        try:
+            return await send_post_request(
+                url=f"{url}{path}",
+                payload=json.dumps(body),
+                stream=stream,
+                key=get_api_key(
+                    url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS
+                ),
+                content_type=content_type,
+                base_url=url,
+            )
+        except HTTPException as e:
+            retryable = isinstance(e.__cause__, aiohttp.ClientConnectorError) or (
+                idempotent and e.status_code >= 500
+            )
+            if pinned or not retryable or len(tried) > OLLAMA_BALANCER_MAX_RETRIES:
+                raise
+
+            if all(idx in tried for idx in get_model_url_idxs(request, model)):
+                raise
+
+            log.warning(f"Retrying {path} on another replica after: {e.detail}")
+            url_idx = None
+
+
 @router.post("/api/chat")
 @router.post("/api/chat/{url_idx}")
 async def generate_chat_completion(
@@ -1031,21 +1064,12 @@ async def generate_chat_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url, url_idx = await get_ollama_url(request, payload["model"], url_idx)
-    api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
-        str(url_idx),
-        request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
-    )
-
-    prefix_id = api_config.get("prefix_id", None)
-    if prefix_id:
-        payload["model"] = payload["model"].replace(f"{prefix_id}.", "")
-
-    return await send_post_request(
-        url=f"{url}/api/chat",
-        payload=json.dumps(payload),
+    return await send_balanced_post_request(
+        request,
+        "/api/chat",
+        payload,
+        url_idx=url_idx,
         stream=form_data.stream,
-        key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         content_type="application/x-ndjson",
     )
 
@@ -1133,22 +1157,12 @@ async def generate_openai_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url, url_idx = await get_ollama_url(request, payload["model"], url_idx)
-    api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
-        str(url_idx),
-        request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
-    )
-
-    prefix_id = api_config.get("prefix_id", None)
-
-    if prefix_id:
-        payload["model"] = payload["model"].replace(f"{prefix_id}.", "")
-
-    return await send_post_request(
-        url=f"{url}/v1/completions",
-        payload=json.dumps(payload),
+    return await send_balanced_post_request(
+        request,
+        "/v1/completions",
+        payload,
+        url_idx=url_idx,
         stream=payload.get("stream", False),
-        key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
     )
 
 
@@ -1212,21 +1226,12 @@ async def generate_openai_chat_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url, url_idx = await get_ollama_url(request, payload["model"], url_idx)
-    api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
-        str(url_idx),
-        request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
-    )
-
-    prefix_id = api_config.get("prefix_id", None)
-    if prefix_id:
-        payload["model"] = payload["model"].replace(f"{prefix_id}.", "")
-
-    return await send_post_request(
-        url=f"{url}/v1/chat/completions",
-        payload=json.dumps(payload),
+    return await send_balanced_post_request(
+        request,
+        "/v1/chat/completions",
+        payload,
+        url_idx=url_idx,
         stream=payload.get("stream", False),
-        key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
     )
 
 
@@ -1403,6 +1408,7 @@ async def download_model(
 
         return StreamingResponse(
             download_file_stream(url, form_data.url, file_path, file_name),
+            background=BackgroundTask(request.app.state.MODEL_REGISTRY.invalidate),
         )
     else:
         return None
@@ -1504,4 +1510,8 @@ async def upload_model(
             res = {"error": str(e)}
             yield f"data: {json.dumps(res)}\n\n"
 
-    return StreamingResponse(file_process_stream(), media_type="text/event-stream")
+    return StreamingResponse(
+        file_process_stream(),
+        media_type="text/event-stream",
+        background=BackgroundTask(request.app.state.MODEL_REGISTRY.invalidate),
+    )
@@ -10,14 +10,21 @@ from fastapi import (
     APIRouter,
 )
 import os
+import asyncio
 import logging
 import shutil
+import aiohttp
 import requests
 from pydantic import BaseModel
 from starlette.responses import FileResponse
-from typing import Optional
+from typing import Any, Optional
 
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    PIPELINE_FILTER_TIMEOUT,
+    PIPELINE_FILTER_FAILURE_THRESHOLD,
+    PIPELINE_FILTER_EJECT_COOLDOWN,
+)
 from open_webui.config import CACHE_DIR
 from open_webui.constants import ERROR_MESSAGES
 
@@ -25,10 +32,18 @@ from open_webui.constants import ERROR_MESSAGES
 from open_webui.routers.openai import get_all_models_responses
 
 from open_webui.utils.auth import get_admin_user
+from open_webui.utils.balancer import UpstreamBalancer
+from open_webui.utils.upstream import UPSTREAM_SESSIONS
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
+# Health of the pipelines servers, whose filters are skipped while failing
+PIPELINE_SERVERS = UpstreamBalancer(
+    failure_threshold=PIPELINE_FILTER_FAILURE_THRESHOLD,
+    cooldown=PIPELINE_FILTER_EJECT_COOLDOWN,
+)
+
 
 ##################################
 #
@@ -56,52 +71,110 @@ def get_sorted_filters(model_id, models):
     return sorted_filters
 
 
-def process_pipeline_inlet_filter(request, payload, user, models):
-    user = {"id": user.id, "email": user.email, "name": user.name, "role": user.role}
-    model_id = payload["model"]
+def get_filter_groups(filters: list[dict]) -> list[list[dict]]:
+    # Consecutive filters declared independent of each other run concurrently
+    groups = []
+    for filter in filters:
+        independent = filter.get("pipeline", {}).get("independent", False)
+        if (
+            independent
+            and groups
+            and groups[-1][-1].get("pipeline", {}).get("independent", False)
+        ):
+            groups[-1].append(filter)
+        else:
+            groups.append([filter])
+    return groups
+
+
+def merge_filter_results(payload: dict, results: list[dict]) -> dict:
+    # Keys changed by independent filters, the later in priority order winning
+    merged = {**payload}
+    for result in results:
+        merged.update(
+            {key: value for key, value in result.items() if payload.get(key) != value}
+        )
+    return merged
 
-    sorted_filters = get_sorted_filters(model_id, models)
-    model = models[model_id]
 
-    if "pipeline" in model:
-        sorted_filters.append(model)
+async def send_filter_request(
+    request, filter, filter_type, user, payload
+) -> Optional[tuple[int, Any]]:
+    """
+    Posts `payload` to the `filter_type` endpoint of a pipeline filter and
+    returns the status and JSON body of the response, or None if the filter
+    was skipped: no API key, or its pipelines server failing or unreachable.
+    """
+    urlIdx = filter["urlIdx"]
 
-    for filter in sorted_filters:
-        r = None
-        try:
-            urlIdx = filter["urlIdx"]
+    url = request.app.state.config.OPENAI_API_BASE_URLS[urlIdx]
+    key = request.app.state.config.OPENAI_API_KEYS[urlIdx]
 
-            url = request.app.state.config.OPENAI_API_BASE_URLS[urlIdx]
-            key = request.app.state.config.OPENAI_API_KEYS[urlIdx]
+    if key == "":
+        return None
 
-            if key == "":
-                continue
+    if PIPELINE_SERVERS.is_ejected(url):
+        log.debug(f"Skipping {filter_type} filter {filter['id']}, {url} is failing")
+        return None
 
-            headers = {"Authorization": f"Bearer {key}"}
-            r = requests.post(
-                f"{url}/{filter['id']}/filter/inlet",
-                headers=headers,
-                json={
-                    "user": user,
-                    "body": payload,
-                },
-            )
+    timeout = filter.get("pipeline", {}).get("timeout") or PIPELINE_FILTER_TIMEOUT
+    started_at = PIPELINE_SERVERS.start(url)
+    try:
+        session = UPSTREAM_SESSIONS.get(url)
+        async with session.post(
+            f"{url}/{filter['id']}/filter/{filter_type}",
+            headers={"Authorization": f"Bearer {key}"},
+            json={
+                "user": user,
+                "body": payload,
+            },
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as r:
+            if r.status >= 500:
+                PIPELINE_SERVERS.fail(url)
+            else:
+                PIPELINE_SERVERS.succeed(url, started_at)
 
-            r.raise_for_status()
-            payload = r.json()
-        except Exception as e:
-            # Handle connection error here
-            print(f"Connection error: {e}")
+            try:
+                res = await r.json(content_type=None)
+            except Exception:
+                res = None
+            return r.status, res
+    except Exception as e:
+        # Handle connection error here
+        log.warning(f"Connection error: {e}")
+        PIPELINE_SERVERS.fail(url)
+        return None
+    finally:
+        PIPELINE_SERVERS.finish(url)
 
-            if r is not None:
-                res = r.json()
-                if "detail" in res:
-                    raise Exception(r.status_code, res["detail"])
+
+async def process_pipeline_filters(request, filters, filter_type, payload, user):
+    async def run_filter(filter):
+        res = await send_filter_request(request, filter, filter_type, user, payload)
+        if res is None:
+            return payload
+
+        status, data = res
+        if status < 400 and isinstance(data, dict):
+            return data
+        if isinstance(data, dict) and "detail" in data:
+            raise Exception(status, data["detail"])
+
+        log.warning(f"Error in {filter_type} filter {filter['id']}: {status}")
+        return payload
+
+    for group in get_filter_groups(filters):
+        results = await asyncio.gather(*[run_filter(filter) for filter in group])
+        if len(results) == 1:
+            payload = results[0]
+        else:
+            payload = merge_filter_results(payload, results)
 
     return payload
 
 
-def process_pipeline_outlet_filter(request, payload, user, models):
+async def process_pipeline_inlet_filter(request, payload, user, models):
     user = {"id": user.id, "email": user.email, "name": user.name, "role": user.role}
     model_id = payload["model"]
 
@@ -109,45 +182,26 @@ def process_pipeline_outlet_filter(request, payload, user, models):
     model = models[model_id]
 
     if "pipeline" in model:
-        sorted_filters = [model] + sorted_filters
+        sorted_filters.append(model)
 
-    for filter in sorted_filters:
-        r = None
-        try:
-            urlIdx = filter["urlIdx"]
-
-            url = request.app.state.config.OPENAI_API_BASE_URLS[urlIdx]
-            key = request.app.state.config.OPENAI_API_KEYS[urlIdx]
-
-            if key != "":
-                r = requests.post(
-                    f"{url}/{filter['id']}/filter/outlet",
-                    headers={"Authorization": f"Bearer {key}"},
-                    json={
-                        "user": user,
-                        "body": payload,
-                    },
-                )
-
-                r.raise_for_status()
-                data = r.json()
-                payload = data
-        except Exception as e:
-            # Handle connection error here
-            print(f"Connection error: {e}")
-
-            if r is not None:
-                try:
-                    res = r.json()
-                    if "detail" in res:
-                        return Exception(r.status_code, res)
-                except Exception:
-                    pass
+    return await process_pipeline_filters(
+        request, sorted_filters, "inlet", payload, user
+    )
 
-            else:
-                pass
 
-    return payload
+async def process_pipeline_outlet_filter(request, payload, user, models):
+    user = {"id": user.id, "email": user.email, "name": user.name, "role": user.role}
+    model_id = payload["model"]
+
+    sorted_filters = get_sorted_filters(model_id, models)
+    model = models[model_id]
+
+    if "pipeline" in model:
+        sorted_filters = [model] + sorted_filters
+
+    return await process_pipeline_filters(
+        request, sorted_filters, "outlet", payload, user
+    )
 
 
 ##################################
@@ -181,6 +235,11 @@ async def get_pipelines_list(request: Request, user=Depends(get_admin_user)):
     }
 
 
+@router.get("/filters/health")
+async def get_pipeline_filters_health(user=Depends(get_admin_user)):
+    return PIPELINE_SERVERS.get_stats()["backends"]
+
+
 @router.post("/upload")
 async def upload_pipeline(
     request: Request,
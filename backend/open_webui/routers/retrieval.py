@@ -1,3 +1,4 @@
+import itertools
 import json
 import logging
 import mimetypes
@@ -7,7 +8,7 @@ import shutil
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Iterator, List, Optional, Sequence, Union
+from typing import Callable, Iterator, List, Optional, Sequence, Union
 
 from fastapi import (
     Depends,
@@ -21,6 +22,7 @@ from fastapi import (
     APIRouter,
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import tiktoken
 
@@ -28,19 +30,32 @@ import tiktoken
 from langchain.text_splitter import RecursiveCharacterTextSplitter, TokenTextSplitter
 from langchain_core.documents import Document
 
+from open_webui.models.chunks import Chunks
 from open_webui.models.files import FileModel, Files
+from open_webui.models.jobs import Jobs, JobResponse
 from open_webui.models.knowledge import Knowledges
 from open_webui.storage.provider import Storage
 
 
+from open_webui.retrieval.bm25 import BM25_INDEXES
+from open_webui.retrieval.chunk_store import CHUNK_STORE
+from open_webui.retrieval.embedder import BATCH_EMBEDDERS
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
 from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
 
 # Document loaders
+from open_webui.retrieval.loaders.executor import EXTRACTION_EXECUTOR
 from open_webui.retrieval.loaders.main import Loader
+from open_webui.retrieval.pipeline import run_ingestion_pipeline, split_documents
 from open_webui.retrieval.loaders.youtube import YoutubeLoader
 
 # Web search engines
 from open_webui.retrieval.web.main import SearchResult
+from open_webui.retrieval.web.cache import (
+    WEB_PAGE_CACHE,
+    WEB_SEARCH_CACHE,
+    WEB_SEARCH_COLLECTIONS,
+)
 from open_webui.retrieval.web.utils import get_web_loader
 from open_webui.retrieval.web.brave import search_brave
 from open_webui.retrieval.web.kagi import search_kagi
@@ -72,6 +87,7 @@ from open_webui.utils.misc import (
     calculate_sha256_string,
 )
 from open_webui.utils.auth import get_admin_user, get_verified_user
+from open_webui.utils.jobs import register_job_handler, report_job_progress
 
 
 from open_webui.config import (
@@ -208,6 +224,42 @@ async def get_embedding_config(request: Request, user=Depends(get_admin_user)):
     }
 
 
+@router.get("/embedding/cache")
+async def get_embedding_cache_stats(user=Depends(get_admin_user)):
+    return EMBEDDING_CACHE.get_stats()
+
+
+@router.get("/embedding/batching")
+async def get_embedding_batching_stats(user=Depends(get_admin_user)):
+    return [
+        {
+            "engine": engine,
+            "url": url,
+            "model": model,
+            **embedder.get_stats(),
+        }
+        for (engine, url, model, _), embedder in BATCH_EMBEDDERS.items()
+    ]
+
+
+@router.get("/embedding/chunks")
+async def get_chunk_store_stats(user=Depends(get_admin_user)):
+    return CHUNK_STORE.get_stats()
+
+
+@router.get("/web/cache")
+async def get_web_cache_stats(user=Depends(get_admin_user)):
+    return {
+        "pages": WEB_PAGE_CACHE.get_stats(),
+        "searches": WEB_SEARCH_CACHE.get_stats(),
+    }
+
+
+@router.get("/extraction")
+async def get_extraction_stats(user=Depends(get_admin_user)):
+    return EXTRACTION_EXECUTOR.get_stats()
+
+
 @router.get("/reranking")
 async def get_reraanking_config(request: Request, user=Depends(get_admin_user)):
     return {
@@ -690,6 +742,7 @@ def save_docs_to_vector_db(
     split: bool = True,
     add: bool = False,
     user=None,
+    on_progress: Optional[Callable[[dict], None]] = None,
 ) -> bool:
     def _get_docs_info(docs: list[Document]) -> str:
         docs_info = set()
@@ -746,36 +799,39 @@ def save_docs_to_vector_db(
         else:
             raise ValueError(ERROR_MESSAGES.DEFAULT("Invalid text splitter"))
 
-        docs = text_splitter.split_documents(docs)
+        chunks = split_documents(text_splitter, docs)
+    else:
+        chunks = iter(docs)
 
-    if len(docs) == 0:
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
         raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+    chunks = itertools.chain([first_chunk], chunks)
 
-    texts = [doc.page_content for doc in docs]
-    metadatas = [
+    embedding_config = json.dumps(
         {
+            "engine": request.app.state.config.RAG_EMBEDDING_ENGINE,
+            "model": request.app.state.config.RAG_EMBEDDING_MODEL,
+        }
+    )
+
+    def _get_chunk_metadata(doc: Document) -> dict:
+        chunk_metadata = {
             **doc.metadata,
             **(metadata if metadata else {}),
-            "embedding_config": json.dumps(
-                {
-                    "engine": request.app.state.config.RAG_EMBEDDING_ENGINE,
-                    "model": request.app.state.config.RAG_EMBEDDING_MODEL,
-                }
-            ),
+            "embedding_config": embedding_config,
         }
-        for doc in docs
-    ]
 
-    # ChromaDB does not like datetime formats
-    # for meta-data so convert them to string.
-    for metadata in metadatas:
-        for key, value in metadata.items():
+        # ChromaDB does not like datetime formats
+        # for meta-data so convert them to string.
+        for key, value in chunk_metadata.items():
             if (
                 isinstance(value, datetime)
                 or isinstance(value, list)
                 or isinstance(value, dict)
             ):
-                metadata[key] = str(value)
+                chunk_metadata[key] = str(value)
+        return chunk_metadata
 
     try:
         if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
@@ -783,6 +839,7 @@ def save_docs_to_vector_db(
 
             if overwrite:
                 VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
+                BM25_INDEXES.invalidate(collection_name)
                 log.info(f"deleting existing collection {collection_name}")
             elif add is False:
                 log.info(
@@ -806,26 +863,66 @@ def save_docs_to_vector_db(
                 else request.app.state.config.RAG_OLLAMA_API_KEY
             ),
             request.app.state.config.RAG_EMBEDDING_BATCH_SIZE,
+            cache=False,
         )
 
-        embeddings = embedding_function(
-            list(map(lambda x: x.replace("\n", " "), texts)), user=user
-        )
+        def embed(window: list[Document]) -> list:
+            # Chunks already embedded for another collection reuse that vector
+            embeddings = CHUNK_STORE.embed(
+                request.app.state.config.RAG_EMBEDDING_ENGINE,
+                request.app.state.config.RAG_EMBEDDING_MODEL,
+                [doc.page_content.replace("\n", " ") for doc in window],
+                embedding_function,
+                user=user,
+            )
+            if embeddings is None:
+                raise Exception("Failed to generate embeddings")
+            return embeddings
 
-        items = [
-            {
-                "id": str(uuid.uuid4()),
-                "text": text,
-                "vector": embeddings[idx],
-                "metadata": metadatas[idx],
-            }
-            for idx, text in enumerate(texts)
-        ]
+        # Inserted chunks without their vectors, for the BM25 index and to
+        # remove them again if a later window fails
+        inserted = []
 
-        VECTOR_DB_CLIENT.insert(
-            collection_name=collection_name,
-            items=items,
-        )
+        def insert(window: list[Document], embeddings: list):
+            items = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "text": doc.page_content,
+                    "vector": embeddings[idx],
+                    "metadata": _get_chunk_metadata(doc),
+                }
+                for idx, doc in enumerate(window)
+            ]
+
+            VECTOR_DB_CLIENT.insert(
+                collection_name=collection_name,
+                items=items,
+            )
+            CHUNK_STORE.add(
+                request.app.state.config.RAG_EMBEDDING_ENGINE,
+                request.app.state.config.RAG_EMBEDDING_MODEL,
+                collection_name,
+                [doc.page_content.replace("\n", " ") for doc in window],
+                [item["id"] for item in items],
+            )
+            inserted.extend(
+                {"id": item["id"], "text": item["text"], "metadata": item["metadata"]}
+                for item in items
+            )
+
+        try:
+            run_ingestion_pipeline(
+                chunks, embed, insert, on_progress=on_progress or report_job_progress
+            )
+        except Exception:
+            if inserted:
+                VECTOR_DB_CLIENT.delete(
+                    collection_name=collection_name,
+                    ids=[item["id"] for item in inserted],
+                )
+            raise
+
+        BM25_INDEXES.add(collection_name, inserted)
 
         return True
     except Exception as e:
@@ -843,8 +940,24 @@ class ProcessFileForm(BaseModel):
 def process_file(
     request: Request,
     form_data: ProcessFileForm,
+    background: bool = False,
     user=Depends(get_verified_user),
 ):
+    if background:
+        if Files.get_file_by_id(form_data.file_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=ERROR_MESSAGES.NOT_FOUND,
+            )
+
+        job = request.app.state.JOB_QUEUE.enqueue(
+            user.id, "process_file", form_data.model_dump()
+        )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": True, "job_id": job.id},
+        )
+
     try:
         file = Files.get_file_by_id(form_data.file_id)
 
@@ -858,6 +971,7 @@ def process_file(
             # Usage: /files/{file_id}/data/content/update
 
             VECTOR_DB_CLIENT.delete_collection(collection_name=f"file-{file.id}")
+            BM25_INDEXES.invalidate(f"file-{file.id}")
 
             docs = [
                 Document(
@@ -1000,6 +1114,13 @@ def process_file(
             )
 
 
+@register_job_handler("process_file")
+def process_file_job(request: Request, user, data: dict) -> dict:
+    result = process_file(request, ProcessFileForm(**data), user=user)
+    # The extracted content is already stored on the file
+    return {key: value for key, value in result.items() if key != "content"}
+
+
 class ProcessTextForm(BaseModel):
     name: str
     content: str
@@ -1127,6 +1248,23 @@ def process_web(
 
 
 def search_web(request: Request, engine: str, query: str) -> list[SearchResult]:
+    # Repeated searches within RAG_WEB_SEARCH_CACHE_TTL reuse the results
+    key = (
+        engine,
+        query,
+        request.app.state.config.RAG_WEB_SEARCH_RESULT_COUNT,
+        tuple(request.app.state.config.RAG_WEB_SEARCH_DOMAIN_FILTER_LIST or []),
+    )
+
+    results = WEB_SEARCH_CACHE.get(key)
+    if results is None:
+        results = _search_web(request, engine, query)
+        if results:
+            WEB_SEARCH_CACHE.set(key, results)
+    return results
+
+
+def _search_web(request: Request, engine: str, query: str) -> list[SearchResult]:
     """Search the web using a search engine and return the results as a list of SearchResult objects.
     Will look for a search engine API key in environment variables in the following order:
     - SEARXNG_QUERY_URL
@@ -1336,6 +1474,20 @@ def process_web_search(
             ]
 
         urls = [result.link for result in web_results]
+
+        # Rebuilding from the same, still cached, pages would give the same
+        # collection
+        built_from = WEB_SEARCH_COLLECTIONS.get(collection_name)
+        if built_from == urls and VECTOR_DB_CLIENT.has_collection(
+            collection_name=collection_name
+        ):
+            log.info(f"Reusing web search collection {collection_name}")
+            return {
+                "status": True,
+                "collection_name": collection_name,
+                "filenames": urls,
+            }
+
         loader = get_web_loader(
             urls,
             verify_ssl=request.app.state.config.ENABLE_RAG_WEB_LOADER_SSL_VERIFICATION,
@@ -1345,6 +1497,7 @@ def process_web_search(
         save_docs_to_vector_db(
             request, docs, collection_name, overwrite=True, user=user
         )
+        WEB_SEARCH_COLLECTIONS.set(collection_name, urls)
 
         return {
             "status": True,
@@ -1478,6 +1631,7 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
                 collection_name=form_data.collection_name,
                 metadata={"hash": hash},
             )
+            BM25_INDEXES.invalidate(form_data.collection_name)
             return {"status": True}
         else:
             return {"status": False}
@@ -1489,6 +1643,8 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
 @router.post("/reset/db")
 def reset_vector_db(user=Depends(get_admin_user)):
     VECTOR_DB_CLIENT.reset()
+    BM25_INDEXES.clear()
+    Chunks.delete_all_chunks()
     Knowledges.delete_all_knowledge()
 
 
@@ -1542,11 +1698,26 @@ class BatchProcessFilesResponse(BaseModel):
 def process_files_batch(
     request: Request,
     form_data: BatchProcessFilesForm,
+    background: bool = False,
     user=Depends(get_verified_user),
 ) -> BatchProcessFilesResponse:
     """
     Process a batch of files and save them to the vector database.
     """
+    if background:
+        job = request.app.state.JOB_QUEUE.enqueue(
+            user.id,
+            "process_files_batch",
+            {
+                "file_ids": [file.id for file in form_data.files],
+                "collection_name": form_data.collection_name,
+            },
+        )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": True, "job_id": job.id},
+        )
+
     results: List[BatchProcessFilesResult] = []
     errors: List[BatchProcessFilesResult] = []
     collection_name = form_data.collection_name
@@ -1612,3 +1783,38 @@ def process_files_batch(
                 )
 
     return BatchProcessFilesResponse(results=results, errors=errors)
+
+
+@register_job_handler("process_files_batch")
+def process_files_batch_job(request: Request, user, data: dict) -> dict:
+    return process_files_batch(
+        request,
+        BatchProcessFilesForm(
+            files=Files.get_files_by_ids(data["file_ids"]),
+            collection_name=data["collection_name"],
+        ),
+        user=user,
+    ).model_dump()
+
+
+####################################
+#
+# Background jobs
+#
+####################################
+
+
+@router.get("/jobs", response_model=list[JobResponse])
+async def get_jobs(user=Depends(get_verified_user)):
+    return Jobs.get_jobs_by_user_id(user.id)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job_by_id(job_id: str, user=Depends(get_verified_user)):
+    job = Jobs.get_job_by_id(job_id)
+    if job is None or (job.user_id != user.id and user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+    return job
@@ -3,6 +3,7 @@ from fastapi.responses import JSONResponse, RedirectResponse
 
 from pydantic import BaseModel
 from typing import Optional
+import json
 import logging
 import re
 
@@ -15,6 +16,8 @@ from open_webui.utils.task import (
     tags_generation_template,
     emoji_generation_template,
     moa_response_generation_template,
+    turn_planning_generation_template,
+    TURN_PLAN_ARTIFACTS,
 )
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.constants import TASKS
@@ -30,6 +33,7 @@ from open_webui.config import (
     DEFAULT_AUTOCOMPLETE_GENERATION_PROMPT_TEMPLATE,
     DEFAULT_EMOJI_GENERATION_PROMPT_TEMPLATE,
     DEFAULT_MOA_GENERATION_PROMPT_TEMPLATE,
+    DEFAULT_TURN_PLANNING_PROMPT_TEMPLATE,
 )
 from open_webui.env import SRC_LOG_LEVELS
 
@@ -63,6 +67,8 @@ async def get_task_config(request: Request, user=Depends(get_verified_user)):
         "ENABLE_RETRIEVAL_QUERY_GENERATION": request.app.state.config.ENABLE_RETRIEVAL_QUERY_GENERATION,
         "QUERY_GENERATION_PROMPT_TEMPLATE": request.app.state.config.QUERY_GENERATION_PROMPT_TEMPLATE,
         "TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE": request.app.state.config.TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE,
+        "ENABLE_TURN_PLANNING": request.app.state.config.ENABLE_TURN_PLANNING,
+        "TURN_PLANNING_PROMPT_TEMPLATE": request.app.state.config.TURN_PLANNING_PROMPT_TEMPLATE,
     }
 
 
@@ -80,6 +86,8 @@ class TaskConfigForm(BaseModel):
     ENABLE_RETRIEVAL_QUERY_GENERATION: bool
     QUERY_GENERATION_PROMPT_TEMPLATE: str
     TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE: str
+    ENABLE_TURN_PLANNING: Optional[bool] = None
+    TURN_PLANNING_PROMPT_TEMPLATE: Optional[str] = None
 
 
 @router.post("/config/update")
@@ -122,6 +130,13 @@ async def update_task_config(
         form_data.TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE
     )
 
+    if form_data.ENABLE_TURN_PLANNING is not None:
+        request.app.state.config.ENABLE_TURN_PLANNING = form_data.ENABLE_TURN_PLANNING
+    if form_data.TURN_PLANNING_PROMPT_TEMPLATE is not None:
+        request.app.state.config.TURN_PLANNING_PROMPT_TEMPLATE = (
+            form_data.TURN_PLANNING_PROMPT_TEMPLATE
+        )
+
     return {
         "TASK_MODEL": request.app.state.config.TASK_MODEL,
         "TASK_MODEL_EXTERNAL": request.app.state.config.TASK_MODEL_EXTERNAL,
@@ -136,6 +151,8 @@ async def update_task_config(
         "ENABLE_RETRIEVAL_QUERY_GENERATION": request.app.state.config.ENABLE_RETRIEVAL_QUERY_GENERATION,
         "QUERY_GENERATION_PROMPT_TEMPLATE": request.app.state.config.QUERY_GENERATION_PROMPT_TEMPLATE,
         "TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE": request.app.state.config.TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE,
+        "ENABLE_TURN_PLANNING": request.app.state.config.ENABLE_TURN_PLANNING,
+        "TURN_PLANNING_PROMPT_TEMPLATE": request.app.state.config.TURN_PLANNING_PROMPT_TEMPLATE,
     }
 
 
@@ -442,6 +459,88 @@ async def generate_queries(
         )
 
 
+@router.post("/planning/completions")
+async def generate_turn_plan(
+    request: Request, form_data: dict, user=Depends(get_verified_user)
+):
+    if not request.app.state.config.ENABLE_TURN_PLANNING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Turn planning is disabled",
+        )
+
+    if getattr(request.state, "direct", False) and hasattr(request.state, "model"):
+        models = {
+            request.state.model["id"]: request.state.model,
+        }
+    else:
+        models = request.app.state.MODELS
+
+    model_id = form_data["model"]
+    if model_id not in models:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Model not found",
+        )
+
+    # Check if the user has a custom task model
+    # If the user has a custom task model, use that model
+    task_model_id = get_task_model_id(
+        model_id,
+        request.app.state.config.TASK_MODEL,
+        request.app.state.config.TASK_MODEL_EXTERNAL,
+        models,
+    )
+
+    artifacts = [
+        artifact
+        for artifact in form_data.get("artifacts", [])
+        if artifact in TURN_PLAN_ARTIFACTS
+    ]
+    if not artifacts:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No artifacts to plan",
+        )
+
+    log.debug(
+        f"generating turn plan {artifacts} using model {task_model_id} for user {user.email}"
+    )
+
+    if (request.app.state.config.TURN_PLANNING_PROMPT_TEMPLATE).strip() != "":
+        template = request.app.state.config.TURN_PLANNING_PROMPT_TEMPLATE
+    else:
+        template = DEFAULT_TURN_PLANNING_PROMPT_TEMPLATE
+
+    content = turn_planning_generation_template(
+        template,
+        form_data["messages"],
+        artifacts,
+        json.dumps(form_data.get("tools", [])),
+        {"name": user.name},
+    )
+
+    payload = {
+        "model": task_model_id,
+        "messages": [{"role": "user", "content": content}],
+        "stream": False,
+        "metadata": {
+            **(request.state.metadata if hasattr(request.state, "metadata") else {}),
+            "task": str(TASKS.TURN_PLANNING),
+            "task_body": form_data,
+            "chat_id": form_data.get("chat_id", None),
+        },
+    }
+
+    try:
+        return await generate_chat_completion(request, form_data=payload, user=user)
+    except Exception as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"detail": str(e)},
+        )
+
+
 @router.post("/auto/completions")
 async def generate_autocompletion(
     request: Request, form_data: dict, user=Depends(get_verified_user)
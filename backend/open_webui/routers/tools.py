@@ -8,7 +8,13 @@ from open_webui.models.tools import (
     ToolUserResponse,
     Tools,
 )
-from open_webui.utils.plugin import load_tools_module_by_id, replace_imports
+from open_webui.utils.plugin import (
+    PLUGIN_CACHE,
+    get_tools_module,
+    load_tools_module_by_id,
+    replace_imports,
+    unload_plugin_module,
+)
 from open_webui.config import CACHE_DIR
 from open_webui.constants import ERROR_MESSAGES
 from fastapi import APIRouter, Depends, HTTPException, Request, status
@@ -99,6 +105,7 @@ async def create_new_tools(
 
             specs = get_tools_specs(TOOLS[form_data.id])
             tools = Tools.insert_new_tool(user.id, form_data, specs)
+            PLUGIN_CACHE.invalidate()
 
             tool_cache_dir = Path(CACHE_DIR) / "tools" / form_data.id
             tool_cache_dir.mkdir(parents=True, exist_ok=True)
@@ -195,6 +202,7 @@ async def update_tools_by_id(
 
         print(updated)
         tools = Tools.update_tool_by_id(id, updated)
+        PLUGIN_CACHE.invalidate()
 
         if tools:
             return tools
@@ -239,9 +247,11 @@ async def delete_tools_by_id(
 
     result = Tools.delete_tool_by_id(id)
     if result:
+        PLUGIN_CACHE.invalidate()
         TOOLS = request.app.state.TOOLS
         if id in TOOLS:
             del TOOLS[id]
+        unload_plugin_module(f"tool_{id}", tools.content)
 
     return result
 
@@ -281,11 +291,7 @@ async def get_tools_valves_spec_by_id(
 ):
     tools = Tools.get_tool_by_id(id)
     if tools:
-        if id in request.app.state.TOOLS:
-            tools_module = request.app.state.TOOLS[id]
-        else:
-            tools_module, _ = load_tools_module_by_id(id)
-            request.app.state.TOOLS[id] = tools_module
+        tools_module = get_tools_module(request, id, tools)
 
         if hasattr(tools_module, "Valves"):
             Valves = tools_module.Valves
@@ -324,11 +330,7 @@ async def update_tools_valves_by_id(
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
 
-    if id in request.app.state.TOOLS:
-        tools_module = request.app.state.TOOLS[id]
-    else:
-        tools_module, _ = load_tools_module_by_id(id)
-        request.app.state.TOOLS[id] = tools_module
+    tools_module = get_tools_module(request, id, tools)
 
     if not hasattr(tools_module, "Valves"):
         raise HTTPException(
@@ -341,6 +343,7 @@ async def update_tools_valves_by_id(
         form_data = {k: v for k, v in form_data.items() if v is not None}
         valves = Valves(**form_data)
         Tools.update_tool_valves_by_id(id, valves.model_dump())
+        PLUGIN_CACHE.invalidate()
         return valves.model_dump()
     except Exception as e:
         print(e)
@@ -380,11 +383,7 @@ async def get_tools_user_valves_spec_by_id(
 ):
     tools = Tools.get_tool_by_id(id)
     if tools:
-        if id in request.app.state.TOOLS:
-            tools_module = request.app.state.TOOLS[id]
-        else:
-            tools_module, _ = load_tools_module_by_id(id)
-            request.app.state.TOOLS[id] = tools_module
+        tools_module = get_tools_module(request, id, tools)
 
         if hasattr(tools_module, "UserValves"):
             UserValves = tools_module.UserValves
@@ -404,11 +403,7 @@ async def update_tools_user_valves_by_id(
     tools = Tools.get_tool_by_id(id)
 
     if tools:
-        if id in request.app.state.TOOLS:
-            tools_module = request.app.state.TOOLS[id]
-        else:
-            tools_module, _ = load_tools_module_by_id(id)
-            request.app.state.TOOLS[id] = tools_module
+        tools_module = get_tools_module(request, id, tools)
 
         if hasattr(tools_module, "UserValves"):
             UserValves = tools_module.UserValves
@@ -9,12 +9,13 @@ from open_webui.models.channels import Channels
 from open_webui.models.chats import Chats
 
 from open_webui.env import (
+    CHAT_COMPLETION_EVENT_MODE,
     ENABLE_WEBSOCKET_SUPPORT,
     WEBSOCKET_MANAGER,
     WEBSOCKET_REDIS_URL,
 )
 from open_webui.utils.auth import decode_token
-from open_webui.socket.utils import RedisDict, RedisLock
+from open_webui.socket.utils import RedisDict, RedisLock, RedisSetDict, SetDict
 
 from open_webui.env import (
     GLOBAL_LOG_LEVEL,
@@ -57,6 +58,8 @@ if WEBSOCKET_MANAGER == "redis":
     SESSION_POOL = RedisDict("open-webui:session_pool", redis_url=WEBSOCKET_REDIS_URL)
     USER_POOL = RedisDict("open-webui:user_pool", redis_url=WEBSOCKET_REDIS_URL)
     USAGE_POOL = RedisDict("open-webui:usage_pool", redis_url=WEBSOCKET_REDIS_URL)
+    STREAM_POOL = RedisDict("open-webui:stream_pool", redis_url=WEBSOCKET_REDIS_URL)
+    RESYNC_POOL = RedisSetDict("open-webui:resync_pool", redis_url=WEBSOCKET_REDIS_URL)
 
     clean_up_lock = RedisLock(
         redis_url=WEBSOCKET_REDIS_URL,
@@ -70,6 +73,8 @@ else:
     SESSION_POOL = {}
     USER_POOL = {}
     USAGE_POOL = {}
+    STREAM_POOL = {}
+    RESYNC_POOL = SetDict()
     aquire_func = release_func = renew_func = lambda: True
 
 
@@ -149,7 +154,7 @@ async def connect(sid, environ, auth):
         data = decode_token(auth["token"])
 
         if data is not None and "id" in data:
-            user = Users.get_user_by_id(data["id"])
+            user = await Users.get_user_by_id_async(data["id"])
 
         if user:
             SESSION_POOL[sid] = user.model_dump()
@@ -174,7 +179,7 @@ async def user_join(sid, data):
     if data is None or "id" not in data:
         return
 
-    user = Users.get_user_by_id(data["id"])
+    user = await Users.get_user_by_id_async(data["id"])
     if not user:
         return
 
@@ -206,7 +211,7 @@ async def join_channel(sid, data):
     if data is None or "id" not in data:
         return
 
-    user = Users.get_user_by_id(data["id"])
+    user = await Users.get_user_by_id_async(data["id"])
     if not user:
         return
 
@@ -245,6 +250,21 @@ async def channel_events(sid, data):
         )
 
 
+@sio.on("chat:completion:resync")
+async def chat_completion_resync(sid, data):
+    # Sent by clients that missed a content delta; the worker streaming the
+    # message picks the request up and replies with the full content
+    user = SESSION_POOL.get(sid)
+    if not user:
+        return
+
+    message_id = data.get("message_id")
+    if not message_id or STREAM_POOL.get(message_id) != user["id"]:
+        return
+
+    RESYNC_POOL.add(message_id, sid)
+
+
 @sio.on("user-list")
 async def user_list(sid):
     await sio.emit("user-list", {"user_ids": list(USER_POOL.keys())})
@@ -287,14 +307,14 @@ def get_event_emitter(request_info):
             )
 
         if "type" in event_data and event_data["type"] == "status":
-            Chats.add_message_status_to_chat_by_id_and_message_id(
+            await Chats.add_message_status_to_chat_by_id_and_message_id_async(
                 request_info["chat_id"],
                 request_info["message_id"],
                 event_data.get("data", {}),
             )
 
         if "type" in event_data and event_data["type"] == "message":
-            message = Chats.get_message_by_id_and_message_id(
+            message = await Chats.get_message_by_id_and_message_id_async(
                 request_info["chat_id"],
                 request_info["message_id"],
             )
@@ -302,7 +322,7 @@ def get_event_emitter(request_info):
             content = message.get("content", "")
             content += event_data.get("data", {}).get("content", "")
 
-            Chats.upsert_message_to_chat_by_id_and_message_id(
+            await Chats.upsert_message_to_chat_by_id_and_message_id_async(
                 request_info["chat_id"],
                 request_info["message_id"],
                 {
@@ -313,7 +333,7 @@ def get_event_emitter(request_info):
         if "type" in event_data and event_data["type"] == "replace":
             content = event_data.get("data", {}).get("content", "")
 
-            Chats.upsert_message_to_chat_by_id_and_message_id(
+            await Chats.upsert_message_to_chat_by_id_and_message_id_async(
                 request_info["chat_id"],
                 request_info["message_id"],
                 {
@@ -324,6 +344,80 @@ def get_event_emitter(request_info):
     return __event_emitter__
 
 
+class ContentEventEmitter:
+    """
+    Emits the streamed content of a message as `chat:completion` events.
+
+    In "delta" mode events carry `content_offset`, `content_delta` and an
+    increasing `content_seq`. A client that sees a gap in the sequence sends
+    `chat:completion:resync` and is sent the full content at the current
+    sequence number. In "full" mode every event carries the whole content.
+    """
+
+    def __init__(self, request_info, content_stream, mode=CHAT_COMPLETION_EVENT_MODE):
+        self.request_info = request_info
+        self.content_stream = content_stream
+        self.mode = mode
+
+        self.seq = 0
+        self.event_emitter = get_event_emitter(request_info)
+
+        if self.mode == "delta":
+            STREAM_POOL[request_info["message_id"]] = request_info["user_id"]
+
+    async def __call__(self):
+        if self.mode == "full":
+            data = {"content": self.content_stream.serialize()}
+        else:
+            await self.resync()
+
+            data = self.content_stream.diff_event()
+            if data is None:
+                return
+
+            self.seq += 1
+            data["content_seq"] = self.seq
+
+        await self.event_emitter(
+            {
+                "type": "chat:completion",
+                "data": data,
+            }
+        )
+
+    async def resync(self):
+        message_id = self.request_info["message_id"]
+        if message_id not in RESYNC_POOL:
+            return
+
+        session_ids = RESYNC_POOL.pop(message_id, [])
+        for session_id in session_ids:
+            user = SESSION_POOL.get(session_id)
+            if not user or user["id"] != self.request_info["user_id"]:
+                continue
+
+            await sio.emit(
+                "chat-events",
+                {
+                    "chat_id": self.request_info.get("chat_id", None),
+                    "message_id": message_id,
+                    "data": {
+                        "type": "chat:completion",
+                        "data": {
+                            "content": self.content_stream.emitted,
+                            "content_seq": self.seq,
+                        },
+                    },
+                },
+                to=session_id,
+            )
+
+    def close(self):
+        if self.mode == "delta":
+            STREAM_POOL.pop(self.request_info["message_id"], None)
+            RESYNC_POOL.pop(self.request_info["message_id"], None)
+
+
 def get_event_call(request_info):
     async def __event_caller__(event_data):
         response = await sio.call(
@@ -71,6 +71,17 @@ class RedisDict:
         except KeyError:
             return default
 
+    def pop(self, key, default=None):
+        # Read and delete in one transaction so concurrent writers are not lost
+        with self.redis.pipeline() as pipe:
+            pipe.hget(self.name, key)
+            pipe.hdel(self.name, key)
+            value, _ = pipe.execute()
+
+        if value is None:
+            return default
+        return json.loads(value)
+
     def clear(self):
         self.redis.delete(self.name)
 
@@ -85,3 +96,46 @@ class RedisDict:
         if key not in self:
             self[key] = default
         return self[key]
+
+
+class SetDict(dict):
+    """In-process counterpart of `RedisSetDict`."""
+
+    def add(self, key, value):
+        self.setdefault(key, set()).add(value)
+
+
+class RedisSetDict:
+    """
+    Sets of strings by key, one Redis set each, so workers adding to the same
+    set concurrently don't overwrite each other. Sets expire `ttl` seconds
+    after their last change in case their owner never pops them.
+    """
+
+    def __init__(self, name, redis_url, ttl=60 * 60):
+        self.name = name
+        self.ttl = ttl
+        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+
+    def _key(self, key):
+        return f"{self.name}:{key}"
+
+    def add(self, key, value):
+        with self.redis.pipeline() as pipe:
+            pipe.sadd(self._key(key), value)
+            pipe.expire(self._key(key), self.ttl)
+            pipe.execute()
+
+    def __contains__(self, key):
+        return self.redis.exists(self._key(key)) > 0
+
+    def pop(self, key, default=None):
+        # Read and delete in one transaction so concurrent adds are not lost
+        with self.redis.pipeline() as pipe:
+            pipe.smembers(self._key(key))
+            pipe.delete(self._key(key))
+            values, _ = pipe.execute()
+
+        if not values:
+            return default
+        return values
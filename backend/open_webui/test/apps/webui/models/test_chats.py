@@ -0,0 +1,157 @@
+import uuid
+
+import pytest
+
+from open_webui.internal.db import get_db
+from open_webui.models.chats import Chat, ChatForm, ChatMessage, Chats
+
+
+def message(id, parent_id=None, **kwargs):
+    return {
+        "id": id,
+        "parentId": parent_id,
+        "childrenIds": [],
+        "role": "assistant",
+        "content": "",
+        **kwargs,
+    }
+
+
+@pytest.fixture
+def chat():
+    user_id = str(uuid.uuid4())
+    chat = Chats.insert_new_chat(
+        user_id,
+        ChatForm(
+            chat={
+                "title": "Test",
+                "history": {
+                    "currentId": "1",
+                    "messages": {"1": message("1", role="user", content="Hi")},
+                },
+            }
+        ),
+    )
+    yield chat
+
+    for chat_model in Chats.get_chats_by_user_id(user_id):
+        Chats.delete_chat_by_id(chat_model.id)
+
+
+def get_rows(chat_id):
+    with get_db() as db:
+        return {
+            row.message_id: row
+            for row in db.query(ChatMessage).filter_by(chat_id=chat_id).all()
+        }
+
+
+def test_insert_stores_messages(chat):
+    rows = get_rows(chat.id)
+
+    assert list(rows) == ["1"]
+    assert rows["1"].message == message("1", role="user", content="Hi")
+    assert rows["1"].children_ids == []
+    assert rows["1"].dirty is False
+
+
+def test_upsert_round_trip(chat):
+    stored = Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "2", message("2", "1", content="Hello")
+    )
+    assert stored.dirty is True
+
+    # Partial updates are merged into the stored message
+    Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "2", {"content": "Hello there"}
+    )
+
+    expected = message("2", "1", content="Hello there")
+    assert Chats.get_message_by_id_and_message_id(chat.id, "2") == expected
+
+    history = Chats.get_chat_by_id(chat.id).chat["history"]
+    assert history["messages"]["1"] == message("1", role="user", content="Hi")
+    assert history["messages"]["2"] == expected
+
+
+def test_dirty_rows_overlay_the_chat(chat):
+    Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "1", {"content": "Edited"}
+    )
+
+    # The chat document itself is only written by full saves
+    with get_db() as db:
+        assert db.get(Chat, chat.id).chat["history"]["messages"]["1"]["content"] == (
+            "Hi"
+        )
+
+    chat_model = Chats.get_chat_by_id(chat.id)
+    assert chat_model.chat["history"]["messages"]["1"]["content"] == "Edited"
+    assert chat_model.chat["title"] == "Test"
+
+    # Lists of chats are overlaid the same way
+    [listed] = Chats.get_chats_by_user_id(chat.user_id)
+    assert listed.chat == chat_model.chat
+
+
+def test_full_save_folds_dirty_rows(chat):
+    Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "2", message("2", "1", content="Hello")
+    )
+
+    Chats.update_chat_by_id(chat.id, Chats.get_chat_by_id(chat.id).chat)
+
+    rows = get_rows(chat.id)
+    assert set(rows) == {"1", "2"}
+    assert not any(row.dirty for row in rows.values())
+
+    with get_db() as db:
+        history = db.get(Chat, chat.id).chat["history"]
+    assert history["currentId"] == "2"
+    assert history["messages"]["2"]["content"] == "Hello"
+
+
+def test_full_save_deletes_removed_messages(chat):
+    Chats.upsert_message_to_chat_by_id_and_message_id(chat.id, "2", message("2", "1"))
+
+    Chats.update_chat_by_id(chat.id, {"title": "Test", "history": {"messages": {}}})
+
+    assert get_rows(chat.id) == {}
+    assert Chats.get_chat_by_id(chat.id).chat["history"]["messages"] == {}
+
+
+def test_upsert_bumps_current_id_and_chat(chat):
+    with get_db() as db:
+        db.query(Chat).filter_by(id=chat.id).update({"updated_at": 0})
+        db.commit()
+
+    Chats.upsert_message_to_chat_by_id_and_message_id(chat.id, "2", message("2", "1"))
+    Chats.upsert_message_to_chat_by_id_and_message_id(chat.id, "3", message("3", "2"))
+
+    chat_model = Chats.get_chat_by_id(chat.id)
+    assert chat_model.chat["history"]["currentId"] == "3"
+    assert chat_model.updated_at > 0
+
+
+def test_status_history_round_trip(chat):
+    Chats.add_message_status_to_chat_by_id_and_message_id(
+        chat.id, "1", {"action": "web_search", "done": True}
+    )
+
+    assert get_rows(chat.id)["1"].status_history == [
+        {"action": "web_search", "done": True}
+    ]
+    assert Chats.get_chat_by_id(chat.id).chat["history"]["messages"]["1"][
+        "statusHistory"
+    ] == [{"action": "web_search", "done": True}]
+
+
+def test_upsert_to_missing_chat():
+    id = str(uuid.uuid4())
+
+    assert (
+        Chats.upsert_message_to_chat_by_id_and_message_id(id, "1", message("1")) is None
+    )
+    assert Chats.get_message_by_id_and_message_id(id, "1") == {}
+    assert get_rows(id) == {}
+    assert Chats.get_chat_by_id(id) is None
@@ -0,0 +1,135 @@
+import time
+
+import pytest
+
+from open_webui.internal.db import get_db
+from open_webui.models.jobs import Job, Jobs
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs():
+    # Jobs are claimed across users, start every test from an empty queue
+    with get_db() as db:
+        db.query(Job).delete()
+        db.commit()
+    yield
+    with get_db() as db:
+        db.query(Job).delete()
+        db.commit()
+
+
+def insert_job(user_id, **values):
+    job = Jobs.insert_new_job(user_id, "file", {"file_id": "1"})
+    if values:
+        with get_db() as db:
+            db.query(Job).filter_by(id=job.id).update(values)
+            db.commit()
+    return job
+
+
+def claim(user_concurrency=1, max_attempts=3):
+    return Jobs.claim_next_job(user_concurrency, max_attempts)
+
+
+def test_claim_oldest_first():
+    now = int(time.time())
+    newer = insert_job("a", created_at=now)
+    older = insert_job("b", created_at=now - 10)
+
+    job = claim(user_concurrency=2)
+    assert job.id == older.id
+    assert job.status == "running"
+    assert job.attempts == 1
+
+    assert claim(user_concurrency=2).id == newer.id
+    assert claim(user_concurrency=2) is None
+
+
+def test_claim_per_user_concurrency():
+    now = int(time.time())
+    a1 = insert_job("a", created_at=now - 3)
+    a2 = insert_job("a", created_at=now - 2)
+    b1 = insert_job("b", created_at=now - 1)
+
+    assert claim().id == a1.id
+    # "a" already runs a job, so "b" goes first
+    assert claim().id == b1.id
+    assert claim() is None
+
+    Jobs.complete_job_by_id(a1.id, {"ok": True})
+    assert claim().id == a2.id
+
+    assert Jobs.get_job_by_id(a1.id).status == "completed"
+    assert Jobs.get_job_by_id(a1.id).result == {"ok": True}
+
+
+def test_higher_user_concurrency():
+    jobs = [insert_job("a") for _ in range(3)]
+
+    claimed = [claim(user_concurrency=2), claim(user_concurrency=2)]
+    assert {job.id for job in claimed} <= {job.id for job in jobs}
+    assert claim(user_concurrency=2) is None
+
+
+def test_backoff_delays_retries():
+    job = insert_job("a")
+    job = claim()
+
+    Jobs.fail_job_by_id(job.id, "error", retry_at=int(time.time()) + 60)
+    failed = Jobs.get_job_by_id(job.id)
+    assert failed.status == "pending"
+    assert failed.error == "error"
+    assert claim() is None
+
+    # Due once the backoff has passed
+    with get_db() as db:
+        db.query(Job).filter_by(id=job.id).update({"scheduled_at": 0})
+        db.commit()
+    retried = claim()
+    assert retried.id == job.id
+    assert retried.attempts == 2
+
+
+def test_fail_without_retry():
+    job = insert_job("a")
+    job = claim()
+
+    Jobs.fail_job_by_id(job.id, "error")
+    assert Jobs.get_job_by_id(job.id).status == "failed"
+    assert claim() is None
+
+
+def test_claim_skips_jobs_out_of_attempts():
+    insert_job("a", attempts=3)
+
+    assert claim(max_attempts=3) is None
+    assert claim(max_attempts=4).attempts == 4
+
+
+def test_requeue_stale_jobs():
+    now = int(time.time())
+    stale = insert_job("a", status="running", attempts=1, updated_at=now - 120)
+    exhausted = insert_job("b", status="running", attempts=3, updated_at=now - 120)
+    alive = insert_job("c", status="running", attempts=1, updated_at=now)
+
+    assert Jobs.requeue_stale_jobs(timeout=60, max_attempts=3) == 1
+
+    assert Jobs.get_job_by_id(stale.id).status == "pending"
+    assert Jobs.get_job_by_id(alive.id).status == "running"
+
+    failed = Jobs.get_job_by_id(exhausted.id)
+    assert failed.status == "failed"
+    assert "after 3 attempts" in failed.error
+
+    # Only the requeued job is picked up again
+    assert claim(user_concurrency=2, max_attempts=3).id == stale.id
+    assert claim(user_concurrency=2, max_attempts=3) is None
+
+
+def test_heartbeat_keeps_running_jobs():
+    now = int(time.time())
+    job = insert_job("a", status="running", attempts=1, updated_at=now - 120)
+
+    Jobs.touch_jobs_by_ids([job.id])
+    assert Jobs.requeue_stale_jobs(timeout=60, max_attempts=3) == 0
+    assert Jobs.get_job_by_id(job.id).status == "running"
@@ -0,0 +1,145 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from open_webui.retrieval import bm25
+from open_webui.retrieval.bm25 import BM25Index, BM25IndexCache
+
+DOCUMENTS = [
+    "The quick brown fox jumps over the lazy dog",
+    "A quick brown dog outpaces a quick fox",
+    "Lorem ipsum dolor sit amet",
+    "the fox and the hound",
+    "Hybrid search combines BM25 with vector search",
+    "BM25 ranks documents by term frequency",
+    "Dogs and foxes are canines",
+]
+
+
+def build_index(documents=DOCUMENTS):
+    index = BM25Index()
+    index.add(
+        [str(i) for i in range(len(documents))],
+        documents,
+        [{"i": i} for i in range(len(documents))],
+    )
+    return index
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["quick fox", "the fox the", "BM25 search", "Fox", "dog", "unknown words"],
+)
+def test_scores_match_bm25_okapi(query):
+    # Hybrid search used rank_bm25 through langchain's BM25Retriever before
+    rank_bm25 = pytest.importorskip("rank_bm25")
+
+    okapi = rank_bm25.BM25Okapi([document.split() for document in DOCUMENTS])
+    expected = okapi.get_scores(query.split())
+
+    results = build_index().search(query, k=len(DOCUMENTS))
+
+    assert len(results) == len(DOCUMENTS)
+    assert sorted(idx for idx, _ in results) == list(range(len(DOCUMENTS)))
+    for idx, score in results:
+        assert score == pytest.approx(expected[idx])
+
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_tokenization_is_case_sensitive():
+    results = build_index().search("fox", k=3)
+
+    # "The quick brown fox..." and "A quick brown dog ... fox" match, "Fox" would not
+    assert {idx for idx, score in results if score > 0} == {0, 1, 3}
+
+
+def test_search_fills_up_to_k():
+    index = build_index()
+
+    assert len(index.search("Lorem", k=3)) == 3
+    assert len(index.search("Lorem", k=100)) == len(DOCUMENTS)
+    assert index.search("Lorem", k=3)[0][0] == 2
+    assert BM25Index().search("Lorem", k=3) == []
+
+
+def test_add_skips_known_ids():
+    index = build_index()
+
+    assert index.add(["0", "new"], ["again", "new chunk"], [{}, {}]) == 1
+    assert len(index) == len(DOCUMENTS) + 1
+    assert index.search("chunk", k=1)[0][0] == len(DOCUMENTS)
+
+
+def test_add_while_searching():
+    index = build_index()
+    errors = []
+
+    def search():
+        try:
+            for _ in range(200):
+                index.search("quick fox dog", k=5)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for i in range(2000):
+        index.add([f"added-{i}"], [f"quick fox term{i}"], [{}])
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    documents = list(DOCUMENTS)
+    client = SimpleNamespace(
+        get=lambda collection_name: SimpleNamespace(
+            ids=[[str(i) for i in range(len(documents))]],
+            documents=[list(documents)],
+            metadatas=[[{} for _ in documents]],
+        )
+    )
+    monkeypatch.setattr(bm25, "VECTOR_DB_CLIENT", client)
+    return documents
+
+
+def test_cache_persists_and_appends(tmp_path, collection):
+    cache = BM25IndexCache(directory=str(tmp_path))
+    index = cache.get("collection")
+    assert len(index) == len(collection)
+    assert cache.get("collection") is index
+
+    items = [{"id": "new", "text": "appended chunk", "metadata": {}}]
+    cache.add("collection", items)
+    assert len(index) == len(collection) + 1
+
+    # Only the new chunks are written, to the delta next to the index
+    assert len(list(tmp_path.glob("*.delta"))) == 1
+
+    # Another worker loads the index and replays the delta
+    other = BM25IndexCache(directory=str(tmp_path))
+    other_index = other.get("collection")
+    assert other_index.ids == index.ids
+
+    # and catches up with chunks appended afterwards
+    cache.add("collection", [{"id": "later", "text": "later chunk", "metadata": {}}])
+    assert other.get("collection") is other_index
+    assert "later" in other_index.ids
+
+
+def test_cache_invalidate_rebuilds(tmp_path, collection):
+    cache = BM25IndexCache(directory=str(tmp_path))
+    cache.get("collection")
+    cache.add("collection", [{"id": "new", "text": "chunk", "metadata": {}}])
+
+    collection.pop()
+    cache.invalidate("collection")
+    assert list(tmp_path.iterdir()) == []
+
+    assert len(cache.get("collection")) == len(collection)
@@ -0,0 +1,279 @@
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+from fastapi import HTTPException
+
+from open_webui.utils import balancer as balancer_module
+from open_webui.utils.balancer import LATENCY_BUCKETS, UpstreamBalancer
+
+URLS = ["http://a", "http://b", "http://c"]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(
+        balancer_module, "time", SimpleNamespace(monotonic=lambda: clock.now)
+    )
+    return clock
+
+
+def test_unknown_strategy_falls_back_to_random():
+    assert UpstreamBalancer(strategy="fastest").strategy == "random"
+
+
+def test_random_only_picks_candidates():
+    balancer = UpstreamBalancer(strategy="random")
+
+    assert {balancer.choose(URLS) for _ in range(100)} == set(URLS)
+    assert balancer.choose(URLS[:1]) == URLS[0]
+
+
+def test_least_outstanding():
+    balancer = UpstreamBalancer(strategy="least_outstanding")
+    balancer.start("http://a")
+    balancer.start("http://a")
+    balancer.start("http://b")
+
+    assert {balancer.choose(URLS) for _ in range(20)} == {"http://c"}
+
+    balancer.start("http://c")
+    assert {balancer.choose(URLS) for _ in range(50)} == {"http://b", "http://c"}
+
+    balancer.finish("http://a")
+    balancer.finish("http://a")
+    balancer.finish("http://a")
+    assert balancer.get_backend("http://a")["in_flight"] == 0
+    assert balancer.choose(URLS) == "http://a"
+
+
+def test_ewma(clock):
+    balancer = UpstreamBalancer(strategy="ewma", alpha=0.5)
+
+    for url, latency in [("http://a", 1.0), ("http://b", 3.0)]:
+        started_at = balancer.start(url)
+        clock.now += latency
+        balancer.succeed(url, started_at)
+        balancer.finish(url)
+
+    # Backends without samples are tried first
+    assert balancer.choose(URLS) == "http://c"
+    assert balancer.choose(URLS[:2]) == "http://a"
+
+    # 1s with two requests queued scores above an idle 3s backend
+    balancer.start("http://a")
+    balancer.start("http://a")
+    assert balancer.choose(URLS[:2]) == "http://b"
+
+    started_at = balancer.start("http://b")
+    clock.now += 1.0
+    balancer.succeed("http://b", started_at)
+    assert balancer.get_backend("http://b")["ewma"] == pytest.approx(2.0)
+
+
+def test_weighted():
+    balancer = UpstreamBalancer(strategy="weighted")
+
+    assert {balancer.choose(URLS, weights=[0, 1, 0]) for _ in range(20)} == {"http://b"}
+    assert {balancer.choose(URLS, weights=[1, 1, 0]) for _ in range(100)} == {
+        "http://a",
+        "http://b",
+    }
+
+
+def test_latency_histogram(clock):
+    balancer = UpstreamBalancer()
+
+    for latency in [0.05, 0.3, 100]:
+        started_at = balancer.start("http://a")
+        clock.now += latency
+        balancer.succeed("http://a", started_at)
+
+    histogram = balancer.get_stats()["backends"]["http://a"]["histogram"]
+    assert list(histogram) == [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+    assert histogram["0.1"] == 1
+    assert histogram["0.5"] == 1
+    assert histogram["+Inf"] == 1
+    assert sum(histogram.values()) == 3
+
+
+def test_eject_after_consecutive_failures(clock):
+    balancer = UpstreamBalancer(failure_threshold=2, cooldown=30)
+
+    balancer.fail("http://a")
+    started_at = balancer.start("http://a")
+    balancer.succeed("http://a", started_at)
+    balancer.fail("http://a")
+    # Failures must be consecutive
+    assert not balancer.is_ejected("http://a")
+
+    balancer.fail("http://a")
+    assert balancer.is_ejected("http://a")
+    assert balancer.get_stats()["backends"]["http://a"]["ejected"] is True
+    assert {balancer.choose(URLS) for _ in range(50)} == {"http://b", "http://c"}
+
+    clock.now += 30
+    assert not balancer.is_ejected("http://a")
+    assert "http://a" in {balancer.choose(URLS) for _ in range(100)}
+
+
+def test_success_clears_ejection(clock):
+    balancer = UpstreamBalancer(failure_threshold=1, cooldown=30)
+    balancer.fail("http://a")
+    assert balancer.is_ejected("http://a")
+
+    started_at = balancer.start("http://a")
+    balancer.succeed("http://a", started_at)
+    assert not balancer.is_ejected("http://a")
+    assert balancer.get_backend("http://a")["consecutive_failures"] == 0
+
+
+def test_all_ejected_considers_everyone(clock):
+    balancer = UpstreamBalancer(failure_threshold=1, cooldown=30)
+    for url in URLS[:2]:
+        balancer.fail(url)
+
+    assert {balancer.choose(URLS[:2]) for _ in range(50)} == set(URLS[:2])
+
+
+####################
+# send_balanced_post_request
+####################
+
+
+def connection_error():
+    return aiohttp.ClientConnectorError(
+        SimpleNamespace(host="localhost", port=11434, ssl=None),
+        OSError("Connection refused"),
+    )
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    from open_webui.routers import ollama
+
+    monkeypatch.setattr(ollama, "OLLAMA_BALANCER", UpstreamBalancer("random"))
+    monkeypatch.setattr(ollama, "OLLAMA_BALANCER_MAX_RETRIES", 2)
+    return ollama
+
+
+def make_request(model="llama", model_urls=(0, 1, 2), configs=None):
+    return SimpleNamespace(
+        app=SimpleNamespace(
+            state=SimpleNamespace(
+                config=SimpleNamespace(
+                    OLLAMA_BASE_URLS=list(URLS),
+                    OLLAMA_API_CONFIGS=configs or {},
+                ),
+                OLLAMA_MODELS={model: {"urls": list(model_urls)}},
+            )
+        )
+    )
+
+
+def mock_send_post_request(monkeypatch, ollama, errors):
+    """
+    Replaces `send_post_request`: the n-th call raises `errors[n]` (if not None)
+    and every call is recorded as (base_url, payload).
+    """
+    calls = []
+
+    async def send_post_request(url, payload, base_url=None, **kwargs):
+        calls.append((base_url, payload))
+        error = errors[len(calls) - 1] if len(calls) <= len(errors) else None
+        if error is None:
+            return {"url": url}
+
+        status_code, cause = error
+        raise HTTPException(status_code=status_code, detail="error") from cause
+
+    monkeypatch.setattr(ollama, "send_post_request", send_post_request)
+    return calls
+
+
+def send(ollama, request, **kwargs):
+    return asyncio.run(
+        ollama.send_balanced_post_request(
+            request, "/api/chat", {"model": "llama"}, **kwargs
+        )
+    )
+
+
+def test_retries_connection_errors_on_another_replica(monkeypatch, ollama):
+    calls = mock_send_post_request(
+        monkeypatch, ollama, [(500, connection_error()), (500, connection_error())]
+    )
+
+    response = send(ollama, make_request())
+
+    urls = [base_url for base_url, _ in calls]
+    assert len(urls) == 3
+    assert sorted(urls) == URLS
+    assert response == {"url": f"{urls[-1]}/api/chat"}
+
+
+def test_retries_are_capped(monkeypatch, ollama):
+    monkeypatch.setattr(ollama, "OLLAMA_BALANCER_MAX_RETRIES", 1)
+    calls = mock_send_post_request(monkeypatch, ollama, [(500, connection_error())] * 3)
+
+    with pytest.raises(HTTPException):
+        send(ollama, make_request())
+    assert len(calls) == 2
+
+
+def test_stops_when_every_replica_was_tried(monkeypatch, ollama):
+    calls = mock_send_post_request(monkeypatch, ollama, [(500, connection_error())] * 3)
+
+    with pytest.raises(HTTPException):
+        send(ollama, make_request(model_urls=(0, 1)))
+    assert sorted(base_url for base_url, _ in calls) == URLS[:2]
+
+
+@pytest.mark.parametrize(
+    "idempotent, retried",
+    [(True, True), (False, False)],
+)
+def test_server_errors_are_retried_if_idempotent(
+    monkeypatch, ollama, idempotent, retried
+):
+    calls = mock_send_post_request(monkeypatch, ollama, [(502, None)])
+
+    if retried:
+        send(ollama, make_request(), idempotent=idempotent)
+    else:
+        with pytest.raises(HTTPException):
+            send(ollama, make_request(), idempotent=idempotent)
+    assert len(calls) == (2 if retried else 1)
+
+
+def test_client_errors_are_not_retried(monkeypatch, ollama):
+    calls = mock_send_post_request(monkeypatch, ollama, [(400, None)])
+
+    with pytest.raises(HTTPException):
+        send(ollama, make_request(), idempotent=True)
+    assert len(calls) == 1
+
+
+def test_pinned_replica_is_not_retried(monkeypatch, ollama):
+    calls = mock_send_post_request(monkeypatch, ollama, [(500, connection_error())])
+
+    with pytest.raises(HTTPException):
+        send(ollama, make_request(), url_idx=1)
+    assert calls == [("http://b", '{"model": "llama"}')]
+
+
+def test_prefix_id_is_stripped_per_replica(monkeypatch, ollama):
+    calls = mock_send_post_request(monkeypatch, ollama, [])
+
+    asyncio.run(
+        ollama.send_balanced_post_request(
+            make_request(
+                "remote.llama", model_urls=(2,), configs={"2": {"prefix_id": "remote"}}
+            ),
+            "/api/chat",
+            {"model": "remote.llama"},
+        )
+    )
+    assert calls == [("http://c", '{"model": "llama"}')]
@@ -0,0 +1,238 @@
+import pytest
+
+from open_webui.utils.content_blocks import ContentBlockStream
+
+
+def stream(chunks, **kwargs):
+    """
+    Feeds `chunks` to a ContentBlockStream, applying every `diff()` to the
+    content a client would hold, and checks it against `serialize()` each time.
+    """
+    content_stream = ContentBlockStream(**kwargs)
+    content = ""
+    ends = []
+
+    for chunk in chunks:
+        ends.append(content_stream.append(chunk))
+
+        diff = content_stream.diff()
+        if diff is not None:
+            offset, text = diff
+            assert offset <= len(content)
+            content = f"{content[:offset]}{text}"
+
+        assert content == content_stream.serialize()
+
+    return content_stream, content, ends
+
+
+def split_every(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_text_deltas():
+    content_stream, content, _ = stream(["Hello", " wor", "ld  ", "\n\nBye"])
+
+    assert content == "Hello world  \n\nBye"
+    assert content_stream.content == "Hello world  \n\nBye"
+
+
+def test_whitespace_only_delta_is_not_emitted():
+    content_stream = ContentBlockStream()
+    content_stream.append("Hello")
+    content_stream.diff()
+
+    content_stream.append("   ")
+    assert content_stream.diff() is None
+
+    content_stream.append("!")
+    assert content_stream.diff() == (5, "   !")
+
+
+def test_reasoning_block():
+    content_stream, content, _ = stream(
+        ["<think>", "Let me", " see\nthe", " steps", "</think>", "The answer"]
+    )
+    content_stream.finish()
+
+    blocks = content_stream.content_blocks
+    assert [block["type"] for block in blocks] == ["reasoning", "text"]
+    assert blocks[0]["tag"] == "think"
+    assert blocks[0]["content"] == "Let me see\nthe steps"
+    assert blocks[0]["duration"] == 0
+    assert blocks[1]["content"] == "The answer"
+
+    assert '<details type="reasoning" done="true" duration="0">' in content
+    assert "> Let me see\n> the steps" in content
+    assert content.endswith("The answer")
+    assert content_stream.content == "The answer"
+
+
+def test_streaming_reasoning_block_is_not_done():
+    _, content, _ = stream(["<thinking>", "Still", " going"])
+
+    assert content.startswith('<details type="reasoning" done="false">')
+    assert content.endswith("> Still going\n</details>")
+
+
+def test_empty_reasoning_block_is_dropped():
+    content_stream, content, _ = stream(["<think>", "  ", "</think>", "Answer"])
+    content_stream.finish()
+
+    assert [block["type"] for block in content_stream.content_blocks] == ["text"]
+    assert content == "Answer"
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7])
+def test_reasoning_tags_split_across_chunks(size):
+    text = "Intro <reasoning>step one\nstep two</reasoning> Done"
+    content_stream, content, _ = stream(split_every(text, size))
+    content_stream.finish()
+
+    blocks = content_stream.content_blocks
+    assert [block["type"] for block in blocks] == ["text", "reasoning", "text"]
+    assert blocks[0]["content"] == "Intro "
+    assert blocks[1]["content"] == "step one\nstep two"
+    assert blocks[2]["content"] == "Done"
+
+    # Same result as receiving every tag in a delta of its own
+    _, expected, _ = stream(
+        ["Intro ", "<reasoning>", "step one\nstep two", "</reasoning>", " Done"]
+    )
+    assert content == expected
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        ["Intro\n<think", "\n>", "Plan", "</think>", "Done"],
+        ["Intro\n<thi", "nk\n", ">Plan", "</think>", "Done"],
+        ["Intro\n<think\n>Plan", "</think>", "Done"],
+    ],
+)
+def test_line_break_after_the_tag_name(chunks):
+    content_stream, _, _ = stream(chunks)
+    content_stream.finish()
+
+    blocks = content_stream.content_blocks
+    assert [block["type"] for block in blocks] == ["text", "reasoning", "text"]
+    assert blocks[1]["content"] == "Plan"
+
+
+def test_line_breaks_end_start_tags():
+    # Only one line break may follow the tag name
+    content_stream, content, _ = stream(["<think", "\n", "\n>", "Plan"])
+
+    assert [block["type"] for block in content_stream.content_blocks] == ["text"]
+    assert content == "<think\n\n>Plan"
+
+
+def test_reasoning_detection_disabled():
+    content_stream, content, _ = stream(
+        ["<think>", "hidden", "</think>"], detect_reasoning=False
+    )
+
+    assert [block["type"] for block in content_stream.content_blocks] == ["text"]
+    assert content == "<think>hidden</think>"
+
+
+def test_code_interpreter_block_ends_generation():
+    content_stream, content, ends = stream(
+        [
+            "Let me compute it.\n",
+            '<code_interpreter type="code" lang="python">',
+            "print(1 + 1)",
+            "</code_interpreter>",
+        ],
+        detect_code_interpreter=True,
+    )
+
+    assert ends == [False, False, False, True]
+
+    blocks = content_stream.content_blocks
+    assert [block["type"] for block in blocks] == ["text", "code_interpreter"]
+    assert blocks[1]["attributes"] == {"type": "code", "lang": "python"}
+    assert blocks[1]["content"] == "print(1 + 1)"
+
+    assert '<details type="code_interpreter" done="false">' in content
+    assert "```python\nprint(1 + 1)\n```" in content
+
+    # The output is added to the active block once the code ran
+    blocks[-1]["output"] = {"stdout": "2"}
+    assert '<details type="code_interpreter" done="true"' in (
+        content_stream.serialize()
+    )
+    assert content_stream.diff() is not None
+
+
+@pytest.mark.parametrize("size", [1, 4, 6])
+def test_code_interpreter_tags_split_across_chunks(size):
+    text = 'Run <code_interpreter lang="python">x = 1</code_interpreter>'
+    content_stream, _, ends = stream(
+        split_every(text, size), detect_code_interpreter=True
+    )
+
+    assert ends[-1] is True
+    assert ends.count(True) == 1
+
+    blocks = content_stream.content_blocks
+    assert [block["type"] for block in blocks] == ["text", "code_interpreter"]
+    assert blocks[1]["content"] == "x = 1"
+
+
+def test_code_interpreter_detection_disabled_by_default():
+    content_stream, _, ends = stream(
+        ["<code_interpreter>", "x = 1", "</code_interpreter>"]
+    )
+
+    assert not any(ends)
+    assert [block["type"] for block in content_stream.content_blocks] == ["text"]
+
+
+def test_unknown_tags_stay_in_the_text():
+    # Only reasoning and code interpreter tags start blocks, e.g. a
+    # <solution> section is streamed as plain text
+    content_stream, content, _ = stream(
+        ["<think>Plan</think>", "<solution>", "42", "</solution>"]
+    )
+    content_stream.finish()
+
+    blocks = content_stream.content_blocks
+    assert [block["type"] for block in blocks] == ["reasoning", "text"]
+    assert blocks[1]["content"] == "<solution>42</solution>"
+    assert content.endswith("<solution>42</solution>")
+
+
+def test_serialize_raw():
+    content_stream, _, _ = stream(["<think>", "Plan", "</think>", "Answer"])
+
+    assert content_stream.serialize(raw=True) == "<think>Plan</think>\nAnswer"
+
+
+def test_diff_event():
+    content_stream = ContentBlockStream()
+    content_stream.append("Hi")
+
+    assert content_stream.diff_event() == {
+        "content_offset": 0,
+        "content_delta": "Hi",
+    }
+    assert content_stream.diff_event() is None
+
+
+def test_direct_changes_to_the_active_block():
+    content_stream, content, _ = stream(["Checking"])
+
+    content_stream.content_blocks.append(
+        {"type": "tool_calls", "content": [], "results": []}
+    )
+    offset, text = content_stream.diff()
+    content = f"{content[:offset]}{text}"
+    assert content == content_stream.serialize()
+
+    content_stream.content_blocks.append({"type": "text", "content": ""})
+    content_stream.append("Done")
+    offset, text = content_stream.diff()
+    content = f"{content[:offset]}{text}"
+    assert content == content_stream.serialize()
+    assert content.endswith("Done")
@@ -0,0 +1,121 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from open_webui.utils import filter as filter_module
+from open_webui.utils import plugin
+from open_webui.utils.filter import get_sorted_filter_ids, process_filter_functions
+from open_webui.utils.plugin import PluginCache
+
+
+def function(id, priority=None, is_active=True, is_global=False, type="filter"):
+    return SimpleNamespace(
+        id=id,
+        type=type,
+        is_active=is_active,
+        is_global=is_global,
+        valves={"priority": priority} if priority is not None else None,
+        content="",
+    )
+
+
+class Functions:
+    def __init__(self, records):
+        self.records = records
+        self.version = 1
+
+    def get_version(self):
+        return self.version
+
+    def get_functions_with_valves(self):
+        return list(self.records)
+
+
+@pytest.fixture
+def functions(monkeypatch):
+    functions = Functions([])
+    cache = PluginCache()
+    monkeypatch.setattr(plugin, "Functions", functions)
+    monkeypatch.setattr(filter_module, "PLUGIN_CACHE", cache)
+    return functions
+
+
+def test_filters_are_sorted_by_priority(functions):
+    functions.records = [
+        function("late", priority=10, is_global=True),
+        function("early", priority=-1),
+        function("default"),
+        function("middle", priority=5, is_global=True),
+        function("inactive", priority=0, is_active=False, is_global=True),
+        function("pipe", type="pipe", is_global=True),
+    ]
+    model = {"info": {"meta": {"filterIds": ["early", "default", "missing"]}}}
+
+    assert get_sorted_filter_ids(model) == ["early", "default", "middle", "late"]
+    # Only global filters without the model's own
+    assert get_sorted_filter_ids({}) == ["middle", "late"]
+
+
+def test_priority_changes_apply_with_the_version(functions):
+    functions.records = [
+        function("a", priority=1, is_global=True),
+        function("b", priority=2, is_global=True),
+    ]
+    assert get_sorted_filter_ids({}) == ["a", "b"]
+
+    functions.records = [
+        function("a", priority=3, is_global=True),
+        function("b", priority=2, is_global=True),
+    ]
+    # Served from the cache until the version changes
+    assert get_sorted_filter_ids({}) == ["a", "b"]
+
+    functions.version = 2
+    assert get_sorted_filter_ids({}) == ["b", "a"]
+
+
+class Filter:
+    class Valves(BaseModel):
+        priority: int = 0
+        suffix: str = ""
+
+    def __init__(self):
+        self.valves = self.Valves()
+
+    def inlet(self, body):
+        return {**body, "content": body["content"] + self.valves.suffix}
+
+
+def test_filters_use_the_current_valves(monkeypatch, functions):
+    module = Filter()
+    monkeypatch.setattr(
+        filter_module, "get_function_module", lambda request, id, function: module
+    )
+
+    def run():
+        body, _ = asyncio.run(
+            process_filter_functions(
+                request=None,
+                filter_ids=["f"],
+                filter_type="inlet",
+                form_data={"content": "x"},
+                extra_params={},
+            )
+        )
+        return body["content"]
+
+    functions.records = [function("f")]
+    functions.records[0].valves = {"suffix": "!"}
+    assert run() == "x!"
+    valves = module.valves
+
+    # The same Valves object while the valves are unchanged
+    assert run() == "x!"
+    assert module.valves is valves
+
+    functions.records = [function("f")]
+    functions.records[0].valves = {"suffix": "?"}
+    filter_module.PLUGIN_CACHE.invalidate()
+    assert run() == "x?"
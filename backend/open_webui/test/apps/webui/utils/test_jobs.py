@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from open_webui.internal.db import get_db
+from open_webui.models.jobs import Job, Jobs
+from open_webui.utils import jobs as jobs_module
+from open_webui.utils.jobs import JobQueue, report_job_progress
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs(monkeypatch):
+    monkeypatch.setattr(
+        jobs_module,
+        "Users",
+        SimpleNamespace(get_user_by_id=lambda id: SimpleNamespace(id=id)),
+    )
+    monkeypatch.setattr(jobs_module, "JOB_HANDLERS", {})
+
+    with get_db() as db:
+        db.query(Job).delete()
+        db.commit()
+    yield
+    with get_db() as db:
+        db.query(Job).delete()
+        db.commit()
+
+
+def run_job(queue, job_id):
+    job = Jobs.claim_next_job(queue.user_concurrency, queue.max_attempts)
+    assert job.id == job_id
+    queue._run_job(job)
+    return Jobs.get_job_by_id(job_id)
+
+
+def test_completed_job():
+    def handler(request, user, data):
+        report_job_progress({"done": 1})
+        return {"user_id": user.id, **data}
+
+    jobs_module.JOB_HANDLERS["test"] = handler
+    queue = JobQueue(app=None, workers=1)
+    job = queue.enqueue("a", "test", {"file_id": "1"})
+
+    job = run_job(queue, job.id)
+    assert job.status == "completed"
+    assert job.progress == {"done": 1}
+    assert job.result == {"user_id": "a", "file_id": "1"}
+
+
+def test_failed_job_backs_off_until_max_attempts():
+    def handler(request, user, data):
+        raise Exception("boom")
+
+    jobs_module.JOB_HANDLERS["test"] = handler
+    queue = JobQueue(app=None, workers=1, max_attempts=2)
+    job = queue.enqueue("a", "test", {})
+
+    now = int(time.time())
+    job = run_job(queue, job.id)
+    assert job.status == "pending"
+    assert job.error == "boom"
+    # 2 ** attempts * 5 seconds
+    assert now + 10 <= job.scheduled_at <= now + 11
+    assert Jobs.claim_next_job(1, 2) is None
+
+    with get_db() as db:
+        db.query(Job).filter_by(id=job.id).update({"scheduled_at": 0})
+        db.commit()
+
+    job = run_job(queue, job.id)
+    assert job.status == "failed"
+    assert job.attempts == 2
+
+
+def test_unknown_job_type_fails():
+    queue = JobQueue(app=None, workers=1, max_attempts=1)
+    job = queue.enqueue("a", "missing", {})
+
+    job = run_job(queue, job.id)
+    assert job.status == "failed"
+    assert "Unknown job type" in job.error
+
+
+def test_poll_respects_workers_and_user_concurrency():
+    release = threading.Event()
+    started = []
+
+    def handler(request, user, data):
+        started.append(user.id)
+        release.wait(5)
+        return {}
+
+    jobs_module.JOB_HANDLERS["test"] = handler
+    queue = JobQueue(app=None, workers=3, user_concurrency=2)
+
+    for user_id in ["a", "a", "a", "b", "b"]:
+        queue.enqueue(user_id, "test", {})
+
+    async def main():
+        queue._loop = asyncio.get_running_loop()
+
+        await queue._poll()
+        running = list(queue._running.values())
+        assert len(running) == 3
+        assert sum(job.user_id == "a" for job in running) <= 2
+
+        release.set()
+        while queue._running:
+            await asyncio.sleep(0.01)
+
+        # The remaining jobs are claimed by the next polls
+        for _ in range(100):
+            await queue._poll()
+            while queue._running:
+                await asyncio.sleep(0.01)
+            if len(started) == 5:
+                break
+
+    asyncio.run(main())
+    queue.shutdown()
+
+    assert sorted(started) == ["a", "a", "a", "b", "b"]
+    assert {job.status for job in Jobs.get_jobs_by_user_id("a")} == {"completed"}
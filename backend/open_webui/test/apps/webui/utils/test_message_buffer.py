@@ -0,0 +1,122 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from open_webui.utils import message_buffer as message_buffer_module
+from open_webui.utils.message_buffer import MessageWriteBuffer
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    writes = []
+    monkeypatch.setattr(
+        message_buffer_module,
+        "Chats",
+        SimpleNamespace(
+            upsert_message_to_chat_by_id_and_message_id=lambda *args: writes.append(
+                args
+            )
+        ),
+    )
+    return writes
+
+
+def test_updates_are_coalesced_until_close(writes):
+    async def main():
+        buffer = MessageWriteBuffer("chat", "message", interval=60, buffer_size=1000)
+        for content in ["a", "ab", "abc"]:
+            await buffer.update({"content": content})
+        assert writes == []
+
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(main())
+    assert writes == [("chat", "message", {"content": "abc"})]
+    assert buffer.write_count == 1
+
+
+def test_interval_flush(writes):
+    async def main():
+        buffer = MessageWriteBuffer("chat", "message", interval=0.05, buffer_size=1000)
+        await buffer.update({"content": "a"})
+        await buffer.update({"content": "ab"})
+        assert writes == []
+
+        # Written by the timer once the interval passed
+        await asyncio.sleep(0.1)
+        assert writes == [("chat", "message", {"content": "ab"})]
+
+        # Updates after the interval are written right away
+        await buffer.update({"content": "abc"})
+        assert len(writes) == 2
+
+        await buffer.close()
+
+    asyncio.run(main())
+    assert len(writes) == 2
+
+
+def test_size_flush(writes):
+    async def main():
+        buffer = MessageWriteBuffer("chat", "message", interval=60, buffer_size=10)
+        await buffer.update({"content": "x" * 5})
+        assert writes == []
+
+        await buffer.update({"content": "x" * 10})
+        assert writes == [("chat", "message", {"content": "x" * 10})]
+
+        # Only the growth since the last write counts
+        await buffer.update({"content": "x" * 15})
+        assert len(writes) == 1
+
+        # as do sizes given for values that can't be measured
+        await buffer.update({"output": lambda: "..."}, size=10)
+        assert len(writes) == 2
+        assert writes[-1][2] == {"content": "x" * 15, "output": "..."}
+
+        await buffer.close()
+
+    asyncio.run(main())
+    assert len(writes) == 2
+
+
+def test_callables_are_evaluated_on_flush(writes):
+    calls = []
+
+    def content():
+        calls.append(1)
+        return "serialized"
+
+    async def main():
+        buffer = MessageWriteBuffer("chat", "message", interval=60, buffer_size=1000)
+        for _ in range(5):
+            await buffer.update({"content": content})
+        assert calls == []
+
+        await buffer.close()
+
+    asyncio.run(main())
+    assert calls == [1]
+    assert writes == [("chat", "message", {"content": "serialized"})]
+
+
+def test_close_cancels_the_timer(writes):
+    async def main():
+        buffer = MessageWriteBuffer("chat", "message", interval=0.05, buffer_size=1000)
+        await buffer.update({"content": "a"})
+        await buffer.close()
+        assert buffer._timer.done()
+
+        # Nothing left to write
+        await asyncio.sleep(0.1)
+        await buffer.close()
+
+    asyncio.run(main())
+    assert writes == [("chat", "message", {"content": "a"})]
+
+
+def test_close_without_updates_does_not_write(writes):
+    asyncio.run(MessageWriteBuffer("chat", "message").close())
+    assert writes == []
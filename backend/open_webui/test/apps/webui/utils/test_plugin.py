@@ -0,0 +1,155 @@
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from open_webui.utils import plugin
+from open_webui.utils.plugin import (
+    PluginCache,
+    get_content_hash,
+    load_function_module_by_id,
+    unload_plugin_module,
+)
+
+FILTER = """
+class Filter:
+    def inlet(self, body):
+        return body
+"""
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(plugin, "PLUGIN_CACHE_DIR", tmp_path)
+    yield tmp_path
+    unload_plugin_module("function_test_filter")
+
+
+def cached_files(cache_dir):
+    return sorted(path.name for path in cache_dir.iterdir())
+
+
+def files_for(content):
+    content_hash = get_content_hash(content)
+    return [f"{content_hash}.marshal", f"{content_hash}.py"]
+
+
+def test_compiled_code_is_cached(cache_dir):
+    _, function_type, _ = load_function_module_by_id("test_filter", content=FILTER)
+
+    assert function_type == "filter"
+    assert cached_files(cache_dir) == files_for(FILTER)
+
+    # Loaded again from the cache
+    module, _, _ = load_function_module_by_id("test_filter", content=FILTER)
+    assert module.inlet({"a": 1}) == {"a": 1}
+
+
+def test_reload_removes_the_previous_code(cache_dir):
+    updated = FILTER.replace("return body", "return {**body, 'b': 2}")
+
+    load_function_module_by_id("test_filter", content=FILTER)
+    module, _, _ = load_function_module_by_id("test_filter", content=updated)
+
+    assert module.inlet({"a": 1}) == {"a": 1, "b": 2}
+    assert cached_files(cache_dir) == files_for(updated)
+
+
+def test_unload_removes_the_code(cache_dir):
+    load_function_module_by_id("test_filter", content=FILTER)
+
+    unload_plugin_module("function_test_filter", FILTER)
+    assert cached_files(cache_dir) == []
+
+    # Also without the module loaded in this process
+    plugin.compile_plugin_content(FILTER)
+    unload_plugin_module("function_test_filter", FILTER)
+    assert cached_files(cache_dir) == []
+
+
+class FakeTable:
+    """
+    Stands in for the functions and tools tables: records are returned by
+    `get_functions_with_valves`/`get_tools_with_valves`, counting the queries.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.version = (len(records), 1)
+        self.queries = 0
+
+    def get_version(self):
+        return self.version
+
+    def get_records(self):
+        self.queries += 1
+        return list(self.records)
+
+    get_functions_with_valves = get_records
+    get_tools_with_valves = get_records
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    functions = FakeTable([SimpleNamespace(id="f", valves={"priority": 1})])
+    tools = FakeTable([SimpleNamespace(id="t", valves=None)])
+    monkeypatch.setattr(plugin, "Functions", functions)
+    monkeypatch.setattr(plugin, "Tools", tools)
+    return functions, tools
+
+
+def test_records_are_cached_per_version(tables):
+    functions, tools = tables
+    cache = PluginCache()
+
+    assert list(cache.get_functions()) == ["f"]
+    assert cache.get_functions() is cache.get_functions()
+    assert list(cache.get_tools()) == ["t"]
+    cache.get_tools()
+    assert (functions.queries, tools.queries) == (1, 1)
+
+    # e.g. a function saved through another worker
+    functions.records = [SimpleNamespace(id="g", valves=None)]
+    functions.version = (1, 2)
+    assert list(cache.get_functions()) == ["g"]
+    assert (functions.queries, tools.queries) == (2, 1)
+
+
+def test_invalidate_refetches_records(tables):
+    functions, tools = tables
+    cache = PluginCache()
+    cache.get_functions()
+    cache.get_tools()
+
+    # Changes within the same second may leave the version unchanged
+    functions.records = [SimpleNamespace(id="f", valves={"priority": 2})]
+    cache.invalidate()
+
+    assert cache.get_functions()["f"].valves == {"priority": 2}
+    cache.get_tools()
+    assert (functions.queries, tools.queries) == (2, 2)
+
+
+class Valves(BaseModel):
+    priority: int = 0
+
+
+def test_valves_are_rebuilt_when_they_change():
+    cache = PluginCache()
+
+    valves = cache.get_valves("functions", "f", Valves, {"priority": 1})
+    assert valves.priority == 1
+    assert cache.get_valves("functions", "f", Valves, {"priority": 1}) is valves
+    # Cached per plugin
+    assert cache.get_valves("tools", "f", Valves, {"priority": 1}) is not valves
+
+    updated = cache.get_valves("functions", "f", Valves, {"priority": 2})
+    assert updated.priority == 2
+    assert cache.get_valves("functions", "f", Valves, None).priority == 0
+
+    # A reloaded module has a new Valves class
+    class ReloadedValves(Valves):
+        pass
+
+    reloaded = cache.get_valves("functions", "f", ReloadedValves, None)
+    assert isinstance(reloaded, ReloadedValves)
@@ -0,0 +1,155 @@
+import asyncio
+
+from open_webui.utils.stages import Stage, run_stages
+
+
+def stage(name, events, result=None, delay=0, error=None, **kwargs):
+    """
+    A stage recording when it starts and ends in `events`, and the results of
+    the stages it saw when it started.
+    """
+
+    async def run(results):
+        events.append(("start", name, dict(results)))
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        events.append(("end", name))
+        return result
+
+    return Stage(name, run, **kwargs)
+
+
+def order(events):
+    return [event[:2] for event in events]
+
+
+def test_independent_stages_run_concurrently():
+    events = []
+    results = asyncio.run(
+        run_stages(
+            [
+                stage("a", events, "A", delay=0.05),
+                stage("b", events, "B", delay=0.01),
+            ]
+        )
+    )
+
+    assert results == {"a": "A", "b": "B"}
+    assert order(events) == [
+        ("start", "a"),
+        ("start", "b"),
+        ("end", "b"),
+        ("end", "a"),
+    ]
+
+
+def test_dependencies_run_first():
+    events = []
+    results = asyncio.run(
+        run_stages(
+            [
+                # Declared before its dependencies
+                stage("c", events, "C", depends_on=["a", "b"]),
+                stage("a", events, "A", delay=0.02),
+                stage("b", events, "B", depends_on=["a"]),
+            ]
+        )
+    )
+
+    assert results == {"a": "A", "b": "B", "c": "C"}
+    assert order(events) == [
+        ("start", "a"),
+        ("end", "a"),
+        ("start", "b"),
+        ("end", "b"),
+        ("start", "c"),
+        ("end", "c"),
+    ]
+    # Each stage sees the results of its dependencies
+    assert events[2][2] == {"a": "A"}
+    assert events[4][2] == {"a": "A", "b": "B"}
+
+
+def test_unscheduled_dependencies_are_ignored():
+    events = []
+    results = asyncio.run(run_stages([stage("b", events, "B", depends_on=["missing"])]))
+
+    assert results == {"b": "B"}
+
+
+def test_failed_stage_is_left_out():
+    events = []
+    errors = []
+
+    async def on_error():
+        errors.append("a")
+
+    results = asyncio.run(
+        run_stages(
+            [
+                stage("a", events, error=ValueError("boom"), on_error=on_error),
+                stage("b", events, "B", depends_on=["a"]),
+            ]
+        )
+    )
+
+    assert results == {"b": "B"}
+    assert errors == ["a"]
+    # Dependents still run once the failed stage is done, without its result
+    assert ("start", "b", {}) in events
+
+
+def test_timed_out_stage_is_left_out():
+    events = []
+    errors = []
+
+    async def on_error():
+        errors.append("slow")
+
+    results = asyncio.run(
+        run_stages(
+            [
+                stage("slow", events, "S", delay=1, timeout=0.05, on_error=on_error),
+                stage("fast", events, "F"),
+                stage("after", events, "A", depends_on=["slow"]),
+            ]
+        )
+    )
+
+    assert results == {"fast": "F", "after": "A"}
+    assert errors == ["slow"]
+    assert ("end", "slow") not in order(events)
+
+
+def test_zero_timeout_disables_it():
+    events = []
+    results = asyncio.run(run_stages([stage("a", events, "A", delay=0.05, timeout=0)]))
+
+    assert results == {"a": "A"}
+
+
+def test_failing_on_error_is_ignored():
+    events = []
+
+    async def on_error():
+        raise RuntimeError("emitter closed")
+
+    results = asyncio.run(
+        run_stages(
+            [
+                stage("a", events, error=ValueError("boom"), on_error=on_error),
+                stage("b", events, "B"),
+            ]
+        )
+    )
+
+    assert results == {"b": "B"}
+
+
+def test_none_result_is_kept():
+    events = []
+    results = asyncio.run(run_stages([stage("a", events, None)]))
+
+    assert results == {"a": None}
+    assert asyncio.run(run_stages([])) == {}
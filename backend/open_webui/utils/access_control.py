@@ -53,7 +53,7 @@ def get_permissions(
                     )  # Use the most permissive value (True > False)
         return permissions
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_groups = Groups.get_cached_groups_by_member_id(user_id)
 
     # Deep copy default permissions to avoid modifying the original dict
     permissions = json.loads(json.dumps(default_permissions))
@@ -93,7 +93,7 @@ def has_permission(
     permission_hierarchy = permission_key.split(".")
 
     # Retrieve user group permissions
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_groups = Groups.get_cached_groups_by_member_id(user_id)
 
     for group in user_groups:
         group_permissions = group.permissions
@@ -107,16 +107,25 @@ def has_permission(
     return get_permission(default_permissions, permission_hierarchy)
 
 
+def get_user_group_ids(user_id: str) -> set[str]:
+    return {group.id for group in Groups.get_cached_groups_by_member_id(user_id)}
+
+
 def has_access(
     user_id: str,
     type: str = "write",
     access_control: Optional[dict] = None,
+    user_group_ids: Optional[set[str]] = None,
 ) -> bool:
+    """
+    `user_group_ids` can be passed when checking many resources for the same
+    user, see `get_user_group_ids`.
+    """
     if access_control is None:
         return type == "read"
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
-    user_group_ids = [group.id for group in user_groups]
+    if user_group_ids is None:
+        user_group_ids = get_user_group_ids(user_id)
     permission_access = access_control.get(type, {})
     permitted_group_ids = permission_access.get("group_ids", [])
     permitted_user_ids = permission_access.get("user_ids", [])
@@ -1,4 +1,6 @@
+import asyncio
 import logging
+import time
 import uuid
 import jwt
 
@@ -8,7 +10,7 @@ from typing import Optional, Union, List, Dict
 from open_webui.models.users import Users
 
 from open_webui.constants import ERROR_MESSAGES
-from open_webui.env import WEBUI_SECRET_KEY
+from open_webui.env import WEBUI_SECRET_KEY, USER_LAST_ACTIVE_INTERVAL
 
 from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -28,6 +30,58 @@ bearer_security = HTTPBearer(auto_error=False)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+class LastActiveTracker:
+    """
+    Records user activity in memory and writes `last_active_at` in bulk,
+    at most once per `interval` seconds per user.
+    """
+
+    def __init__(self, interval: float = USER_LAST_ACTIVE_INTERVAL):
+        self.interval = interval
+
+        self._pending: dict[str, int] = {}
+        self._written_at: dict[str, float] = {}
+        self._last_flush_at = 0.0
+        self._timer: Optional[asyncio.Task] = None
+
+    async def touch(self, user_id: str):
+        now = time.monotonic()
+        if now - self._written_at.get(user_id, -self.interval) < self.interval:
+            return
+
+        self._written_at[user_id] = now
+        self._pending[user_id] = int(time.time())
+
+        if now - self._last_flush_at >= self.interval:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(
+            max(self.interval - (time.monotonic() - self._last_flush_at), 0)
+        )
+        await self.flush()
+
+    async def flush(self):
+        now = time.monotonic()
+        self._last_flush_at = now
+
+        # Users not seen for an interval are written on their next request anyway
+        self._written_at = {
+            user_id: written_at
+            for user_id, written_at in self._written_at.items()
+            if now - written_at < self.interval
+        }
+
+        pending, self._pending = self._pending, {}
+        if pending:
+            await Users.update_users_last_active_async(pending)
+
+
+last_active_tracker = LastActiveTracker()
+
+
 def verify_password(plain_password, hashed_password):
     return (
         pwd_context.verify(plain_password, hashed_password) if hashed_password else None
@@ -74,7 +128,7 @@ def get_http_authorization_cred(auth_header: str):
         raise ValueError(ERROR_MESSAGES.INVALID_TOKEN)
 
 
-def get_current_user(
+async def get_current_user(
     request: Request,
     auth_token: HTTPAuthorizationCredentials = Depends(bearer_security),
 ):
@@ -109,7 +163,7 @@ def get_current_user(
                     status.HTTP_403_FORBIDDEN, detail=ERROR_MESSAGES.API_KEY_NOT_ALLOWED
                 )
 
-        return get_current_user_by_api_key(token)
+        return await get_current_user_by_api_key(token)
 
     # auth by jwt token
     try:
@@ -121,14 +175,14 @@ def get_current_user(
         )
 
     if data is not None and "id" in data:
-        user = Users.get_user_by_id(data["id"])
+        user = await Users.get_cached_user_by_id_async(data["id"])
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ERROR_MESSAGES.INVALID_TOKEN,
             )
         else:
-            Users.update_user_last_active_by_id(user.id)
+            await last_active_tracker.touch(user.id)
         return user
     else:
         raise HTTPException(
@@ -137,8 +191,8 @@ def get_current_user(
         )
 
 
-def get_current_user_by_api_key(api_key: str):
-    user = Users.get_user_by_api_key(api_key)
+async def get_current_user_by_api_key(api_key: str):
+    user = await Users.get_cached_user_by_api_key_async(api_key)
 
     if user is None:
         raise HTTPException(
@@ -146,7 +200,7 @@ def get_current_user_by_api_key(api_key: str):
             detail=ERROR_MESSAGES.INVALID_TOKEN,
         )
     else:
-        Users.update_user_last_active_by_id(user.id)
+        await last_active_tracker.touch(user.id)
 
     return user
 
@@ -0,0 +1,178 @@
+import logging
+import random
+import time
+from typing import Callable, Optional
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    OLLAMA_BALANCER_STRATEGY,
+    OLLAMA_BALANCER_FAILURE_THRESHOLD,
+    OLLAMA_BALANCER_EJECT_COOLDOWN,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def choose_random(balancer, urls: list[str], weights: list[float]) -> str:
+    return random.choice(urls)
+
+
+def choose_least_outstanding(balancer, urls: list[str], weights: list[float]) -> str:
+    in_flight = {url: balancer.get_backend(url)["in_flight"] for url in urls}
+    least = min(in_flight.values())
+    return random.choice([url for url in urls if in_flight[url] == least])
+
+
+def choose_ewma(balancer, urls: list[str], weights: list[float]) -> str:
+    # Expected wait: average latency times the requests already queued on it.
+    # Backends without samples score 0 so they are tried first.
+    def score(url):
+        backend = balancer.get_backend(url)
+        return (backend["ewma"] or 0) * (backend["in_flight"] + 1)
+
+    scores = {url: score(url) for url in urls}
+    lowest = min(scores.values())
+    return random.choice([url for url in urls if scores[url] == lowest])
+
+
+def choose_weighted(balancer, urls: list[str], weights: list[float]) -> str:
+    return random.choices(urls, weights=weights)[0]
+
+
+BALANCER_STRATEGIES: dict[str, Callable] = {
+    "random": choose_random,
+    "least_outstanding": choose_least_outstanding,
+    "ewma": choose_ewma,
+    "weighted": choose_weighted,
+}
+
+
+class UpstreamBalancer:
+    """
+    Picks one of several replicas (by base URL) serving the same model and keeps
+    per-replica load, latency and health.
+
+    Callers `start()` a request on the chosen replica, report the outcome with
+    `succeed()` (latency to the response headers) or `fail()`, and `finish()` once
+    the response has been fully streamed. A replica failing `failure_threshold`
+    times in a row is ejected for `cooldown` seconds; if every candidate is
+    ejected, all of them are considered again.
+
+    Strategies are looked up by name in `BALANCER_STRATEGIES`.
+    """
+
+    def __init__(
+        self,
+        strategy: str = OLLAMA_BALANCER_STRATEGY,
+        failure_threshold: int = OLLAMA_BALANCER_FAILURE_THRESHOLD,
+        cooldown: float = OLLAMA_BALANCER_EJECT_COOLDOWN,
+        alpha: float = 0.3,
+    ):
+        if strategy not in BALANCER_STRATEGIES:
+            log.warning(f"Unknown balancer strategy {strategy}, using random")
+            strategy = "random"
+
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+
+        self._backends: dict[str, dict] = {}
+
+    def get_backend(self, url: str) -> dict:
+        backend = self._backends.get(url)
+        if backend is None:
+            backend = {
+                "in_flight": 0,
+                "requests": 0,
+                "failures": 0,
+                "consecutive_failures": 0,
+                "ejected_until": None,
+                # Latency to the response headers, in seconds
+                "ewma": None,
+                "histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+            self._backends[url] = backend
+        return backend
+
+    def is_ejected(self, url: str) -> bool:
+        ejected_until = self.get_backend(url)["ejected_until"]
+        return ejected_until is not None and ejected_until > time.monotonic()
+
+    def choose(self, urls: list[str], weights: Optional[list[float]] = None) -> str:
+        if weights is None:
+            weights = [1] * len(urls)
+
+        candidates = [
+            (url, weight)
+            for url, weight in zip(urls, weights)
+            if not self.is_ejected(url)
+        ]
+        if not candidates:
+            candidates = list(zip(urls, weights))
+
+        urls, weights = [list(values) for values in zip(*candidates)]
+        return BALANCER_STRATEGIES[self.strategy](self, urls, weights)
+
+    def start(self, url: str) -> float:
+        backend = self.get_backend(url)
+        backend["in_flight"] += 1
+        backend["requests"] += 1
+        return time.monotonic()
+
+    def succeed(self, url: str, started_at: float):
+        backend = self.get_backend(url)
+        latency = time.monotonic() - started_at
+
+        backend["consecutive_failures"] = 0
+        backend["ejected_until"] = None
+        backend["ewma"] = (
+            latency
+            if backend["ewma"] is None
+            else self.alpha * latency + (1 - self.alpha) * backend["ewma"]
+        )
+
+        bucket = next(
+            (idx for idx, bound in enumerate(LATENCY_BUCKETS) if latency <= bound),
+            len(LATENCY_BUCKETS),
+        )
+        backend["histogram"][bucket] += 1
+
+    def fail(self, url: str):
+        backend = self.get_backend(url)
+        backend["failures"] += 1
+        backend["consecutive_failures"] += 1
+
+        if backend["consecutive_failures"] >= self.failure_threshold:
+            if not self.is_ejected(url):
+                log.warning(f"Ejecting {url} for {self.cooldown}s after failures")
+            backend["ejected_until"] = time.monotonic() + self.cooldown
+
+    def finish(self, url: str):
+        backend = self.get_backend(url)
+        backend["in_flight"] = max(backend["in_flight"] - 1, 0)
+
+    def get_stats(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "backends": {
+                url: {
+                    "in_flight": backend["in_flight"],
+                    "requests": backend["requests"],
+                    "failures": backend["failures"],
+                    "ejected": self.is_ejected(url),
+                    "ewma": backend["ewma"],
+                    "histogram": dict(
+                        zip(
+                            [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"],
+                            backend["histogram"],
+                        )
+                    ),
+                }
+                for url, backend in self._backends.items()
+            },
+        }
@@ -0,0 +1,579 @@
+import html
+import json
+import re
+import time
+from typing import Optional
+
+
+REASONING_TAGS = [
+    "think",
+    "thinking",
+    "reason",
+    "reasoning",
+    "thought",
+    "Thought",
+]
+CODE_INTERPRETER_TAGS = ["code_interpreter"]
+
+# Line separators other than "\n" recognized by `str.splitlines`
+LINE_BREAKS = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+# What the serialized content ends with while a reasoning block is streaming
+REASONING_SUFFIX = "\n</details>"
+
+# Longest closing tag we need to be able to find across delta boundaries
+TAG_LOOKBEHIND = max(len(f"</{tag}>") for tag in REASONING_TAGS + CODE_INTERPRETER_TAGS)
+
+
+def split_content_and_whitespace(content):
+    content_stripped = content.rstrip()
+    original_whitespace = (
+        content[len(content_stripped) :] if len(content) > len(content_stripped) else ""
+    )
+    return content_stripped, original_whitespace
+
+
+def is_opening_code_block(content):
+    backtick_segments = content.split("```")
+    # Even number of segments means the last backticks are opening a new block
+    return len(backtick_segments) > 1 and len(backtick_segments) % 2 == 0
+
+
+def extract_attributes(tag_content):
+    """Extract attributes from a tag if they exist."""
+    attributes = {}
+    if not tag_content:  # Ensure tag_content is not None
+        return attributes
+    # Match attributes in the format: key="value" (ignores single quotes for simplicity)
+    matches = re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content)
+    for key, value in matches:
+        attributes[key] = value
+    return attributes
+
+
+def serialize_content_block(content: str, block: dict, raw: bool = False) -> str:
+    """
+    Appends the serialized form of `block` to the already serialized `content`.
+    """
+    if block["type"] == "text":
+        content = f"{content}{block['content'].strip()}\n"
+    elif block["type"] == "tool_calls":
+        attributes = block.get("attributes", {})
+
+        block_content = block.get("content", [])
+        results = block.get("results", [])
+
+        if results:
+
+            result_display_content = ""
+
+            for result in results:
+                tool_call_id = result.get("tool_call_id", "")
+                tool_name = ""
+
+                for tool_call in block_content:
+                    if tool_call.get("id", "") == tool_call_id:
+                        tool_name = tool_call.get("function", {}).get("name", "")
+                        break
+
+                result_display_content = f"{result_display_content}\n> {tool_name}: {result.get('content', '')}"
+
+            if not raw:
+                content = f'{content}\n<details type="tool_calls" done="true" content="{html.escape(json.dumps(block_content))}" results="{html.escape(json.dumps(results))}">\n<summary>Tool Executed</summary>\n{result_display_content}\n</details>\n'
+        else:
+            tool_calls_display_content = ""
+
+            for tool_call in block_content:
+                tool_calls_display_content = f"{tool_calls_display_content}\n> Executing {tool_call.get('function', {}).get('name', '')}"
+
+            if not raw:
+                content = f'{content}\n<details type="tool_calls" done="false" content="{html.escape(json.dumps(block_content))}">\n<summary>Tool Executing...</summary>\n{tool_calls_display_content}\n</details>\n'
+
+    elif block["type"] == "reasoning":
+        reasoning_display_content = "\n".join(
+            (f"> {line}" if not line.startswith(">") else line)
+            for line in block["content"].splitlines()
+        )
+
+        reasoning_duration = block.get("duration", None)
+
+        if reasoning_duration is not None:
+            if raw:
+                content = (
+                    f'{content}\n<{block["tag"]}>{block["content"]}</{block["tag"]}>\n'
+                )
+            else:
+                content = f'{content}\n<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+        else:
+            if raw:
+                content = (
+                    f'{content}\n<{block["tag"]}>{block["content"]}</{block["tag"]}>\n'
+                )
+            else:
+                content = f'{content}\n<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+
+    elif block["type"] == "code_interpreter":
+        attributes = block.get("attributes", {})
+        output = block.get("output", None)
+        lang = attributes.get("lang", "")
+
+        content_stripped, original_whitespace = split_content_and_whitespace(content)
+        if is_opening_code_block(content_stripped):
+            # Remove trailing backticks that would open a new block
+            content = content_stripped.rstrip("`").rstrip() + original_whitespace
+        else:
+            # Keep content as is - either closing backticks or no backticks
+            content = content_stripped + original_whitespace
+
+        if output:
+            output = html.escape(json.dumps(output))
+
+            if raw:
+                content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
+            else:
+                content = f'{content}\n<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+        else:
+            if raw:
+                content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
+            else:
+                content = f'{content}\n<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+
+    else:
+        block_content = str(block["content"]).strip()
+        content = f"{content}{block['type']}: {block_content}\n"
+
+    return content
+
+
+def serialize_content_blocks(content_blocks: list[dict], raw: bool = False) -> str:
+    content = ""
+    for block in content_blocks:
+        content = serialize_content_block(content, block, raw)
+    return content.strip()
+
+
+def convert_content_blocks_to_messages(content_blocks: list[dict]) -> list[dict]:
+    messages = []
+
+    temp_blocks = []
+    for idx, block in enumerate(content_blocks):
+        if block["type"] == "tool_calls":
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": serialize_content_blocks(temp_blocks),
+                    "tool_calls": block.get("content"),
+                }
+            )
+
+            results = block.get("results", [])
+
+            for result in results:
+                messages.append(
+                    {
+                        "role": "tool",
+                        "tool_call_id": result["tool_call_id"],
+                        "content": result["content"],
+                    }
+                )
+            temp_blocks = []
+        else:
+            temp_blocks.append(block)
+
+    if temp_blocks:
+        content = serialize_content_blocks(temp_blocks)
+        if content:
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": content,
+                }
+            )
+
+    return messages
+
+
+def get_common_prefix_length(a: str, b: str) -> int:
+    if b.startswith(a):
+        return len(a)
+
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class ContentBlockStream:
+    """
+    Incremental parser and serializer for a streamed assistant message.
+
+    Deltas are buffered for the active (last) block, and only the newly received
+    text is scanned for reasoning/code interpreter tags. The serialization of
+    every block before the active one is cached, so `serialize()` only re-renders
+    the active block, and `diff()` reports what changed since the previous call
+    so callers can emit changes instead of the full content.
+
+    Blocks other than the active one are treated as final; code mutating
+    `content_blocks` directly must only touch the last block, and should call
+    `finish()` before reading block contents once streaming stops.
+    """
+
+    def __init__(
+        self,
+        content: str = "",
+        detect_reasoning: bool = True,
+        detect_code_interpreter: bool = False,
+    ):
+        self.detect_reasoning = detect_reasoning
+        self.detect_code_interpreter = detect_code_interpreter
+
+        self.content_blocks = [{"type": "text", "content": content}]
+
+        self._raw = [content]
+        self._ended_tags = set()
+
+        # Active block state
+        self._active = None
+        self._chunks = []
+        self._scan = ""
+        self._tail = ""
+
+        # Serialization state
+        self._folded = []
+        self._emitted = []
+        self._emitted_length = 0
+        self._unsent = []
+        self._fast_block = None
+        self._pending_whitespace = ""
+        self._reasoning_line = ""
+        self._reasoning_has_lines = False
+        self._reasoning_end = 0
+
+        self._activate(self.content_blocks[-1])
+
+    @property
+    def content(self) -> str:
+        """Raw streamed content with completed tag sections removed."""
+        content = "".join(self._raw)
+        self._raw = [content]
+
+        for tag in self._ended_tags:
+            content = re.sub(
+                rf"<{tag}(.*?)>(.|\n)*?</{tag}>", "", content, flags=re.DOTALL
+            )
+        return content
+
+    @property
+    def emitted(self) -> str:
+        """Serialized content as of the last `diff()`."""
+        return "".join(self._emitted)
+
+    def _activate(self, block: dict):
+        self._active = block
+        self._chunks = []
+
+        content = str(block.get("content", "")) if block["type"] != "tool_calls" else ""
+        # Everything the block starts with still has to be scanned once
+        self._scan = content
+        self._tail = content
+
+    def _materialize(self) -> Optional[dict]:
+        if self._active is not None and self._chunks:
+            self._active["content"] = self._active["content"] + "".join(self._chunks)
+            self._chunks = []
+        return self._active
+
+    def append(self, value: str) -> bool:
+        """
+        Appends a streamed delta. Returns True when a code interpreter block was
+        closed and generation should stop so the code can be executed.
+        """
+        self._raw.append(value)
+
+        if not self.content_blocks:
+            self.content_blocks.append({"type": "text", "content": ""})
+        if self.content_blocks[-1] is not self._active:
+            self._materialize()
+            self._activate(self.content_blocks[-1])
+
+        window = f"{self._tail}{value}"
+        self._chunks.append(value)
+        self._unsent.append(value)
+        self._tail = window[-TAG_LOOKBEHIND:]
+
+        self._scan = f"{self._scan}{value}"
+        active = self._active
+
+        end = False
+        if self.detect_reasoning:
+            self._handle_tags("reasoning", REASONING_TAGS, window)
+
+        if self.detect_code_interpreter:
+            end = self._handle_tags("code_interpreter", CODE_INTERPRETER_TAGS, window)
+
+        # In the start tag pattern `<tag(\s.*?)?>`, `.` doesn't match "\n": a
+        # start tag only contains a line break right after its name. A match
+        # still to come thus starts after the last line break, or at a `<tag`
+        # right before it, and earlier lines never need a rescan. A block
+        # started by this delta still has its initial content scanned once.
+        index = self._scan.rfind("\n")
+        if index >= 0 and self._active is active:
+            tag_start = re.search(r"<[^\s<>]*$", self._scan[:index])
+            self._scan = self._scan[tag_start.start() if tag_start else index + 1 :]
+
+        return end
+
+    def _handle_tags(self, content_type: str, tags: list[str], window: str) -> bool:
+        block = self.content_blocks[-1]
+
+        if block["type"] == "text":
+            if "<" not in self._scan:
+                return False
+
+            for tag in tags:
+                # Match start tag e.g., <tag> or <tag attr="value">
+                match = re.search(rf"<{tag}(\s.*?)?>", self._scan)
+                if match:
+                    text = self._materialize()["content"]
+                    start = len(text) - len(self._scan) + match.start()
+
+                    # Capture everything before and after the matched tag
+                    before_tag = text[:start]
+                    after_tag = text[start + len(match.group(0)) :]
+
+                    if before_tag:
+                        block["content"] = before_tag
+                    else:
+                        self.content_blocks.pop()
+
+                    self.content_blocks.append(
+                        {
+                            "type": content_type,
+                            "tag": tag,
+                            "attributes": extract_attributes(match.group(1) or ""),
+                            "content": after_tag,
+                            "started_at": time.time(),
+                        }
+                    )
+                    self._activate(self.content_blocks[-1])
+                    return False
+
+        elif block["type"] == content_type:
+            tag = block["tag"]
+            end_tag = f"</{tag}>"
+
+            if end_tag not in window:
+                return False
+
+            block_content = self._materialize()["content"]
+            # Strip start and end tags from the content
+            block_content = re.sub(rf"<{tag}(.*?)>", "", block_content).strip()
+            split_content = block_content.split(end_tag, 1)
+
+            # Content inside the tag
+            block_content = split_content[0].strip() if split_content else ""
+
+            # Leftover content (everything after `</tag>`)
+            leftover_content = (
+                split_content[1].strip() if len(split_content) > 1 else ""
+            )
+
+            if block_content:
+                block["content"] = block_content
+                block["ended_at"] = time.time()
+                block["duration"] = int(block["ended_at"] - block["started_at"])
+
+                # Reset the content_blocks by appending a new text block
+                if content_type != "code_interpreter":
+                    self.content_blocks.append(
+                        {
+                            "type": "text",
+                            "content": leftover_content,
+                        }
+                    )
+            else:
+                # Remove the block if content is empty
+                self.content_blocks.pop()
+                self.content_blocks.append(
+                    {
+                        "type": "text",
+                        "content": leftover_content,
+                    }
+                )
+
+            self._ended_tags.add(tag)
+            self._activate(self.content_blocks[-1])
+            return True
+
+        return False
+
+    def finish(self):
+        """Flushes buffered deltas and cleans up the trailing text block."""
+        self._materialize()
+        self._fast_block = None
+
+        if self.content_blocks:
+            # Clean up the last text block
+            if self.content_blocks[-1]["type"] == "text":
+                self.content_blocks[-1]["content"] = self.content_blocks[-1][
+                    "content"
+                ].strip()
+
+                if not self.content_blocks[-1]["content"]:
+                    self.content_blocks.pop()
+
+                    if not self.content_blocks:
+                        self.content_blocks.append(
+                            {
+                                "type": "text",
+                                "content": "",
+                            }
+                        )
+
+        self._activate(self.content_blocks[-1])
+
+    def serialize(self, raw: bool = False) -> str:
+        self._materialize()
+
+        if raw:
+            return serialize_content_blocks(self.content_blocks, raw=True)
+
+        blocks = self.content_blocks
+
+        # Reuse the cached serialization of unchanged blocks before the active one
+        folded = 0
+        while (
+            folded < len(self._folded)
+            and folded < len(blocks) - 1
+            and self._folded[folded][0] is blocks[folded]
+        ):
+            folded += 1
+        del self._folded[folded:]
+
+        content = self._folded[-1][1] if self._folded else ""
+        for block in blocks[folded:-1]:
+            content = serialize_content_block(content, block)
+            self._folded.append((block, content))
+
+        if blocks:
+            content = serialize_content_block(content, blocks[-1])
+        return content.strip()
+
+    def diff(self) -> Optional[tuple[int, str]]:
+        """
+        Returns `(offset, text)` such that the content returned by the previous
+        call, truncated to `offset` and followed by `text`, equals the current
+        serialized content; None when nothing visible changed.
+        """
+        block = self.content_blocks[-1] if self.content_blocks else None
+
+        if block is not None and block is self._fast_block and block is self._active:
+            text = "".join(self._unsent)
+            self._unsent = []
+
+            if block["type"] == "text":
+                return self._diff_text(text)
+            elif not LINE_BREAKS.search(text):
+                return self._diff_reasoning(text)
+
+        self._unsent = []
+        content = self.serialize()
+
+        emitted = "".join(self._emitted)
+        offset = get_common_prefix_length(emitted, content)
+
+        self._emitted = [content]
+        self._emitted_length = len(content)
+        self._setup_fast_diff(block, content)
+
+        if offset == len(emitted) == len(content):
+            return None
+        return offset, content[offset:]
+
+    def _setup_fast_diff(self, block: Optional[dict], content: str):
+        self._fast_block = None
+        if block is None:
+            return
+
+        if block["type"] == "text":
+            text = block["content"]
+            visible = text.rstrip()
+            if visible.strip():
+                # The content ends with the visible text of this block
+                self._fast_block = block
+                self._pending_whitespace = text[len(visible) :]
+
+        elif (
+            block["type"] == "reasoning"
+            and block.get("duration", None) is None
+            and not LINE_BREAKS.search(block["content"])
+            and content.endswith(REASONING_SUFFIX)
+        ):
+            # The content ends with the rendered reasoning followed by the suffix
+            text = block["content"]
+            index = text.rfind("\n")
+
+            self._fast_block = block
+            self._reasoning_line = text[index + 1 :]
+            self._reasoning_has_lines = index >= 0
+            self._reasoning_end = len(content) - len(REASONING_SUFFIX)
+            self._emitted = [content[: self._reasoning_end], REASONING_SUFFIX]
+
+    def _diff_text(self, text: str) -> Optional[tuple[int, str]]:
+        # Plain appends to a visible text block only ever extend the content
+        text = f"{self._pending_whitespace}{text}"
+
+        visible = text.rstrip()
+        if not visible:
+            self._pending_whitespace = text
+            return None
+
+        self._pending_whitespace = text[len(visible) :]
+
+        offset = self._emitted_length
+        self._emitted.append(visible)
+        self._emitted_length += len(visible)
+        return offset, visible
+
+    def _diff_reasoning(self, text: str) -> Optional[tuple[int, str]]:
+        # Appends to a reasoning block only re-render its last line, which sits
+        # right before the closing `</details>` suffix
+        def render(line):
+            return line if line.startswith(">") else f"> {line}"
+
+        line = self._reasoning_line
+        lines = f"{line}{text}".split("\n")
+        rendered = [render(line) for line in lines[:-1]]
+        if lines[-1]:
+            rendered.append(render(lines[-1]))
+
+        lead = "\n" if self._reasoning_has_lines else ""
+        old_tail = f"{lead}{render(line)}" if line else ""
+        rendered = "\n".join(rendered)
+        new_tail = f"{lead}{rendered}" if rendered else ""
+
+        self._reasoning_line = lines[-1]
+        self._reasoning_has_lines = self._reasoning_has_lines or len(lines) > 1
+
+        if new_tail == old_tail:
+            return None
+
+        offset = self._reasoning_end
+        delta = new_tail[len(old_tail) :]
+
+        self._reasoning_end += len(delta)
+        self._emitted[-1:] = [delta, REASONING_SUFFIX]
+        self._emitted_length = self._reasoning_end + len(REASONING_SUFFIX)
+        return offset, f"{delta}{REASONING_SUFFIX}"
+
+    def diff_event(self) -> Optional[dict]:
+        diff = self.diff()
+        if diff is None:
+            return None
+
+        offset, text = diff
+        return {"content_offset": offset, "content_delta": text}
@@ -1,24 +1,33 @@
 import inspect
-from open_webui.utils.plugin import load_function_module_by_id
-from open_webui.models.functions import Functions
+from open_webui.utils.plugin import (
+    PLUGIN_CACHE,
+    get_function_module,
+    get_user_valves,
+)
 
 
 def get_sorted_filter_ids(model):
+    functions = PLUGIN_CACHE.get_functions()
+
     def get_priority(function_id):
-        function = Functions.get_function_by_id(function_id)
-        if function is not None and hasattr(function, "valves"):
-            # TODO: Fix FunctionModel to include vavles
+        function = functions.get(function_id)
+        if function is not None:
             return (function.valves if function.valves else {}).get("priority", 0)
         return 0
 
-    filter_ids = [function.id for function in Functions.get_global_filter_functions()]
+    filter_ids = [
+        function.id
+        for function in functions.values()
+        if function.type == "filter" and function.is_active and function.is_global
+    ]
     if "info" in model and "meta" in model["info"]:
         filter_ids.extend(model["info"]["meta"].get("filterIds", []))
         filter_ids = list(set(filter_ids))
 
     enabled_filter_ids = [
         function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
+        for function in functions.values()
+        if function.type == "filter" and function.is_active
     ]
 
     filter_ids = [fid for fid in filter_ids if fid in enabled_filter_ids]
@@ -31,16 +40,15 @@ async def process_filter_functions(
 ):
     skip_files = None
 
+    functions = PLUGIN_CACHE.get_functions()
+    user_valves = None
+
     for filter_id in filter_ids:
-        filter = Functions.get_function_by_id(filter_id)
+        filter = functions.get(filter_id)
         if not filter:
             continue
 
-        if filter_id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[filter_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(filter_id)
-            request.app.state.FUNCTIONS[filter_id] = function_module
+        function_module = get_function_module(request, filter_id, filter)
 
         # Check if the function has a file_handler variable
         if filter_type == "inlet" and hasattr(function_module, "file_handler"):
@@ -48,9 +56,8 @@ async def process_filter_functions(
 
         # Apply valves to the function
         if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
+            function_module.valves = PLUGIN_CACHE.get_valves(
+                "functions", filter_id, function_module.Valves, filter.valves
             )
 
         # Prepare handler function
@@ -74,10 +81,12 @@ async def process_filter_functions(
             if "__user__" in sig.parameters:
                 if hasattr(function_module, "UserValves"):
                     try:
-                        params["__user__"]["valves"] = function_module.UserValves(
-                            **Functions.get_user_valves_by_id_and_user_id(
-                                filter_id, params["__user__"]["id"]
+                        if user_valves is None:
+                            user_valves = get_user_valves(
+                                params["__user__"]["id"], "functions"
                             )
+                        params["__user__"]["valves"] = function_module.UserValves(
+                            **user_valves.get(filter_id, {})
                         )
                     except Exception as e:
                         print(e)
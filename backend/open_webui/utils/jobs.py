@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from fastapi import Request
+
+from open_webui.models.jobs import Jobs, JobModel
+from open_webui.models.users import Users
+from open_webui.socket.main import sio, USER_POOL
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    INGESTION_JOB_WORKERS,
+    INGESTION_JOB_USER_CONCURRENCY,
+    INGESTION_JOB_MAX_ATTEMPTS,
+    INGESTION_JOB_STALE_TIMEOUT,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+# Job type -> handler(request, user, data) returning the job result
+JOB_HANDLERS: dict[str, Callable] = {}
+
+# Progress callback of the job running in the current thread, if any
+_job_progress: ContextVar[Optional[Callable[[dict], None]]] = ContextVar(
+    "job_progress", default=None
+)
+
+
+def register_job_handler(type: str):
+    def decorator(handler: Callable):
+        JOB_HANDLERS[type] = handler
+        return handler
+
+    return decorator
+
+
+def report_job_progress(progress: dict):
+    # No-op outside of a job, so handlers can share code with the endpoints
+    report = _job_progress.get()
+    if report is not None:
+        report(progress)
+
+
+class JobQueue:
+    """
+    Runs the jobs stored in the `job` table on a pool of `workers` threads.
+
+    Jobs are polled from the database, so any worker process can pick up work
+    enqueued by another and jobs survive restarts. At most `user_concurrency`
+    jobs of one user run at once. A failed job is retried with exponential
+    backoff until it has been attempted `max_attempts` times; a running job
+    whose process stopped updating it for `stale_timeout` seconds is started
+    over.
+
+    Status and progress changes are emitted to the owner's sockets as
+    `job-events`.
+    """
+
+    def __init__(
+        self,
+        app,
+        workers: int = INGESTION_JOB_WORKERS,
+        user_concurrency: int = INGESTION_JOB_USER_CONCURRENCY,
+        max_attempts: int = INGESTION_JOB_MAX_ATTEMPTS,
+        stale_timeout: int = INGESTION_JOB_STALE_TIMEOUT,
+        interval: float = 1,
+    ):
+        self.app = app
+        self.workers = workers
+        self.user_concurrency = user_concurrency
+        self.max_attempts = max_attempts
+        self.stale_timeout = stale_timeout
+        self.interval = interval
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._running: dict[str, JobModel] = {}
+        self._heartbeat_at = 0.0
+        self._wake = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_request(self) -> Request:
+        # Handlers only use `request.app`
+        return Request({"type": "http", "app": self.app})
+
+    def enqueue(self, user_id: str, type: str, data: dict) -> Optional[JobModel]:
+        job = Jobs.insert_new_job(user_id, type, data)
+        if job is not None:
+            self.wake()
+        return job
+
+    def wake(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def emit(self, job: JobModel, status: str, **data):
+        if self._loop is None:
+            return
+
+        event = {"job_id": job.id, "type": job.type, "status": status, **data}
+        for session_id in USER_POOL.get(job.user_id, []):
+            asyncio.run_coroutine_threadsafe(
+                sio.emit("job-events", event, to=session_id), self._loop
+            )
+
+    def _run_job(self, job: JobModel):
+        def report(progress: dict):
+            Jobs.update_job_progress_by_id(job.id, progress)
+            self.emit(job, "running", progress=progress)
+
+        token = _job_progress.set(report)
+        try:
+            handler = JOB_HANDLERS.get(job.type)
+            if handler is None:
+                raise Exception(f"Unknown job type {job.type}")
+
+            user = Users.get_user_by_id(job.user_id)
+            if user is None:
+                raise Exception(f"User {job.user_id} not found")
+
+            self.emit(job, "running")
+            result = handler(self.get_request(), user, job.data or {})
+
+            Jobs.complete_job_by_id(job.id, result)
+            self.emit(job, "completed", result=result)
+        except Exception as e:
+            error = str(getattr(e, "detail", None) or e)
+            log.warning(f"Job {job.id} ({job.type}) attempt {job.attempts}: {error}")
+
+            retry_at = None
+            if job.attempts < self.max_attempts:
+                retry_at = int(time.time()) + 2**job.attempts * 5
+
+            Jobs.fail_job_by_id(job.id, error, retry_at)
+            self.emit(job, "pending" if retry_at else "failed", error=error)
+        finally:
+            _job_progress.reset(token)
+
+    async def _run(self, job: JobModel):
+        try:
+            await self._loop.run_in_executor(self._executor, self._run_job, job)
+        finally:
+            del self._running[job.id]
+            self.wake()
+
+    async def _poll(self):
+        if time.monotonic() - self._heartbeat_at >= self.stale_timeout / 3:
+            self._heartbeat_at = time.monotonic()
+            if self._running:
+                await asyncio.to_thread(Jobs.touch_jobs_by_ids, list(self._running))
+            await asyncio.to_thread(
+                Jobs.requeue_stale_jobs, self.stale_timeout, self.max_attempts
+            )
+
+        while len(self._running) < self.workers:
+            job = await asyncio.to_thread(
+                Jobs.claim_next_job, self.user_concurrency, self.max_attempts
+            )
+            if job is None:
+                break
+
+            self._running[job.id] = job
+            asyncio.create_task(self._run(job))
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await self._poll()
+            except Exception as e:
+                log.exception(f"Error polling jobs: {e}")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def shutdown(self):
+        # Running jobs are left to be picked up again after the restart
+        self._executor.shutdown(wait=False, cancel_futures=True)
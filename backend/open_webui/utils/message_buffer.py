@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from open_webui.models.chats import Chats
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REALTIME_CHAT_SAVE_INTERVAL,
+    REALTIME_CHAT_SAVE_BUFFER_SIZE,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class MessageWriteBuffer:
+    """
+    Write-behind buffer for a single chat message.
+
+    Streamed updates are coalesced in memory and written to the database when
+    `interval` seconds have passed or `buffer_size` bytes of content are pending,
+    and on `close()`. Writes run in a worker thread so the event loop is never
+    blocked on a database round trip.
+
+    Values may be zero-argument callables, which are only evaluated when the
+    buffer is flushed (e.g. to avoid serializing content for every delta).
+    """
+
+    def __init__(
+        self,
+        chat_id: str,
+        message_id: str,
+        interval: float = REALTIME_CHAT_SAVE_INTERVAL,
+        buffer_size: int = REALTIME_CHAT_SAVE_BUFFER_SIZE,
+    ):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = interval
+        self.buffer_size = buffer_size
+
+        self.write_count = 0
+
+        self._pending: dict = {}
+        self._pending_size = 0
+        self._flushed: dict = {}
+        self._last_flush_at = time.monotonic()
+
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+
+    def _pending_bytes(self) -> int:
+        # Fields such as `content` are re-sent in full on every update, so only
+        # the growth since the last write counts towards the buffer size.
+        return self._pending_size + sum(
+            abs(len(str(value)) - len(str(self._flushed.get(key, ""))))
+            for key, value in self._pending.items()
+            if not callable(value)
+        )
+
+    async def update(self, message: dict, size: Optional[int] = None):
+        """
+        Queues `message` fields for the next write. `size` is the number of new
+        bytes the update represents, for values whose size cannot be measured.
+        """
+        self._pending.update(message)
+        if size is not None:
+            self._pending_size += size
+
+        if (
+            time.monotonic() - self._last_flush_at >= self.interval
+            or self._pending_bytes() >= self.buffer_size
+        ):
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(
+            max(self.interval - (time.monotonic() - self._last_flush_at), 0)
+        )
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            # A write started by a cancelled flush may still be running; wait for
+            # it so an older snapshot never lands after a newer one.
+            if self._inflight is not None and not self._inflight.done():
+                await asyncio.shield(self._inflight)
+
+            if not self._pending:
+                return
+
+            message = {
+                key: value() if callable(value) else value
+                for key, value in self._pending.items()
+            }
+            self._pending = {}
+            self._pending_size = 0
+            self._flushed.update(message)
+            self._last_flush_at = time.monotonic()
+
+            self._inflight = asyncio.ensure_future(
+                asyncio.to_thread(
+                    Chats.upsert_message_to_chat_by_id_and_message_id,
+                    self.chat_id,
+                    self.message_id,
+                    message,
+                )
+            )
+            self.write_count += 1
+            await asyncio.shield(self._inflight)
+
+    async def close(self):
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+
+        await self.flush()
+        log.debug(
+            f"message {self.message_id} saved with {self.write_count} database writes"
+        )
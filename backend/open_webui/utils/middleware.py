@@ -5,7 +5,7 @@ import os
 import base64
 
 import asyncio
-from aiocache import cached
+from aiocache import cached, SimpleMemoryCache
 from typing import Any, Optional
 import random
 import json
@@ -13,9 +13,10 @@ import html
 import inspect
 import re
 import ast
+import copy
+import hashlib
 
 from uuid import uuid4
-from concurrent.futures import ThreadPoolExecutor
 
 
 from fastapi import Request
@@ -27,6 +28,7 @@ from starlette.responses import Response, StreamingResponse
 from open_webui.models.chats import Chats
 from open_webui.models.users import Users
 from open_webui.socket.main import (
+    ContentEventEmitter,
     get_event_call,
     get_event_emitter,
     get_active_status_by_user_id,
@@ -36,6 +38,7 @@ from open_webui.routers.tasks import (
     generate_title,
     generate_image_prompt,
     generate_chat_tags,
+    generate_turn_plan,
 )
 from open_webui.routers.retrieval import process_web_search, SearchForm
 from open_webui.routers.images import image_generations, GenerateImageForm
@@ -47,6 +50,7 @@ from open_webui.utils.webhook import post_webhook
 from open_webui.models.users import UserModel
 from open_webui.models.functions import Functions
 from open_webui.models.models import Models
+from open_webui.models.tools import Tools
 
 from open_webui.retrieval.utils import get_sources_from_files
 
@@ -56,6 +60,7 @@ from open_webui.utils.task import (
     get_task_model_id,
     rag_template,
     tools_function_calling_generation_template,
+    parse_turn_plan,
 )
 from open_webui.utils.misc import (
     deep_update,
@@ -67,12 +72,18 @@ from open_webui.utils.misc import (
     prepend_to_first_user_message_content,
 )
 from open_webui.utils.tools import get_tools
+from open_webui.utils.stages import Stage, run_stages
 from open_webui.utils.plugin import load_function_module_by_id
 from open_webui.utils.filter import (
     get_sorted_filter_ids,
     process_filter_functions,
 )
 from open_webui.utils.code_interpreter import execute_code_jupyter
+from open_webui.utils.message_buffer import MessageWriteBuffer
+from open_webui.utils.content_blocks import (
+    ContentBlockStream,
+    convert_content_blocks_to_messages,
+)
 
 from open_webui.tasks import create_task
 
@@ -86,6 +97,8 @@ from open_webui.env import (
     GLOBAL_LOG_LEVEL,
     BYPASS_MODEL_ACCESS_CONTROL,
     ENABLE_REALTIME_CHAT_SAVE,
+    CHAT_STAGE_TIMEOUTS,
+    TURN_PLAN_CACHE_TTL,
 )
 from open_webui.constants import TASKS
 
@@ -95,8 +108,77 @@ log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
 
+# Message history hash -> turn plan
+TURN_PLAN_CACHE = SimpleMemoryCache()
+
+
+async def chat_turn_planning_handler(
+    request: Request,
+    form_data: dict,
+    artifacts: list[str],
+    tools_specs: list[dict],
+    user: UserModel,
+    models,
+) -> dict:
+    task_model_id = get_task_model_id(
+        form_data["model"],
+        request.app.state.config.TASK_MODEL,
+        request.app.state.config.TASK_MODEL_EXTERNAL,
+        models,
+    )
+
+    key = hashlib.sha256(
+        json.dumps(
+            [task_model_id, tools_specs, form_data["messages"]],
+            sort_keys=True,
+            default=str,
+        ).encode()
+    ).hexdigest()
+
+    plan = await TURN_PLAN_CACHE.get(key) or {}
+    missing = [artifact for artifact in artifacts if artifact not in plan]
+    if not missing:
+        log.debug(f"Reusing turn plan {key}")
+        return plan
+
+    try:
+        res = await generate_turn_plan(
+            request,
+            {
+                "model": form_data["model"],
+                "messages": form_data["messages"],
+                "artifacts": missing,
+                "tools": tools_specs,
+                "chat_id": form_data.get("metadata", {}).get("chat_id"),
+            },
+            user,
+        )
+        content = res["choices"][0]["message"]["content"]
+    except Exception as e:
+        log.debug(f"Turn planning failed: {e}")
+        return plan
+
+    # Artifacts missing from a malformed response fall back to their own task
+    plan = {**plan, **parse_turn_plan(content, missing)}
+    if TURN_PLAN_CACHE_TTL > 0:
+        await TURN_PLAN_CACHE.set(key, plan, ttl=TURN_PLAN_CACHE_TTL)
+    return plan
+
+
+def get_turn_plan_response(plan: dict, artifact: str) -> dict:
+    # Shaped like the response of the artifact's own task
+    return {
+        "choices": [{"message": {"content": json.dumps({artifact: plan[artifact]})}}]
+    }
+
+
 async def chat_completion_tools_handler(
-    request: Request, body: dict, user: UserModel, models, tools
+    request: Request,
+    body: dict,
+    user: UserModel,
+    models,
+    tools,
+    tool_calls: Optional[list] = None,
 ) -> tuple[dict, dict]:
     async def get_content_from_response(response) -> Optional[str]:
         content = None
@@ -158,9 +240,15 @@ async def chat_completion_tools_handler(
     )
 
     try:
-        response = await generate_chat_completion(request, form_data=payload, user=user)
-        log.debug(f"{response=}")
-        content = await get_content_from_response(response)
+        if tool_calls is not None:
+            # Already selected by the turn plan
+            content = json.dumps({"tool_calls": tool_calls})
+        else:
+            response = await generate_chat_completion(
+                request, form_data=payload, user=user
+            )
+            log.debug(f"{response=}")
+            content = await get_content_from_response(response)
         log.debug(f"{content=}")
 
         if not content:
@@ -256,7 +344,11 @@ async def chat_completion_tools_handler(
 
 
 async def chat_web_search_handler(
-    request: Request, form_data: dict, extra_params: dict, user
+    request: Request,
+    form_data: dict,
+    extra_params: dict,
+    user,
+    queries: Optional[list[str]] = None,
 ):
     event_emitter = extra_params["__event_emitter__"]
     await event_emitter(
@@ -273,37 +365,37 @@ async def chat_web_search_handler(
     messages = form_data["messages"]
     user_message = get_last_user_message(messages)
 
-    queries = []
-    try:
-        res = await generate_queries(
-            request,
-            {
-                "model": form_data["model"],
-                "messages": messages,
-                "prompt": user_message,
-                "type": "web_search",
-            },
-            user,
-        )
+    if queries is None:
+        try:
+            res = await generate_queries(
+                request,
+                {
+                    "model": form_data["model"],
+                    "messages": messages,
+                    "prompt": user_message,
+                    "type": "web_search",
+                },
+                user,
+            )
 
-        response = res["choices"][0]["message"]["content"]
+            response = res["choices"][0]["message"]["content"]
 
-        try:
-            bracket_start = response.find("{")
-            bracket_end = response.rfind("}") + 1
+            try:
+                bracket_start = response.find("{")
+                bracket_end = response.rfind("}") + 1
 
-            if bracket_start == -1 or bracket_end == -1:
-                raise Exception("No JSON object found in the response")
+                if bracket_start == -1 or bracket_end == -1:
+                    raise Exception("No JSON object found in the response")
 
-            response = response[bracket_start:bracket_end]
-            queries = json.loads(response)
-            queries = queries.get("queries", [])
-        except Exception as e:
-            queries = [response]
+                response = response[bracket_start:bracket_end]
+                queries = json.loads(response)
+                queries = queries.get("queries", [])
+            except Exception as e:
+                queries = [response]
 
-    except Exception as e:
-        log.exception(e)
-        queries = [user_message]
+        except Exception as e:
+            log.exception(e)
+            queries = [user_message]
 
     if len(queries) == 0:
         await event_emitter(
@@ -335,20 +427,16 @@ async def chat_web_search_handler(
     try:
 
         # Offload process_web_search to a separate thread
-        loop = asyncio.get_running_loop()
-        with ThreadPoolExecutor() as executor:
-            results = await loop.run_in_executor(
-                executor,
-                lambda: process_web_search(
-                    request,
-                    SearchForm(
-                        **{
-                            "query": searchQuery,
-                        }
-                    ),
-                    user,
-                ),
-            )
+        results = await asyncio.to_thread(
+            process_web_search,
+            request,
+            SearchForm(
+                **{
+                    "query": searchQuery,
+                }
+            ),
+            user,
+        )
 
         if results:
             await event_emitter(
@@ -499,61 +587,71 @@ async def chat_image_generation_handler(
     return form_data
 
 
-async def chat_completion_files_handler(
-    request: Request, body: dict, user: UserModel
-) -> tuple[dict, dict[str, list]]:
-    sources = []
+async def get_retrieval_queries(
+    request: Request, model: str, messages: list[dict], user: UserModel
+) -> list[str]:
+    try:
+        queries_response = await generate_queries(
+            request,
+            {
+                "model": model,
+                "messages": messages,
+                "type": "retrieval",
+            },
+            user,
+        )
+        queries_response = queries_response["choices"][0]["message"]["content"]
 
-    if files := body.get("metadata", {}).get("files", None):
         try:
-            queries_response = await generate_queries(
-                request,
-                {
-                    "model": body["model"],
-                    "messages": body["messages"],
-                    "type": "retrieval",
-                },
-                user,
-            )
-            queries_response = queries_response["choices"][0]["message"]["content"]
+            bracket_start = queries_response.find("{")
+            bracket_end = queries_response.rfind("}") + 1
 
-            try:
-                bracket_start = queries_response.find("{")
-                bracket_end = queries_response.rfind("}") + 1
+            if bracket_start == -1 or bracket_end == -1:
+                raise Exception("No JSON object found in the response")
 
-                if bracket_start == -1 or bracket_end == -1:
-                    raise Exception("No JSON object found in the response")
+            queries_response = queries_response[bracket_start:bracket_end]
+            queries_response = json.loads(queries_response)
+        except Exception as e:
+            queries_response = {"queries": [queries_response]}
 
-                queries_response = queries_response[bracket_start:bracket_end]
-                queries_response = json.loads(queries_response)
-            except Exception as e:
-                queries_response = {"queries": [queries_response]}
+        queries = queries_response.get("queries", [])
+    except Exception as e:
+        queries = []
 
-            queries = queries_response.get("queries", [])
-        except Exception as e:
-            queries = []
+    return queries
+
+
+async def chat_completion_files_handler(
+    request: Request,
+    body: dict,
+    user: UserModel,
+    queries: Optional[list[str]] = None,
+) -> tuple[dict, dict[str, list]]:
+    sources = []
+
+    if files := body.get("metadata", {}).get("files", None):
+        if queries is None:
+            queries = await get_retrieval_queries(
+                request, body["model"], body["messages"], user
+            )
 
         if len(queries) == 0:
             queries = [get_last_user_message(body["messages"])]
 
         try:
             # Offload get_sources_from_files to a separate thread
-            loop = asyncio.get_running_loop()
-            with ThreadPoolExecutor() as executor:
-                sources = await loop.run_in_executor(
-                    executor,
-                    lambda: get_sources_from_files(
-                        files=files,
-                        queries=queries,
-                        embedding_function=lambda query: request.app.state.EMBEDDING_FUNCTION(
-                            query, user=user
-                        ),
-                        k=request.app.state.config.TOP_K,
-                        reranking_function=request.app.state.rf,
-                        r=request.app.state.config.RELEVANCE_THRESHOLD,
-                        hybrid_search=request.app.state.config.ENABLE_RAG_HYBRID_SEARCH,
-                    ),
-                )
+            sources = await asyncio.to_thread(
+                get_sources_from_files,
+                files=files,
+                queries=queries,
+                embedding_function=lambda query: request.app.state.EMBEDDING_FUNCTION(
+                    query, user=user
+                ),
+                k=request.app.state.config.TOP_K,
+                reranking_function=request.app.state.rf,
+                r=request.app.state.config.RELEVANCE_THRESHOLD,
+                hybrid_search=request.app.state.config.ENABLE_RAG_HYBRID_SEARCH,
+            )
 
         except Exception as e:
             log.exception(e)
@@ -598,7 +696,7 @@ def apply_params_to_form_data(form_data, model):
     return form_data
 
 
-async def process_chat_payload(request, form_data, metadata, user, model):
+async def process_chat_payload(request, form_data, metadata, user, model, tasks=None):
 
     form_data = apply_params_to_form_data(form_data, model)
     log.debug(f"form_data: {form_data}")
@@ -682,27 +780,154 @@ async def process_chat_payload(request, form_data, metadata, user, model):
 
     variables = form_data.pop("variables", None)
 
-    features = form_data.pop("features", None)
-    if features:
-        if "web_search" in features and features["web_search"]:
-            form_data = await chat_web_search_handler(
-                request, form_data, extra_params, user
+    features = form_data.pop("features", None) or {}
+
+    code_interpreter_prompt = None
+    if "code_interpreter" in features and features["code_interpreter"]:
+        code_interpreter_prompt = (
+            request.app.state.config.CODE_INTERPRETER_PROMPT_TEMPLATE
+            if request.app.state.config.CODE_INTERPRETER_PROMPT_TEMPLATE != ""
+            else DEFAULT_CODE_INTERPRETER_PROMPT
+        )
+
+    async def emit_stage_error(action: Optional[str], description: str):
+        await event_emitter(
+            {
+                "type": "status",
+                "data": {
+                    **({"action": action} if action else {}),
+                    "description": description,
+                    "done": True,
+                    "error": True,
+                },
+            }
+        )
+
+    retrieval_model = form_data["model"]
+    retrieval_tool_ids = form_data.get("tool_ids")
+
+    # Artifacts needed before the response, otherwise generated by separate
+    # task model calls
+    artifacts = []
+    if not features.get("image_generation"):
+        if (
+            form_data.get("files") or features.get("web_search")
+        ) and request.app.state.config.ENABLE_RETRIEVAL_QUERY_GENERATION:
+            artifacts.append("retrieval_queries")
+        if retrieval_tool_ids and metadata.get("function_calling") != "native":
+            artifacts.append("tool_calls")
+    if (
+        features.get("web_search")
+        and request.app.state.config.ENABLE_SEARCH_QUERY_GENERATION
+    ):
+        artifacts.append("web_search_queries")
+
+    # A single call is only worth it in place of several, the title and tags
+    # ride along but never trigger it on their own
+    turn_planning = request.app.state.config.ENABLE_TURN_PLANNING and len(artifacts) > 1
+    if turn_planning:
+        if tasks and tasks.get(TASKS.TITLE_GENERATION):
+            if request.app.state.config.ENABLE_TITLE_GENERATION:
+                artifacts.append("title")
+        if tasks and tasks.get(TASKS.TAGS_GENERATION):
+            if request.app.state.config.ENABLE_TAGS_GENERATION:
+                artifacts.append("tags")
+
+    # The retrieval queries and tool calls are planned or generated
+    # speculatively for the messages the inlet filters are about to receive,
+    # and dropped if they change them
+    retrieval_messages = None
+    if artifacts:
+        retrieval_messages = copy.deepcopy(form_data["messages"])
+        if code_interpreter_prompt:
+            retrieval_messages = add_or_update_user_message(
+                code_interpreter_prompt, retrieval_messages
+            )
+
+    # Stages before the inlet filters, run concurrently
+    stages = []
+
+    if turn_planning:
+        tools_specs = []
+        if "tool_calls" in artifacts:
+            for tool_id in retrieval_tool_ids:
+                tool = Tools.get_tool_by_id(tool_id)
+                if tool is not None:
+                    tools_specs.extend(tool.specs)
+
+        stages.append(
+            Stage(
+                "planning",
+                lambda results: chat_turn_planning_handler(
+                    request,
+                    {**form_data, "messages": retrieval_messages},
+                    artifacts,
+                    tools_specs,
+                    user,
+                    models,
+                ),
+                timeout=CHAT_STAGE_TIMEOUTS.get("planning"),
+            )
+        )
+
+    if "web_search" in features and features["web_search"]:
+        # On a copy, image generation may update the messages meanwhile
+        web_search_form_data = {
+            **form_data,
+            "messages": copy.deepcopy(form_data["messages"]),
+        }
+        stages.append(
+            Stage(
+                "web_search",
+                lambda results: chat_web_search_handler(
+                    request,
+                    web_search_form_data,
+                    extra_params,
+                    user,
+                    queries=results.get("planning", {}).get("web_search_queries"),
+                ),
+                depends_on=["planning"],
+                timeout=CHAT_STAGE_TIMEOUTS.get("web_search"),
+                on_error=lambda: emit_stage_error("web_search", "Web search failed"),
             )
+        )
 
-        if "image_generation" in features and features["image_generation"]:
-            form_data = await chat_image_generation_handler(
-                request, form_data, extra_params, user
+    if "image_generation" in features and features["image_generation"]:
+        stages.append(
+            Stage(
+                "image_generation",
+                lambda results: chat_image_generation_handler(
+                    request, form_data, extra_params, user
+                ),
+                timeout=CHAT_STAGE_TIMEOUTS.get("image_generation"),
+                on_error=lambda: emit_stage_error(None, "Image generation failed"),
             )
+        )
 
-        if "code_interpreter" in features and features["code_interpreter"]:
-            form_data["messages"] = add_or_update_user_message(
-                (
-                    request.app.state.config.CODE_INTERPRETER_PROMPT_TEMPLATE
-                    if request.app.state.config.CODE_INTERPRETER_PROMPT_TEMPLATE != ""
-                    else DEFAULT_CODE_INTERPRETER_PROMPT
+    if "retrieval_queries" in artifacts and not turn_planning:
+        stages.append(
+            Stage(
+                "retrieval_queries",
+                lambda results: get_retrieval_queries(
+                    request, retrieval_model, retrieval_messages, user
                 ),
-                form_data["messages"],
+                timeout=CHAT_STAGE_TIMEOUTS.get("retrieval_queries"),
             )
+        )
+
+    results = await run_stages(stages)
+
+    plan = results.get("planning", {})
+    request.state.turn_plan = plan
+
+    if "web_search" in results:
+        form_data["files"] = results["web_search"].get("files", [])
+
+    if code_interpreter_prompt:
+        form_data["messages"] = add_or_update_user_message(
+            code_interpreter_prompt,
+            form_data["messages"],
+        )
 
     try:
         form_data, flags = await process_filter_functions(
@@ -715,6 +940,16 @@ async def process_chat_payload(request, form_data, metadata, user, model):
     except Exception as e:
         raise Exception(f"Error: {e}")
 
+    retrieval_queries = results.get("retrieval_queries", plan.get("retrieval_queries"))
+    tool_calls = plan.get("tool_calls")
+    if retrieval_messages is not None and (
+        form_data["messages"] != retrieval_messages
+        or form_data["model"] != retrieval_model
+        or form_data.get("tool_ids") != retrieval_tool_ids
+    ):
+        retrieval_queries = None
+        tool_calls = None
+
     tool_ids = form_data.pop("tool_ids", None)
     files = form_data.pop("files", None)
     # Remove files duplicates
@@ -731,6 +966,10 @@ async def process_chat_payload(request, form_data, metadata, user, model):
     tool_ids = metadata.get("tool_ids", None)
     log.debug(f"{tool_ids=}")
 
+    # Stages after the inlet filters: tool selection runs alongside the
+    # retrieval queries, retrieval waits for both as tools may handle the files
+    stages = []
+
     if tool_ids:
         # If tool_ids field is present, then get the tools
         tools = get_tools(
@@ -755,20 +994,49 @@ async def process_chat_payload(request, form_data, metadata, user, model):
             ]
         else:
             # If the function calling is not native, then call the tools function calling handler
-            try:
-                form_data, flags = await chat_completion_tools_handler(
-                    request, form_data, user, models, tools
+            stages.append(
+                Stage(
+                    "tools",
+                    lambda results: chat_completion_tools_handler(
+                        request, form_data, user, models, tools, tool_calls
+                    ),
+                    timeout=CHAT_STAGE_TIMEOUTS.get("tools"),
                 )
-                sources.extend(flags.get("sources", []))
+            )
 
-            except Exception as e:
-                log.exception(e)
+    if metadata.get("files") and retrieval_queries is None:
+        stages.append(
+            Stage(
+                "retrieval_queries",
+                lambda results: get_retrieval_queries(
+                    request, form_data["model"], form_data["messages"], user
+                ),
+                timeout=CHAT_STAGE_TIMEOUTS.get("retrieval_queries"),
+            )
+        )
 
-    try:
-        form_data, flags = await chat_completion_files_handler(request, form_data, user)
-        sources.extend(flags.get("sources", []))
-    except Exception as e:
-        log.exception(e)
+    stages.append(
+        Stage(
+            "retrieval",
+            lambda results: chat_completion_files_handler(
+                request,
+                form_data,
+                user,
+                queries=results.get("retrieval_queries", retrieval_queries) or [],
+            ),
+            depends_on=["tools", "retrieval_queries"],
+            timeout=CHAT_STAGE_TIMEOUTS.get("retrieval"),
+            on_error=lambda: emit_stage_error(None, "Document retrieval failed"),
+        )
+    )
+
+    results = await run_stages(stages)
+
+    # Merged in stage order, whichever finished first
+    for name in ["tools", "retrieval"]:
+        if name in results:
+            _, flags = results[name]
+            sources.extend(flags.get("sources", []))
 
     # If context is not empty, insert it into the messages
     if len(sources) > 0:
@@ -843,17 +1111,23 @@ async def process_chat_response(
             messages = get_message_list(message_map, message.get("id"))
 
             if tasks and messages:
+                # Title and tags already in the turn plan aren't generated again
+                plan = getattr(request.state, "turn_plan", None) or {}
+
                 if TASKS.TITLE_GENERATION in tasks:
                     if tasks[TASKS.TITLE_GENERATION]:
-                        res = await generate_title(
-                            request,
-                            {
-                                "model": message["model"],
-                                "messages": messages,
-                                "chat_id": metadata["chat_id"],
-                            },
-                            user,
-                        )
+                        if "title" in plan:
+                            res = get_turn_plan_response(plan, "title")
+                        else:
+                            res = await generate_title(
+                                request,
+                                {
+                                    "model": message["model"],
+                                    "messages": messages,
+                                    "chat_id": metadata["chat_id"],
+                                },
+                                user,
+                            )
 
                         if res and isinstance(res, dict):
                             if len(res.get("choices", [])) == 1:
@@ -900,15 +1174,18 @@ async def process_chat_response(
                         )
 
                 if TASKS.TAGS_GENERATION in tasks and tasks[TASKS.TAGS_GENERATION]:
-                    res = await generate_chat_tags(
-                        request,
-                        {
-                            "model": message["model"],
-                            "messages": messages,
-                            "chat_id": metadata["chat_id"],
-                        },
-                        user,
-                    )
+                    if "tags" in plan:
+                        res = get_turn_plan_response(plan, "tags")
+                    else:
+                        res = await generate_chat_tags(
+                            request,
+                            {
+                                "model": message["model"],
+                                "messages": messages,
+                                "chat_id": metadata["chat_id"],
+                            },
+                            user,
+                        )
 
                     if res and isinstance(res, dict):
                         if len(res.get("choices", [])) == 1:
@@ -956,7 +1233,7 @@ async def process_chat_response(
     if not isinstance(response, StreamingResponse):
         if event_emitter:
             if "selected_model_id" in response:
-                Chats.upsert_message_to_chat_by_id_and_message_id(
+                await Chats.upsert_message_to_chat_by_id_and_message_id_async(
                     metadata["chat_id"],
                     metadata["message_id"],
                     {
@@ -976,7 +1253,7 @@ async def process_chat_response(
                         }
                     )
 
-                    title = Chats.get_chat_title_by_id(metadata["chat_id"])
+                    title = await Chats.get_chat_title_by_id_async(metadata["chat_id"])
 
                     await event_emitter(
                         {
@@ -990,7 +1267,7 @@ async def process_chat_response(
                     )
 
                     # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    await Chats.upsert_message_to_chat_by_id_and_message_id_async(
                         metadata["chat_id"],
                         metadata["message_id"],
                         {
@@ -1031,7 +1308,7 @@ async def process_chat_response(
         task_id = str(uuid4())  # Create a unique task ID.
         model_id = form_data.get("model", "")
 
-        Chats.upsert_message_to_chat_by_id_and_message_id(
+        await Chats.upsert_message_to_chat_by_id_and_message_id_async(
             metadata["chat_id"],
             metadata["message_id"],
             {
@@ -1039,315 +1316,13 @@ async def process_chat_response(
             },
         )
 
-        def split_content_and_whitespace(content):
-            content_stripped = content.rstrip()
-            original_whitespace = (
-                content[len(content_stripped) :]
-                if len(content) > len(content_stripped)
-                else ""
-            )
-            return content_stripped, original_whitespace
-
-        def is_opening_code_block(content):
-            backtick_segments = content.split("```")
-            # Even number of segments means the last backticks are opening a new block
-            return len(backtick_segments) > 1 and len(backtick_segments) % 2 == 0
-
         # Handle as a background task
         async def post_response_handler(response, events):
-            def serialize_content_blocks(content_blocks, raw=False):
-                content = ""
-
-                for block in content_blocks:
-                    if block["type"] == "text":
-                        content = f"{content}{block['content'].strip()}\n"
-                    elif block["type"] == "tool_calls":
-                        attributes = block.get("attributes", {})
-
-                        block_content = block.get("content", [])
-                        results = block.get("results", [])
-
-                        if results:
-
-                            result_display_content = ""
-
-                            for result in results:
-                                tool_call_id = result.get("tool_call_id", "")
-                                tool_name = ""
-
-                                for tool_call in block_content:
-                                    if tool_call.get("id", "") == tool_call_id:
-                                        tool_name = tool_call.get("function", {}).get(
-                                            "name", ""
-                                        )
-                                        break
-
-                                result_display_content = f"{result_display_content}\n> {tool_name}: {result.get('content', '')}"
-
-                            if not raw:
-                                content = f'{content}\n<details type="tool_calls" done="true" content="{html.escape(json.dumps(block_content))}" results="{html.escape(json.dumps(results))}">\n<summary>Tool Executed</summary>\n{result_display_content}\n</details>\n'
-                        else:
-                            tool_calls_display_content = ""
-
-                            for tool_call in block_content:
-                                tool_calls_display_content = f"{tool_calls_display_content}\n> Executing {tool_call.get('function', {}).get('name', '')}"
-
-                            if not raw:
-                                content = f'{content}\n<details type="tool_calls" done="false" content="{html.escape(json.dumps(block_content))}">\n<summary>Tool Executing...</summary>\n{tool_calls_display_content}\n</details>\n'
-
-                    elif block["type"] == "reasoning":
-                        reasoning_display_content = "\n".join(
-                            (f"> {line}" if not line.startswith(">") else line)
-                            for line in block["content"].splitlines()
-                        )
-
-                        reasoning_duration = block.get("duration", None)
-
-                        if reasoning_duration is not None:
-                            if raw:
-                                content = f'{content}\n<{block["tag"]}>{block["content"]}</{block["tag"]}>\n'
-                            else:
-                                content = f'{content}\n<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
-                        else:
-                            if raw:
-                                content = f'{content}\n<{block["tag"]}>{block["content"]}</{block["tag"]}>\n'
-                            else:
-                                content = f'{content}\n<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
-
-                    elif block["type"] == "code_interpreter":
-                        attributes = block.get("attributes", {})
-                        output = block.get("output", None)
-                        lang = attributes.get("lang", "")
-
-                        content_stripped, original_whitespace = (
-                            split_content_and_whitespace(content)
-                        )
-                        if is_opening_code_block(content_stripped):
-                            # Remove trailing backticks that would open a new block
-                            content = (
-                                content_stripped.rstrip("`").rstrip()
-                                + original_whitespace
-                            )
-                        else:
-                            # Keep content as is - either closing backticks or no backticks
-                            content = content_stripped + original_whitespace
-
-                        if output:
-                            output = html.escape(json.dumps(output))
-
-                            if raw:
-                                content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
-                            else:
-                                content = f'{content}\n<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
-                        else:
-                            if raw:
-                                content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
-                            else:
-                                content = f'{content}\n<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
-
-                    else:
-                        block_content = str(block["content"]).strip()
-                        content = f"{content}{block['type']}: {block_content}\n"
-
-                return content.strip()
-
-            def convert_content_blocks_to_messages(content_blocks):
-                messages = []
-
-                temp_blocks = []
-                for idx, block in enumerate(content_blocks):
-                    if block["type"] == "tool_calls":
-                        messages.append(
-                            {
-                                "role": "assistant",
-                                "content": serialize_content_blocks(temp_blocks),
-                                "tool_calls": block.get("content"),
-                            }
-                        )
-
-                        results = block.get("results", [])
-
-                        for result in results:
-                            messages.append(
-                                {
-                                    "role": "tool",
-                                    "tool_call_id": result["tool_call_id"],
-                                    "content": result["content"],
-                                }
-                            )
-                        temp_blocks = []
-                    else:
-                        temp_blocks.append(block)
-
-                if temp_blocks:
-                    content = serialize_content_blocks(temp_blocks)
-                    if content:
-                        messages.append(
-                            {
-                                "role": "assistant",
-                                "content": content,
-                            }
-                        )
-
-                return messages
-
-            def tag_content_handler(content_type, tags, content, content_blocks):
-                end_flag = False
-
-                def extract_attributes(tag_content):
-                    """Extract attributes from a tag if they exist."""
-                    attributes = {}
-                    if not tag_content:  # Ensure tag_content is not None
-                        return attributes
-                    # Match attributes in the format: key="value" (ignores single quotes for simplicity)
-                    matches = re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content)
-                    for key, value in matches:
-                        attributes[key] = value
-                    return attributes
-
-                if content_blocks[-1]["type"] == "text":
-                    for tag in tags:
-                        # Match start tag e.g., <tag> or <tag attr="value">
-                        start_tag_pattern = rf"<{tag}(\s.*?)?>"
-                        match = re.search(start_tag_pattern, content)
-                        if match:
-                            attr_content = (
-                                match.group(1) if match.group(1) else ""
-                            )  # Ensure it's not None
-                            attributes = extract_attributes(
-                                attr_content
-                            )  # Extract attributes safely
-
-                            # Capture everything before and after the matched tag
-                            before_tag = content[
-                                : match.start()
-                            ]  # Content before opening tag
-                            after_tag = content[
-                                match.end() :
-                            ]  # Content after opening tag
-
-                            # Remove the start tag and after from the currently handling text block
-                            content_blocks[-1]["content"] = content_blocks[-1][
-                                "content"
-                            ].replace(match.group(0) + after_tag, "")
-
-                            if before_tag:
-                                content_blocks[-1]["content"] = before_tag
-
-                            if not content_blocks[-1]["content"]:
-                                content_blocks.pop()
-
-                            # Append the new block
-                            content_blocks.append(
-                                {
-                                    "type": content_type,
-                                    "tag": tag,
-                                    "attributes": attributes,
-                                    "content": "",
-                                    "started_at": time.time(),
-                                }
-                            )
-
-                            if after_tag:
-                                content_blocks[-1]["content"] = after_tag
-
-                            break
-                elif content_blocks[-1]["type"] == content_type:
-                    tag = content_blocks[-1]["tag"]
-                    # Match end tag e.g., </tag>
-                    end_tag_pattern = rf"</{tag}>"
-
-                    # Check if the content has the end tag
-                    if re.search(end_tag_pattern, content):
-                        end_flag = True
-
-                        block_content = content_blocks[-1]["content"]
-                        # Strip start and end tags from the content
-                        start_tag_pattern = rf"<{tag}(.*?)>"
-                        block_content = re.sub(
-                            start_tag_pattern, "", block_content
-                        ).strip()
-
-                        end_tag_regex = re.compile(end_tag_pattern, re.DOTALL)
-                        split_content = end_tag_regex.split(block_content, maxsplit=1)
-
-                        # Content inside the tag
-                        block_content = (
-                            split_content[0].strip() if split_content else ""
-                        )
-
-                        # Leftover content (everything after `</tag>`)
-                        leftover_content = (
-                            split_content[1].strip() if len(split_content) > 1 else ""
-                        )
-
-                        if block_content:
-                            content_blocks[-1]["content"] = block_content
-                            content_blocks[-1]["ended_at"] = time.time()
-                            content_blocks[-1]["duration"] = int(
-                                content_blocks[-1]["ended_at"]
-                                - content_blocks[-1]["started_at"]
-                            )
-
-                            # Reset the content_blocks by appending a new text block
-                            if content_type != "code_interpreter":
-                                if leftover_content:
-
-                                    content_blocks.append(
-                                        {
-                                            "type": "text",
-                                            "content": leftover_content,
-                                        }
-                                    )
-                                else:
-                                    content_blocks.append(
-                                        {
-                                            "type": "text",
-                                            "content": "",
-                                        }
-                                    )
-
-                        else:
-                            # Remove the block if content is empty
-                            content_blocks.pop()
-
-                            if leftover_content:
-                                content_blocks.append(
-                                    {
-                                        "type": "text",
-                                        "content": leftover_content,
-                                    }
-                                )
-                            else:
-                                content_blocks.append(
-                                    {
-                                        "type": "text",
-                                        "content": "",
-                                    }
-                                )
-
-                        # Clean processed content
-                        content = re.sub(
-                            rf"<{tag}(.*?)>(.|\n)*?</{tag}>",
-                            "",
-                            content,
-                            flags=re.DOTALL,
-                        )
-
-                return content, content_blocks, end_flag
-
-            message = Chats.get_message_by_id_and_message_id(
+            message = await Chats.get_message_by_id_and_message_id_async(
                 metadata["chat_id"], metadata["message_id"]
             )
 
             tool_calls = []
-            content = message.get("content", "") if message else ""
-            content_blocks = [
-                {
-                    "type": "text",
-                    "content": content,
-                }
-            ]
 
             # We might want to disable this by default
             DETECT_REASONING = True
@@ -1355,15 +1330,18 @@ async def process_chat_response(
                 "code_interpreter", False
             )
 
-            reasoning_tags = [
-                "think",
-                "thinking",
-                "reason",
-                "reasoning",
-                "thought",
-                "Thought",
-            ]
-            code_interpreter_tags = ["code_interpreter"]
+            content_stream = ContentBlockStream(
+                message.get("content", "") if message else "",
+                detect_reasoning=DETECT_REASONING,
+                detect_code_interpreter=DETECT_CODE_INTERPRETER,
+            )
+            content_blocks = content_stream.content_blocks
+
+            message_buffer = MessageWriteBuffer(
+                metadata["chat_id"], metadata["message_id"]
+            )
+
+            content_emitter = ContentEventEmitter(metadata, content_stream)
 
             try:
                 for event in events:
@@ -1375,7 +1353,7 @@ async def process_chat_response(
                     )
 
                     # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    await Chats.upsert_message_to_chat_by_id_and_message_id_async(
                         metadata["chat_id"],
                         metadata["message_id"],
                         {
@@ -1384,9 +1362,6 @@ async def process_chat_response(
                     )
 
                 async def stream_body_handler(response):
-                    nonlocal content
-                    nonlocal content_blocks
-
                     response_tool_calls = []
 
                     async for line in response.body_iterator:
@@ -1409,7 +1384,7 @@ async def process_chat_response(
 
                             if "selected_model_id" in data:
                                 model_id = data["selected_model_id"]
-                                Chats.upsert_message_to_chat_by_id_and_message_id(
+                                await Chats.upsert_message_to_chat_by_id_and_message_id_async(
                                     metadata["chat_id"],
                                     metadata["message_id"],
                                     {
@@ -1459,60 +1434,21 @@ async def process_chat_response(
                                 value = delta.get("content")
 
                                 if value:
-                                    content = f"{content}{value}"
-
-                                    if not content_blocks:
-                                        content_blocks.append(
-                                            {
-                                                "type": "text",
-                                                "content": "",
-                                            }
-                                        )
-
-                                    content_blocks[-1]["content"] = (
-                                        content_blocks[-1]["content"] + value
-                                    )
-
-                                    if DETECT_REASONING:
-                                        content, content_blocks, _ = (
-                                            tag_content_handler(
-                                                "reasoning",
-                                                reasoning_tags,
-                                                content,
-                                                content_blocks,
-                                            )
-                                        )
-
-                                    if DETECT_CODE_INTERPRETER:
-                                        content, content_blocks, end = (
-                                            tag_content_handler(
-                                                "code_interpreter",
-                                                code_interpreter_tags,
-                                                content,
-                                                content_blocks,
-                                            )
-                                        )
-
-                                        if end:
-                                            break
+                                    end = content_stream.append(value)
+                                    if end:
+                                        break
 
                                     if ENABLE_REALTIME_CHAT_SAVE:
                                         # Save message in the database
-                                        Chats.upsert_message_to_chat_by_id_and_message_id(
-                                            metadata["chat_id"],
-                                            metadata["message_id"],
+                                        await message_buffer.update(
                                             {
-                                                "content": serialize_content_blocks(
-                                                    content_blocks
-                                                ),
+                                                "content": content_stream.serialize,
                                             },
+                                            size=len(value),
                                         )
                                     else:
-                                        data = {
-                                            "content": serialize_content_blocks(
-                                                content_blocks
-                                            ),
-                                        }
+                                        await content_emitter()
+                                        continue
 
                             await event_emitter(
                                 {
@@ -1528,23 +1464,7 @@ async def process_chat_response(
                                 log.debug("Error: ", e)
                                 continue
 
-                    if content_blocks:
-                        # Clean up the last text block
-                        if content_blocks[-1]["type"] == "text":
-                            content_blocks[-1]["content"] = content_blocks[-1][
-                                "content"
-                            ].strip()
-
-                            if not content_blocks[-1]["content"]:
-                                content_blocks.pop()
-
-                                if not content_blocks:
-                                    content_blocks.append(
-                                        {
-                                            "type": "text",
-                                            "content": "",
-                                        }
-                                    )
+                    content_stream.finish()
 
                     if response_tool_calls:
                         tool_calls.append(response_tool_calls)
@@ -1569,14 +1489,7 @@ async def process_chat_response(
                         }
                     )
 
-                    await event_emitter(
-                        {
-                            "type": "chat:completion",
-                            "data": {
-                                "content": serialize_content_blocks(content_blocks),
-                            },
-                        }
-                    )
+                    await content_emitter()
 
                     tools = metadata.get("tools", {})
 
@@ -1632,14 +1545,7 @@ async def process_chat_response(
                         }
                     )
 
-                    await event_emitter(
-                        {
-                            "type": "chat:completion",
-                            "data": {
-                                "content": serialize_content_blocks(content_blocks),
-                            },
-                        }
-                    )
+                    await content_emitter()
 
                     try:
                         res = await generate_chat_completion(
@@ -1672,14 +1578,7 @@ async def process_chat_response(
                         content_blocks[-1]["type"] == "code_interpreter"
                         and retries < MAX_RETRIES
                     ):
-                        await event_emitter(
-                            {
-                                "type": "chat:completion",
-                                "data": {
-                                    "content": serialize_content_blocks(content_blocks),
-                                },
-                            }
-                        )
+                        await content_emitter()
 
                         retries += 1
                         log.debug(f"Attempt count: {retries}")
@@ -1808,16 +1707,9 @@ async def process_chat_response(
                             }
                         )
 
-                        await event_emitter(
-                            {
-                                "type": "chat:completion",
-                                "data": {
-                                    "content": serialize_content_blocks(content_blocks),
-                                },
-                            }
-                        )
+                        await content_emitter()
 
-                        print(content_blocks, serialize_content_blocks(content_blocks))
+                        print(content_blocks, content_stream.serialize())
 
                         try:
                             res = await generate_chat_completion(
@@ -1829,8 +1721,8 @@ async def process_chat_response(
                                         *form_data["messages"],
                                         {
                                             "role": "assistant",
-                                            "content": serialize_content_blocks(
-                                                content_blocks, raw=True
+                                            "content": content_stream.serialize(
+                                                raw=True
                                             ),
                                         },
                                     ],
@@ -1846,22 +1738,21 @@ async def process_chat_response(
                             log.debug(e)
                             break
 
-                title = Chats.get_chat_title_by_id(metadata["chat_id"])
+                title = await Chats.get_chat_title_by_id_async(metadata["chat_id"])
                 data = {
                     "done": True,
-                    "content": serialize_content_blocks(content_blocks),
+                    "content": content_stream.serialize(),
                     "title": title,
                 }
 
-                if not ENABLE_REALTIME_CHAT_SAVE:
-                    # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        metadata["chat_id"],
-                        metadata["message_id"],
-                        {
-                            "content": serialize_content_blocks(content_blocks),
-                        },
-                    )
+                # Save message in the database
+                await message_buffer.update(
+                    {
+                        "content": content_stream.serialize(),
+                    }
+                )
+                await message_buffer.close()
+                content_emitter.close()
 
                 # Send a webhook notification if the user is not active
                 if get_active_status_by_user_id(user.id) is None:
@@ -1869,10 +1760,10 @@ async def process_chat_response(
                     if webhook_url:
                         post_webhook(
                             webhook_url,
-                            f"{title} - {request.app.state.config.WEBUI_URL}/c/{metadata['chat_id']}\n\n{content}",
+                            f"{title} - {request.app.state.config.WEBUI_URL}/c/{metadata['chat_id']}\n\n{content_stream.content}",
                             {
                                 "action": "chat",
-                                "message": content,
+                                "message": content_stream.content,
                                 "title": title,
                                 "url": f"{request.app.state.config.WEBUI_URL}/c/{metadata['chat_id']}",
                             },
@@ -1890,15 +1781,17 @@ async def process_chat_response(
                 print("Task was cancelled!")
                 await event_emitter({"type": "task-cancelled"})
 
-                if not ENABLE_REALTIME_CHAT_SAVE:
-                    # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        metadata["chat_id"],
-                        metadata["message_id"],
-                        {
-                            "content": serialize_content_blocks(content_blocks),
-                        },
-                    )
+                # Save message in the database
+                await message_buffer.update(
+                    {
+                        "content": content_stream.serialize(),
+                    }
+                )
+            finally:
+                # Also on errors, or the message would stay in STREAM_POOL and
+                # the last buffered content would never be written
+                await message_buffer.close()
+                content_emitter.close()
 
             if response.background is not None:
                 await response.background()
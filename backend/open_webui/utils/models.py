@@ -1,8 +1,13 @@
+import asyncio
 import time
 import logging
 import sys
 
+import redis
+
 from aiocache import cached
+from typing import Optional
+
 from fastapi import Request
 
 from open_webui.routers import openai, ollama
@@ -13,7 +18,7 @@ from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
 
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.plugin import get_function_module
 from open_webui.utils.access_control import has_access
 
 
@@ -21,7 +26,15 @@ from open_webui.config import (
     DEFAULT_ARENA_MODEL,
 )
 
-from open_webui.env import SRC_LOG_LEVELS, GLOBAL_LOG_LEVEL
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    GLOBAL_LOG_LEVEL,
+    MODEL_REGISTRY_FETCH_TIMEOUT,
+    MODEL_REGISTRY_REFRESH_INTERVAL,
+    MODEL_REGISTRY_VERSION_CHECK_INTERVAL,
+    WEBSOCKET_MANAGER,
+    WEBSOCKET_REDIS_URL,
+)
 
 
 logging.basicConfig(stream=sys.stdout, level=GLOBAL_LOG_LEVEL)
@@ -29,37 +42,59 @@ log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
 
+async def get_openai_models(request: Request) -> list[dict]:
+    if not request.app.state.config.ENABLE_OPENAI_API:
+        return []
+
+    openai_models = await openai.get_all_models(request)
+    return openai_models["data"]
+
+
+async def get_ollama_models(request: Request) -> list[dict]:
+    if not request.app.state.config.ENABLE_OLLAMA_API:
+        return []
+
+    ollama_models = await ollama.get_all_models(request)
+    return [
+        {
+            "id": model["model"],
+            "name": model["name"],
+            "object": "model",
+            "created": int(time.time()),
+            "owned_by": "ollama",
+            "ollama": model,
+        }
+        for model in ollama_models["models"]
+    ]
+
+
+# Sources of base models, in the order they are listed
+BASE_MODEL_SOURCES = {
+    "function": get_function_models,
+    "openai": get_openai_models,
+    "ollama": get_ollama_models,
+}
+
+
 async def get_all_base_models(request: Request):
-    function_models = []
-    openai_models = []
-    ollama_models = []
-
-    if request.app.state.config.ENABLE_OPENAI_API:
-        openai_models = await openai.get_all_models(request)
-        openai_models = openai_models["data"]
-
-    if request.app.state.config.ENABLE_OLLAMA_API:
-        ollama_models = await ollama.get_all_models(request)
-        ollama_models = [
-            {
-                "id": model["model"],
-                "name": model["name"],
-                "object": "model",
-                "created": int(time.time()),
-                "owned_by": "ollama",
-                "ollama": model,
-            }
-            for model in ollama_models["models"]
-        ]
+    responses = await asyncio.gather(
+        *[get_models(request) for get_models in BASE_MODEL_SOURCES.values()]
+    )
 
-    function_models = await get_function_models(request)
-    models = function_models + openai_models + ollama_models
+    models = []
+    for source_models in responses:
+        models.extend(source_models)
 
     return models
 
 
 async def get_all_models(request):
-    models = await get_all_base_models(request)
+    return await request.app.state.MODEL_REGISTRY.get_models(request)
+
+
+def build_all_models(request, base_models: list[dict]) -> list[dict]:
+    # Base models are shared between builds, only modify copies
+    models = [{**model} for model in base_models]
 
     # If there are no models, return an empty list
     if len(models) == 0:
@@ -103,10 +138,11 @@ async def get_all_models(request):
     global_action_ids = [
         function.id for function in Functions.get_global_action_functions()
     ]
-    enabled_action_ids = [
-        function.id
+    enabled_action_functions = {
+        function.id: function
         for function in Functions.get_functions_by_type("action", active_only=True)
-    ]
+    }
+    enabled_action_ids = list(enabled_action_functions.keys())
 
     custom_models = Models.get_all_models()
     for custom_model in custom_models:
@@ -192,13 +228,6 @@ async def get_all_models(request):
                 }
             ]
 
-    def get_function_module_by_id(function_id):
-        if function_id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[function_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(function_id)
-            request.app.state.FUNCTIONS[function_id] = function_module
-
     for model in models:
         action_ids = [
             action_id
@@ -208,17 +237,15 @@ async def get_all_models(request):
 
         model["actions"] = []
         for action_id in action_ids:
-            action_function = Functions.get_function_by_id(action_id)
+            action_function = enabled_action_functions.get(action_id)
             if action_function is None:
                 raise Exception(f"Action not found: {action_id}")
 
-            function_module = get_function_module_by_id(action_id)
+            function_module = get_function_module(request, action_id, action_function)
             model["actions"].extend(
                 get_action_items_from_module(action_function, function_module)
             )
-    log.debug(f"get_all_models() returned {len(models)} models")
-
-    request.app.state.MODELS = {model["id"]: model for model in models}
+    log.debug(f"build_all_models() returned {len(models)} models")
     return models
 
 
@@ -243,3 +270,211 @@ def check_model_access(user, model):
             )
         ):
             raise Exception("Model not found")
+
+
+class ModelRegistry:
+    """
+    Serves the model list from an immutable snapshot built by `build_all_models`.
+
+    The snapshot is rebuilt in the background every `interval` seconds and after
+    `invalidate()` (called on admin changes to connections, models and
+    functions). Only the first load is awaited in full; afterwards requests
+    wait at most `timeout` seconds for a refresh before getting the previous
+    snapshot.
+
+    Each base model source is fetched separately: a source that does not answer
+    within `timeout` seconds keeps contributing its last list, and the snapshot
+    is rebuilt once its fetch completes.
+
+    Other workers learn about changes through a version checked at most every
+    `version_check_interval` seconds: the version of the model and function
+    tables (row count and latest `updated_at`, as for the plugin cache) plus,
+    with the Redis websocket manager, a counter that `invalidate()` bumps for
+    changes outside the database (connections, Ollama pulls...).
+    """
+
+    VERSION_KEY = "open-webui:model_registry:version"
+
+    def __init__(
+        self,
+        app,
+        interval: float = MODEL_REGISTRY_REFRESH_INTERVAL,
+        timeout: float = MODEL_REGISTRY_FETCH_TIMEOUT,
+        version_check_interval: float = MODEL_REGISTRY_VERSION_CHECK_INTERVAL,
+    ):
+        self.app = app
+        self.interval = interval
+        self.timeout = timeout
+        self.version_check_interval = version_check_interval
+
+        self.redis = (
+            redis.Redis.from_url(WEBSOCKET_REDIS_URL, decode_responses=True)
+            if WEBSOCKET_MANAGER == "redis"
+            else None
+        )
+        self.version = None
+        self.version_checked_at: Optional[float] = None
+
+        self.models: tuple[dict, ...] = ()
+        self.refreshed_at: Optional[float] = None
+        self.stale = True
+
+        # Per source: latency of the last fetch in seconds, when it finished
+        # and its error, if any
+        self.sources: dict[str, dict] = {}
+
+        self._base_models: dict[str, list[dict]] = {}
+        self._fetch_tasks: dict[str, asyncio.Task] = {}
+        self._rebuild_tasks: set[asyncio.Task] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def get_request(self) -> Request:
+        # Model sources only use `request.app`
+        return Request({"type": "http", "app": self.app})
+
+    async def get_models(self, request: Optional[Request] = None) -> list[dict]:
+        await self.check_version()
+
+        if self.refreshed_at is None:
+            await self.refresh(request)
+        elif self.stale:
+            await self.refresh(request, timeout=self.timeout)
+        elif time.monotonic() - self.refreshed_at >= self.interval:
+            self.refresh_in_background(request)
+
+        return list(self.models)
+
+    def invalidate(self):
+        self.stale = True
+        # Check the version with the next refresh, not after it
+        self.version_checked_at = None
+
+        if self.redis is not None:
+            try:
+                self.redis.incr(self.VERSION_KEY)
+            except Exception as e:
+                log.warning(f"Error sharing the model registry invalidation: {e}")
+
+    def get_version(self) -> tuple:
+        version = (Models.get_version(), Functions.get_version())
+        if self.redis is not None:
+            version += (self.redis.get(self.VERSION_KEY),)
+        return version
+
+    async def check_version(self):
+        now = time.monotonic()
+        if (
+            self.version_checked_at is not None
+            and now - self.version_checked_at < self.version_check_interval
+        ):
+            return
+        self.version_checked_at = now
+
+        try:
+            version = await asyncio.to_thread(self.get_version)
+        except Exception as e:
+            log.warning(f"Error checking the model registry version: {e}")
+            return
+
+        if version != self.version:
+            if self.version is not None:
+                self.stale = True
+            self.version = version
+
+    def refresh_in_background(self, request: Optional[Request] = None):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh(request))
+        return self._refresh_task
+
+    async def refresh(
+        self, request: Optional[Request] = None, timeout: Optional[float] = None
+    ):
+        task = self.refresh_in_background(request)
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            log.debug("Model refresh is slow, serving the previous models")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                log.exception(f"Error refreshing models: {e}")
+
+    async def _refresh(self, request: Optional[Request] = None):
+        request = request or self.get_request()
+
+        # Changes made while refreshing trigger another refresh
+        self.stale = False
+
+        responses = await asyncio.gather(
+            *[
+                self._fetch(request, source, get_models)
+                for source, get_models in BASE_MODEL_SOURCES.items()
+            ]
+        )
+
+        base_models = []
+        for source_models in responses:
+            base_models.extend(source_models)
+
+        self._publish(request, base_models)
+
+    async def _fetch(self, request: Request, source: str, get_models) -> list[dict]:
+        task = self._fetch_tasks.get(source)
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch_source(request, source, get_models))
+            self._fetch_tasks[source] = task
+
+        if source not in self._base_models:
+            # Nothing to fall back to yet
+            return await asyncio.shield(task)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            log.warning(
+                f"Fetching {source} models takes longer than {self.timeout}s, serving the previous list"
+            )
+            if task not in self._rebuild_tasks:
+                self._rebuild_tasks.add(task)
+                task.add_done_callback(self._rebuild)
+            return self._base_models[source]
+
+    async def _fetch_source(self, request: Request, source: str, get_models):
+        start = time.perf_counter()
+        error = None
+        try:
+            self._base_models[source] = await get_models(request)
+        except Exception as e:
+            log.exception(f"Error fetching {source} models: {e}")
+            error = str(e)
+
+        self.sources[source] = {
+            "latency": time.perf_counter() - start,
+            "fetched_at": int(time.time()),
+            "error": error,
+        }
+        return self._base_models.get(source, [])
+
+    def _rebuild(self, task: asyncio.Task):
+        # A slow source finished, rebuild from the lists we have
+        self._rebuild_tasks.discard(task)
+
+        base_models = []
+        for source in BASE_MODEL_SOURCES:
+            base_models.extend(self._base_models.get(source, []))
+
+        try:
+            self._publish(self.get_request(), base_models)
+        except Exception as e:
+            log.exception(f"Error rebuilding models: {e}")
+
+    def _publish(self, request: Request, base_models: list[dict]):
+        models = build_all_models(request, base_models)
+
+        self.models = tuple(models)
+        self.refreshed_at = time.monotonic()
+        self.app.state.MODELS = {model["id"]: model for model in models}
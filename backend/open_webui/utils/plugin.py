@@ -2,18 +2,30 @@ import os
 import re
 import subprocess
 import sys
+import hashlib
+import marshal
 from importlib import util
+from pathlib import Path
+from typing import Optional
 import types
-import tempfile
+import threading
 import logging
 
 from open_webui.env import SRC_LOG_LEVELS
-from open_webui.models.functions import Functions
-from open_webui.models.tools import Tools
+from open_webui.config import CACHE_DIR
+from open_webui.models.functions import Functions, FunctionWithValvesModel
+from open_webui.models.tools import Tools, ToolWithValvesModel
+from open_webui.models.users import Users
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
+# Compiled plugin code shared by the workers, by content hash
+PLUGIN_CACHE_DIR = Path(CACHE_DIR) / "plugins"
+
+# Module name -> hash of the content the module was loaded from
+_loaded_content_hashes: dict[str, str] = {}
+
 
 def extract_frontmatter(content):
     """
@@ -68,6 +80,200 @@ def replace_imports(content):
     return content
 
 
+def get_content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def write_cache_file(path: Path, data: bytes):
+    # Written under a temporary name, so other workers never read it partially
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+def compile_plugin_content(content: str) -> tuple[types.CodeType, str]:
+    """
+    Compiles the content of a function or tool, reusing the code object any
+    worker cached on disk for the same content. Returns the code and the path
+    of its source file, which serves as the module's `__file__`.
+    """
+    content_hash = get_content_hash(content)
+    source_path = PLUGIN_CACHE_DIR / f"{content_hash}.py"
+    code_path = PLUGIN_CACHE_DIR / f"{content_hash}.marshal"
+
+    try:
+        data = code_path.read_bytes()
+        # Code objects are only valid for the Python version that compiled them
+        if data.startswith(util.MAGIC_NUMBER) and source_path.exists():
+            return marshal.loads(data[len(util.MAGIC_NUMBER) :]), str(source_path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.warning(f"Error reading compiled plugin {code_path}: {e}")
+
+    code = compile(content, str(source_path), "exec")
+
+    try:
+        PLUGIN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        write_cache_file(source_path, content.encode("utf-8"))
+        write_cache_file(code_path, util.MAGIC_NUMBER + marshal.dumps(code))
+    except Exception as e:
+        log.warning(f"Error caching compiled plugin {code_path}: {e}")
+
+    return code, str(source_path)
+
+
+def remove_compiled_plugin(content_hash: str):
+    # Plugins with the same content share the files, they are compiled again
+    for path in [
+        PLUGIN_CACHE_DIR / f"{content_hash}.py",
+        PLUGIN_CACHE_DIR / f"{content_hash}.marshal",
+    ]:
+        try:
+            path.unlink(missing_ok=True)
+        except Exception as e:
+            log.warning(f"Error removing compiled plugin {path}: {e}")
+
+
+def set_loaded_content(module_name: str, content: str):
+    # The code compiled for the content the module was loaded from before is
+    # not needed anymore
+    content_hash = get_content_hash(content)
+    previous_hash = _loaded_content_hashes.get(module_name)
+    _loaded_content_hashes[module_name] = content_hash
+
+    if previous_hash is not None and previous_hash != content_hash:
+        remove_compiled_plugin(previous_hash)
+
+
+def unload_plugin_module(module_name: str, content: Optional[str] = None):
+    """
+    Forgets the module of a deleted plugin and removes its compiled code, both
+    for the content it was loaded from and for its stored `content`.
+    """
+    sys.modules.pop(module_name, None)
+
+    content_hashes = {_loaded_content_hashes.pop(module_name, None)}
+    if content is not None:
+        content_hashes.add(get_content_hash(replace_imports(content)))
+
+    for content_hash in content_hashes - {None}:
+        remove_compiled_plugin(content_hash)
+
+
+def is_module_outdated(module_name: str, content: str) -> bool:
+    # Whether the module was loaded from other content than the stored one, e.g.
+    # after the plugin was updated through another worker
+    return _loaded_content_hashes.get(module_name) != get_content_hash(
+        replace_imports(content)
+    )
+
+
+class PluginCache:
+    """
+    Function and tool records, with their valves, kept in memory for as long as
+    the version of their table (row count and latest `updated_at`) is unchanged.
+    A filter or tool pass then reads the plugin metadata with a single version
+    query, whatever the number of plugins; the records are all refetched in one
+    query when the version changes. The functions and tools routers also
+    `invalidate()` the cache, which covers changes within the same second.
+
+    `Valves` objects are only rebuilt when the stored valves change.
+    """
+
+    def __init__(self):
+        self._functions: Optional[dict[str, FunctionWithValvesModel]] = None
+        self._functions_version = None
+        self._tools: Optional[dict[str, ToolWithValvesModel]] = None
+        self._tools_version = None
+
+        # (kind, id) -> (Valves class, stored valves, Valves object)
+        self._valves: dict[tuple[str, str], tuple] = {}
+        self._lock = threading.Lock()
+
+    def get_functions(self) -> dict[str, FunctionWithValvesModel]:
+        version = Functions.get_version()
+        with self._lock:
+            if self._functions is not None and version == self._functions_version:
+                return self._functions
+
+        functions = {
+            function.id: function for function in Functions.get_functions_with_valves()
+        }
+        with self._lock:
+            self._functions, self._functions_version = functions, version
+        return functions
+
+    def get_tools(self) -> dict[str, ToolWithValvesModel]:
+        version = Tools.get_version()
+        with self._lock:
+            if self._tools is not None and version == self._tools_version:
+                return self._tools
+
+        tools = {tool.id: tool for tool in Tools.get_tools_with_valves()}
+        with self._lock:
+            self._tools, self._tools_version = tools, version
+        return tools
+
+    def get_valves(self, kind: str, id: str, Valves, valves: Optional[dict]):
+        valves = valves if valves else {}
+        with self._lock:
+            cached = self._valves.get((kind, id))
+        if cached is not None and cached[0] is Valves and cached[1] == valves:
+            return cached[2]
+
+        instance = Valves(**valves)
+        with self._lock:
+            self._valves[(kind, id)] = (Valves, valves, instance)
+        return instance
+
+    def invalidate(self):
+        with self._lock:
+            self._functions = None
+            self._tools = None
+
+
+PLUGIN_CACHE = PluginCache()
+
+
+def get_user_valves(user_id: str, kind: str) -> dict:
+    # Valves the user set for each plugin of `kind` ("functions" or "tools")
+    user = Users.get_user_by_id(user_id)
+    user_settings = user.settings.model_dump() if user and user.settings else {}
+    return user_settings.get(kind, {}).get("valves", {})
+
+
+def get_function_module(request, function_id: str, function=None):
+    """
+    Returns the module of a function from `request.app.state.FUNCTIONS`, loading
+    it on a miss. Given the function's record, a module loaded from other
+    content is reloaded.
+    """
+    function_module = request.app.state.FUNCTIONS.get(function_id)
+    if function_module is None or (
+        function is not None
+        and is_module_outdated(f"function_{function_id}", function.content)
+    ):
+        function_module, _, _ = load_function_module_by_id(function_id)
+        request.app.state.FUNCTIONS[function_id] = function_module
+    return function_module
+
+
+def get_tools_module(request, toolkit_id: str, tool=None):
+    """
+    Returns the module of a toolkit from `request.app.state.TOOLS`, loading it
+    on a miss. Given the toolkit's record, a module loaded from other content
+    is reloaded.
+    """
+    tools_module = request.app.state.TOOLS.get(toolkit_id)
+    if tools_module is None or (
+        tool is not None and is_module_outdated(f"tool_{toolkit_id}", tool.content)
+    ):
+        tools_module, _ = load_tools_module_by_id(toolkit_id)
+        request.app.state.TOOLS[toolkit_id] = tools_module
+    return tools_module
+
+
 def load_tools_module_by_id(toolkit_id, content=None):
 
     if content is None:
@@ -75,10 +281,9 @@ def load_tools_module_by_id(toolkit_id, content=None):
         if not tool:
             raise Exception(f"Toolkit not found: {toolkit_id}")
 
-        content = tool.content
-
-        content = replace_imports(content)
-        Tools.update_tool_by_id(toolkit_id, {"content": content})
+        content = replace_imports(tool.content)
+        if content != tool.content:
+            Tools.update_tool_by_id(toolkit_id, {"content": content})
     else:
         frontmatter = extract_frontmatter(content)
         # Install required packages found within the frontmatter
@@ -88,19 +293,14 @@ def load_tools_module_by_id(toolkit_id, content=None):
     module = types.ModuleType(module_name)
     sys.modules[module_name] = module
 
-    # Create a temporary file and use it to define `__file__` so
-    # that it works as expected from the module's perspective.
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    temp_file.close()
     try:
-        with open(temp_file.name, "w", encoding="utf-8") as f:
-            f.write(content)
-        module.__dict__["__file__"] = temp_file.name
+        code, module.__dict__["__file__"] = compile_plugin_content(content)
 
         # Executing the modified content in the created module's namespace
-        exec(content, module.__dict__)
+        exec(code, module.__dict__)
         frontmatter = extract_frontmatter(content)
         log.info(f"Loaded module: {module.__name__}")
+        set_loaded_content(module_name, content)
 
         # Create and return the object if the class 'Tools' is found in the module
         if hasattr(module, "Tools"):
@@ -110,9 +310,8 @@ def load_tools_module_by_id(toolkit_id, content=None):
     except Exception as e:
         log.error(f"Error loading module: {toolkit_id}: {e}")
         del sys.modules[module_name]  # Clean up
+        _loaded_content_hashes.pop(module_name, None)
         raise e
-    finally:
-        os.unlink(temp_file.name)
 
 
 def load_function_module_by_id(function_id, content=None):
@@ -120,10 +319,10 @@ def load_function_module_by_id(function_id, content=None):
         function = Functions.get_function_by_id(function_id)
         if not function:
             raise Exception(f"Function not found: {function_id}")
-        content = function.content
 
-        content = replace_imports(content)
-        Functions.update_function_by_id(function_id, {"content": content})
+        content = replace_imports(function.content)
+        if content != function.content:
+            Functions.update_function_by_id(function_id, {"content": content})
     else:
         frontmatter = extract_frontmatter(content)
         install_frontmatter_requirements(frontmatter.get("requirements", ""))
@@ -132,19 +331,14 @@ def load_function_module_by_id(function_id, content=None):
     module = types.ModuleType(module_name)
     sys.modules[module_name] = module
 
-    # Create a temporary file and use it to define `__file__` so
-    # that it works as expected from the module's perspective.
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    temp_file.close()
     try:
-        with open(temp_file.name, "w", encoding="utf-8") as f:
-            f.write(content)
-        module.__dict__["__file__"] = temp_file.name
+        code, module.__dict__["__file__"] = compile_plugin_content(content)
 
         # Execute the modified content in the created module's namespace
-        exec(content, module.__dict__)
+        exec(code, module.__dict__)
         frontmatter = extract_frontmatter(content)
         log.info(f"Loaded module: {module.__name__}")
+        set_loaded_content(module_name, content)
 
         # Create appropriate object based on available class type in the module
         if hasattr(module, "Pipe"):
@@ -158,11 +352,11 @@ def load_function_module_by_id(function_id, content=None):
     except Exception as e:
         log.error(f"Error loading module: {function_id}: {e}")
         del sys.modules[module_name]  # Cleanup by removing the module in case of error
+        _loaded_content_hashes.pop(module_name, None)
 
         Functions.update_function_by_id(function_id, {"is_active": False})
+        PLUGIN_CACHE.invalidate()
         raise e
-    finally:
-        os.unlink(temp_file.name)
 
 
 def install_frontmatter_requirements(requirements):
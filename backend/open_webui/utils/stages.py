@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+# Result of a stage that failed or timed out
+_FAILED = object()
+
+
+class Stage:
+    """
+    A step preparing a chat completion. `run` is called with the results of
+    the stages done so far once the stages named in `depends_on` are done,
+    whether they succeeded or not. Dependencies on stages that are not
+    scheduled are ignored.
+
+    `on_error` is awaited when the stage fails or exceeds `timeout` seconds,
+    e.g. to tell the user it was skipped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[dict], Awaitable],
+        depends_on: Sequence[str] = (),
+        timeout: Optional[float] = None,
+        on_error: Optional[Callable[[], Awaitable]] = None,
+    ):
+        self.name = name
+        self.run = run
+        self.depends_on = depends_on
+        self.timeout = timeout
+        self.on_error = on_error
+
+
+async def run_stages(stages: list[Stage]) -> dict[str, Any]:
+    """
+    Runs each of `stages` as soon as its dependencies are done, so independent
+    stages run concurrently, and returns the results of the stages that
+    succeeded by name. Failed and timed out stages are logged and left out.
+    """
+    tasks: dict[str, asyncio.Task] = {}
+    results: dict[str, Any] = {}
+
+    async def run_stage(stage: Stage):
+        await asyncio.gather(
+            *[tasks[name] for name in stage.depends_on if name in tasks]
+        )
+
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(stage.run(results), stage.timeout or None)
+            results[stage.name] = result
+            log.debug(f"Stage {stage.name} took {time.monotonic() - start:.2f}s")
+            return result
+        except asyncio.TimeoutError:
+            log.warning(f"Stage {stage.name} timed out after {stage.timeout}s")
+        except Exception as e:
+            log.exception(f"Stage {stage.name} failed: {e}")
+
+        if stage.on_error is not None:
+            try:
+                await stage.on_error()
+            except Exception as e:
+                log.exception(e)
+        return _FAILED
+
+    # All tasks exist before any of them starts waiting on its dependencies
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(run_stage(stage))
+
+    await asyncio.gather(*tasks.values())
+    return {
+        name: task.result()
+        for name, task in tasks.items()
+        if task.result() is not _FAILED
+    }
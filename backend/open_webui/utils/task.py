@@ -1,3 +1,4 @@
+import json
 import logging
 import math
 import re
@@ -337,3 +338,72 @@ def moa_response_generation_template(
 def tools_function_calling_generation_template(template: str, tools_specs: str) -> str:
     template = template.replace("{{TOOLS}}", tools_specs)
     return template
+
+
+# Artifacts a turn plan can hold, with the instructions asking for each
+TURN_PLAN_ARTIFACTS = {
+    "retrieval_queries": '"retrieval_queries": 1-3 concise queries to search the attached documents and knowledge for what is needed to answer, or [] if they certainly can\'t help',
+    "web_search_queries": '"web_search_queries": 1-3 broad and relevant web search queries, or [] only if it is entirely certain that no useful results can be found on the web',
+    "tool_calls": '"tool_calls": the tools from <tools> to call, as [{"name": "toolName", "parameters": {"key": "value"}}] with the required parameters, or [] if no tool matches',
+    "title": '"title": a concise, 3-5 word title for the chat with an emoji summarizing its theme',
+    "tags": '"tags": 1-3 broad tags categorizing the main themes of the chat, e.g. "Science", "Technology", "Health"',
+}
+
+
+def turn_planning_generation_template(
+    template: str,
+    messages: list[dict],
+    artifacts: list[str],
+    tools_specs: str,
+    user: Optional[dict] = None,
+) -> str:
+    tasks = "\n".join(f"- {TURN_PLAN_ARTIFACTS[artifact]}" for artifact in artifacts)
+    template = template.replace("{{TASKS}}", tasks)
+    template = template.replace("{{TOOLS}}", tools_specs)
+
+    prompt = get_last_user_message(messages)
+    template = replace_prompt_variable(template, prompt)
+    template = replace_messages_variable(template, messages)
+
+    template = prompt_template(
+        template,
+        **(
+            {"user_name": user.get("name"), "user_location": user.get("location")}
+            if user
+            else {}
+        ),
+    )
+    return template
+
+
+def parse_turn_plan(content: str, artifacts: list[str]) -> dict:
+    """
+    Returns the artifacts found well-formed in a turn planning response. The
+    others are left out, to be generated by their own task instead.
+    """
+    try:
+        plan = json.loads(content[content.find("{") : content.rfind("}") + 1])
+        if not isinstance(plan, dict):
+            raise Exception("Turn plan is not a JSON object")
+    except Exception as e:
+        log.debug(f"Malformed turn plan: {e}")
+        return {}
+
+    def is_list_of(value, type) -> bool:
+        return isinstance(value, list) and all(isinstance(v, type) for v in value)
+
+    result = {}
+    for artifact in artifacts:
+        value = plan.get(artifact)
+        if artifact in ["retrieval_queries", "web_search_queries", "tags"]:
+            valid = is_list_of(value, str)
+        elif artifact == "tool_calls":
+            valid = is_list_of(value, dict) and all("name" in v for v in value)
+        elif artifact == "title":
+            valid = isinstance(value, str) and value.strip() != ""
+        else:
+            valid = False
+
+        if valid:
+            result[artifact] = value
+    return result
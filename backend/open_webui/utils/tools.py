@@ -1,3 +1,4 @@
+import copy
 import inspect
 import logging
 import re
@@ -12,7 +13,7 @@ from langchain_core.utils.function_calling import convert_to_openai_function
 
 from open_webui.models.tools import Tools
 from open_webui.models.users import UserModel
-from open_webui.utils.plugin import load_tools_module_by_id
+from open_webui.utils.plugin import PLUGIN_CACHE, get_tools_module, get_user_valves
 
 log = logging.getLogger(__name__)
 
@@ -40,27 +41,31 @@ def get_tools(
 ) -> dict[str, dict]:
     tools_dict = {}
 
+    all_tools = PLUGIN_CACHE.get_tools()
+    user_valves = None
+
     for tool_id in tool_ids:
-        tools = Tools.get_tool_by_id(tool_id)
+        tools = all_tools.get(tool_id)
         if tools is None:
             continue
 
-        module = request.app.state.TOOLS.get(tool_id, None)
-        if module is None:
-            module, _ = load_tools_module_by_id(tool_id)
-            request.app.state.TOOLS[tool_id] = module
+        module = get_tools_module(request, tool_id, tools)
 
         extra_params["__id__"] = tool_id
         if hasattr(module, "valves") and hasattr(module, "Valves"):
-            valves = Tools.get_tool_valves_by_id(tool_id) or {}
-            module.valves = module.Valves(**valves)
+            module.valves = PLUGIN_CACHE.get_valves(
+                "tools", tool_id, module.Valves, tools.valves
+            )
 
         if hasattr(module, "UserValves"):
+            if user_valves is None:
+                user_valves = get_user_valves(user.id, "tools")
             extra_params["__user__"]["valves"] = module.UserValves(  # type: ignore
-                **Tools.get_user_valves_by_id_and_user_id(tool_id, user.id)
+                **user_valves.get(tool_id, {})
             )
 
-        for spec in tools.specs:
+        # Copied, the cached specs are shared by all requests
+        for spec in copy.deepcopy(tools.specs):
             # TODO: Fix hack for OpenAI API
             # Some times breaks OpenAI but others don't. Leaving the comment
             for val in spec.get("parameters", {}).get("properties", {}).values():
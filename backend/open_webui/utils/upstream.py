@@ -0,0 +1,138 @@
+import logging
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    AIOHTTP_POOL_LIMIT_PER_HOST,
+    AIOHTTP_POOL_KEEPALIVE_TIMEOUT,
+    AIOHTTP_POOL_DNS_CACHE_TTL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+def get_origin(url: str) -> str:
+    parsed_url = urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+
+class UpstreamSessionPool:
+    """
+    Application-lifetime `aiohttp.ClientSession`s for the Ollama and OpenAI
+    upstreams, one per origin, so requests reuse kept-alive connections instead
+    of paying TCP/TLS setup on every chat turn.
+
+    Sessions are shared: pass timeouts per request and release responses when
+    done, never close the session. `close()` runs on application shutdown.
+    """
+
+    def __init__(
+        self,
+        limit_per_host: int = AIOHTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = AIOHTTP_POOL_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache: int = AIOHTTP_POOL_DNS_CACHE_TTL,
+    ):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+
+        self._sessions: dict[str, aiohttp.ClientSession] = {}
+        self._stats: dict[str, dict] = {}
+
+    def get(self, url: str) -> aiohttp.ClientSession:
+        origin = get_origin(url)
+
+        session = self._sessions.get(origin)
+        if session is None or session.closed:
+            session = self._create(origin)
+            self._sessions[origin] = session
+        return session
+
+    def _create(self, origin: str) -> aiohttp.ClientSession:
+        log.debug(f"Opening connection pool for {origin}")
+
+        stats = self._stats.setdefault(
+            origin,
+            {
+                "requests": 0,
+                "connections_created": 0,
+                "connections_reused": 0,
+                # Requests currently waiting for a free connection
+                "queued": 0,
+                "queued_total": 0,
+                "queue_wait_total": 0.0,
+                "queue_wait_max": 0.0,
+            },
+        )
+
+        async def on_request_start(session, context, params):
+            stats["requests"] += 1
+
+        async def on_connection_queued_start(session, context, params):
+            context.queued_at = time.monotonic()
+            stats["queued"] += 1
+            stats["queued_total"] += 1
+
+        async def on_connection_queued_end(session, context, params):
+            wait = time.monotonic() - context.queued_at
+            stats["queued"] -= 1
+            stats["queue_wait_total"] += wait
+            stats["queue_wait_max"] = max(stats["queue_wait_max"], wait)
+
+        async def on_connection_create_end(session, context, params):
+            stats["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            stats["connections_reused"] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.ttl_dns_cache,
+        )
+
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=None),
+            trust_env=True,
+            trace_configs=[trace_config],
+        )
+
+    def get_stats(self) -> dict[str, dict]:
+        return {
+            origin: {
+                **stats,
+                "limit_per_host": self.limit_per_host,
+                "saturated": stats["queued"] > 0,
+            }
+            for origin, stats in self._stats.items()
+        }
+
+    async def close(self):
+        sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            await session.close()
+
+
+UPSTREAM_SESSIONS = UpstreamSessionPool()
+
+
+async def cleanup_response(response: Optional[aiohttp.ClientResponse]):
+    # Hands the connection back to the pool (or drops it if the body was not
+    # fully read), the shared session stays open
+    if response:
+        response.release()
@@ -1,11 +1,12 @@
 import { WEBUI_API_BASE_URL } from '$lib/constants';
 
-export const uploadFile = async (token: string, file: File) => {
+export const uploadFile = async (token: string, file: File, background: boolean = false) => {
 	const data = new FormData();
 	data.append('file', file);
 	let error = null;
 
-	const res = await fetch(`${WEBUI_API_BASE_URL}/files/`, {
+	// In the background, the file is processed by a job: the response has its `job_id`
+	const res = await fetch(`${WEBUI_API_BASE_URL}/files/${background ? '?background=true' : ''}`, {
 		method: 'POST',
 		headers: {
 			Accept: 'application/json',
@@ -567,3 +567,41 @@ export const resetVectorDB = async (token: string) => {
 
 	return res;
 };
+
+export const getJobById = async (token: string, id: string) => {
+	let error = null;
+
+	const res = await fetch(`${RETRIEVAL_API_BASE_URL}/jobs/${id}`, {
+		method: 'GET',
+		headers: {
+			Accept: 'application/json',
+			authorization: `Bearer ${token}`
+		}
+	})
+		.then(async (res) => {
+			if (!res.ok) throw await res.json();
+			return res.json();
+		})
+		.catch((err) => {
+			error = err.detail;
+			return null;
+		});
+
+	if (error) {
+		throw error;
+	}
+
+	return res;
+};
+
+// Polls a background job until it completed or failed, and returns it
+export const waitForJob = async (token: string, id: string, interval: number = 1000) => {
+	while (true) {
+		const job = await getJobById(token, id);
+		if (['completed', 'failed'].includes(job.status)) {
+			return job;
+		}
+
+		await new Promise((resolve) => setTimeout(resolve, interval));
+	}
+};